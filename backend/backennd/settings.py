@@ -169,6 +169,11 @@ CORS_ALLOWED_HEADERS = [
     'x-requested-with',
 ]
 
+# Lets the frontend read the chatbot session of a streamed answer
+CORS_EXPOSE_HEADERS = [
+    'x-chat-session',
+]
+
 CORS_ALLOWED_METHODS = [
     'DELETE',
     'GET',
@@ -220,4 +225,151 @@ CLERK_WEBHOOK_SECRET = os.getenv('CLERK_WEBHOOK_SECRET')
 
 SECURE_SSL_REDIRECT = os.getenv("SECURE_SSL_REDIRECT", "True") == "True"
 CSRF_COOKIE_SECURE = True
-SESSION_COOKIE_SECURE = True
\ No newline at end of file
+SESSION_COOKIE_SECURE = True
+
+# Playlist ingestion jobs
+# Jobs run on an in-process thread pool by default. Set INGEST_RUN_IN_PROCESS=False
+# and run `python manage.py run_ingest_worker` to process them in a separate process.
+INGEST_WORKERS = int(os.getenv('INGEST_WORKERS', '2'))
+INGEST_RUN_IN_PROCESS = os.getenv('INGEST_RUN_IN_PROCESS', 'True') == 'True'
+# A running job without progress for this long lost its worker (e.g. a restart) and is
+# requeued: by `run_ingest_worker` at start, or in-process when jobs are created or polled
+INGEST_STALE_MINUTES = int(os.getenv('INGEST_STALE_MINUTES', '30'))
+
+# Maximum total duration of the videos imported from one playlist (30 hours)
+MAX_PLAYLIST_DURATION_SECONDS = int(os.getenv('MAX_PLAYLIST_DURATION_SECONDS', str(30 * 60 * 60)))
+
+# Concurrent summarization during ingest
+SUMMARY_CONCURRENCY = int(os.getenv('SUMMARY_CONCURRENCY', '4'))
+
+# Requests and tokens per minute allowed per LLM provider, shared by every worker
+# (see main/utils/rate_limit.py). Backend: 'database', 'file' or 'memory' (one process only)
+LLM_RATE_LIMITS = {
+    'groq': int(os.getenv('GROQ_REQUESTS_PER_MINUTE', '30')),
+    'openai': int(os.getenv('OPENAI_REQUESTS_PER_MINUTE', '500')),
+}
+LLM_TOKEN_LIMITS = {
+    'groq': int(os.getenv('GROQ_TOKENS_PER_MINUTE', '30000')),
+    'openai': int(os.getenv('OPENAI_TOKENS_PER_MINUTE', '200000')),
+}
+LLM_RATE_LIMIT_BACKEND = os.getenv('LLM_RATE_LIMIT_BACKEND', 'database')
+LLM_RATE_LIMIT_FILE = os.getenv('LLM_RATE_LIMIT_FILE', os.path.join(BASE_DIR, 'llm_rate_limits.json'))
+# Output tokens charged up front when a call has no smaller max_tokens; corrected from usage afterwards
+LLM_OUTPUT_TOKEN_ESTIMATE = int(os.getenv('LLM_OUTPUT_TOKEN_ESTIMATE', '1000'))
+
+# Number of Video rows per INSERT when saving an ingested playlist
+INGEST_BULK_BATCH_SIZE = int(os.getenv('INGEST_BULK_BATCH_SIZE', '100'))
+
+# Transcript fetching (see main/utils/transcript_fetch.py): video IDs go to the provider in
+# batches of TRANSCRIPT_BATCH_SIZE, TRANSCRIPT_CONCURRENCY batches at a time. A batch failing
+# with 429/5xx or a network error is retried up to TRANSCRIPT_MAX_RETRIES times, with
+# exponential backoff from TRANSCRIPT_BACKOFF_SECONDS (a Retry-After header is honoured,
+# capped at the longest backoff)
+TRANSCRIPT_BATCH_SIZE = int(os.getenv('TRANSCRIPT_BATCH_SIZE', '50'))
+TRANSCRIPT_CONCURRENCY = int(os.getenv('TRANSCRIPT_CONCURRENCY', '4'))
+TRANSCRIPT_MAX_RETRIES = int(os.getenv('TRANSCRIPT_MAX_RETRIES', '4'))
+TRANSCRIPT_BACKOFF_SECONDS = float(os.getenv('TRANSCRIPT_BACKOFF_SECONDS', '1.0'))
+TRANSCRIPT_TIMEOUT_SECONDS = float(os.getenv('TRANSCRIPT_TIMEOUT_SECONDS', '60'))
+
+# Shared transcript / summary cache (see main/utils/content_cache.py)
+TRANSCRIPT_CACHE_TTL_DAYS = int(os.getenv('TRANSCRIPT_CACHE_TTL_DAYS', '30'))
+SUMMARY_CACHE_TTL_DAYS = int(os.getenv('SUMMARY_CACHE_TTL_DAYS', '90'))
+
+# How long a yt_dlp playlist enumeration is reused within a process
+PLAYLIST_CACHE_TTL_SECONDS = int(os.getenv('PLAYLIST_CACHE_TTL_SECONDS', '300'))
+
+# Map-reduce summarization: transcripts above SUMMARY_CHUNK_TOKENS are summarized in chunks
+SUMMARY_CHUNK_TOKENS = int(os.getenv('SUMMARY_CHUNK_TOKENS', '4000'))
+SUMMARY_CHUNK_OUTPUT_TOKENS = int(os.getenv('SUMMARY_CHUNK_OUTPUT_TOKENS', '600'))
+SUMMARY_CHUNK_CONCURRENCY = int(os.getenv('SUMMARY_CHUNK_CONCURRENCY', '4'))
+SUMMARY_MAX_OUTPUT_TOKENS = int(os.getenv('SUMMARY_MAX_OUTPUT_TOKENS', '4000'))
+
+# Server-sent ingest progress stream
+INGEST_EVENTS_POLL_SECONDS = float(os.getenv('INGEST_EVENTS_POLL_SECONDS', '1'))
+INGEST_EVENTS_TIMEOUT_SECONDS = int(os.getenv('INGEST_EVENTS_TIMEOUT_SECONDS', '1800'))
+
+# LLM gateway (see main/llm): pooled clients, per-call deadlines and circuit breakers
+LLM_TIMEOUT_SECONDS = float(os.getenv('LLM_TIMEOUT_SECONDS', '60'))
+LLM_CONNECT_TIMEOUT_SECONDS = float(os.getenv('LLM_CONNECT_TIMEOUT_SECONDS', '5'))
+LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', '1'))
+LLM_MAX_CONNECTIONS = int(os.getenv('LLM_MAX_CONNECTIONS', '20'))
+# Async clients (streaming views under ASGI) keep one connection per open stream
+LLM_ASYNC_MAX_CONNECTIONS = int(os.getenv('LLM_ASYNC_MAX_CONNECTIONS', '1000'))
+# Threads (each with one DB connection) that run async streams' rate limit and stats
+# updates against the database or file backend; the memory backend needs none
+LLM_ASYNC_BOOKKEEPING_THREADS = int(os.getenv('LLM_ASYNC_BOOKKEEPING_THREADS', '8'))
+LLM_BREAKER_FAILURE_THRESHOLD = int(os.getenv('LLM_BREAKER_FAILURE_THRESHOLD', '3'))
+LLM_BREAKER_RESET_SECONDS = float(os.getenv('LLM_BREAKER_RESET_SECONDS', '30'))
+# Override the API endpoints, e.g. with `manage.py run_llm_stub` for offline benchmarks:
+# GROQ_BASE_URL=http://127.0.0.1:8765 and OPENAI_BASE_URL=http://127.0.0.1:8765/v1
+LLM_BASE_URLS = {
+    'groq': os.getenv('GROQ_BASE_URL') or None,
+    'openai': os.getenv('OPENAI_BASE_URL') or None,
+}
+
+# Hedged streaming for chat endpoints (see main/llm/hedge.py): if the primary provider has
+# no first token after its threshold (set it near the provider's p95), the next one is started too
+LLM_HEDGE_ENABLED = os.getenv('LLM_HEDGE_ENABLED', 'True') == 'True'
+LLM_HEDGE_AFTER_SECONDS = {
+    'openai': float(os.getenv('OPENAI_HEDGE_AFTER_SECONDS', '1.5')),
+    'groq': float(os.getenv('GROQ_HEDGE_AFTER_SECONDS', '1.0')),
+}
+
+# Serve the chatbot and quiz-explanation streams from async views (main/async_views.py).
+# Only enable when running under ASGI (e.g. `uvicorn backennd.asgi:application`):
+# under WSGI Django would buffer an async stream until it has finished
+ASGI_STREAMING = os.getenv('ASGI_STREAMING', 'False') == 'True'
+
+# Server-sent events (see main/utils/sse.py): LLM deltas are coalesced into one event per
+# SSE_COALESCE_SECONDS or SSE_COALESCE_MAX_CHARS, and a keepalive comment is sent after
+# SSE_HEARTBEAT_SECONDS without any event
+SSE_COALESCE_SECONDS = float(os.getenv('SSE_COALESCE_SECONDS', '0.05'))
+SSE_COALESCE_MAX_CHARS = int(os.getenv('SSE_COALESCE_MAX_CHARS', '512'))
+SSE_HEARTBEAT_SECONDS = float(os.getenv('SSE_HEARTBEAT_SECONDS', '15'))
+
+# Persistent LLM response cache (see main/llm/cache.py)
+LLM_CACHE_ENABLED = os.getenv('LLM_CACHE_ENABLED', 'True') == 'True'
+LLM_CACHE_TTL_DAYS = int(os.getenv('LLM_CACHE_TTL_DAYS', '30'))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv('LLM_CACHE_MAX_ENTRIES', '10000'))
+
+# Quiz answer explanations (see main/utils/quiz_explanation_cache.py) are stored and replayed;
+# QUIZ_EXPLANATION_PREGENERATE explains all wrong answers in one call after a quiz is submitted
+QUIZ_EXPLANATION_CACHE_ENABLED = os.getenv('QUIZ_EXPLANATION_CACHE_ENABLED', 'True') == 'True'
+QUIZ_EXPLANATION_PREGENERATE = os.getenv('QUIZ_EXPLANATION_PREGENERATE', 'False') == 'True'
+
+# Put the compacted transcript (see main/utils/transcript_compact.py) into summary,
+# flashcard, mindmap and quiz prompts instead of the raw captions
+USE_COMPACT_TRANSCRIPT = os.getenv('USE_COMPACT_TRANSCRIPT', 'True') == 'True'
+
+# Chatbot retrieval (see main/utils/transcript_index.py): the RAG_TOP_K best transcript
+# windows of ~RAG_WINDOW_TOKENS each, at most RAG_MAX_CONTEXT_TOKENS in total, go into the
+# prompt next to the summary (cut to RAG_SUMMARY_MAX_TOKENS)
+RAG_WINDOW_TOKENS = int(os.getenv('RAG_WINDOW_TOKENS', '150'))
+RAG_TOP_K = int(os.getenv('RAG_TOP_K', '4'))
+RAG_MAX_CONTEXT_TOKENS = int(os.getenv('RAG_MAX_CONTEXT_TOKENS', '800'))
+RAG_SUMMARY_MAX_TOKENS = int(os.getenv('RAG_SUMMARY_MAX_TOKENS', '1500'))
+
+# Playlist chatbot (see main/utils/playlist_index.py): the PLAYLIST_RAG_TOP_K best passages across
+# all videos, at most PLAYLIST_RAG_MAX_PER_VIDEO per video and PLAYLIST_RAG_MAX_CONTEXT_TOKENS in total
+PLAYLIST_RAG_TOP_K = int(os.getenv('PLAYLIST_RAG_TOP_K', '6'))
+PLAYLIST_RAG_MAX_PER_VIDEO = int(os.getenv('PLAYLIST_RAG_MAX_PER_VIDEO', '2'))
+PLAYLIST_RAG_MAX_CONTEXT_TOKENS = int(os.getenv('PLAYLIST_RAG_MAX_CONTEXT_TOKENS', '1200'))
+
+# Chatbot memory (see main/utils/chat_memory.py): the newest turns up to CHAT_HISTORY_MAX_TOKENS
+# are sent verbatim, older ones as a running summary of at most CHAT_SUMMARY_MAX_TOKENS
+CHAT_HISTORY_MAX_TOKENS = int(os.getenv('CHAT_HISTORY_MAX_TOKENS', '1200'))
+CHAT_SUMMARY_MAX_TOKENS = int(os.getenv('CHAT_SUMMARY_MAX_TOKENS', '300'))
+
+# Pre-generate flashcards, mindmap and quiz for the first PREFETCH_VIDEOS videos of an
+# ingested playlist (see main/utils/prefetch.py). Work pauses while any provider has
+# less than PREFETCH_MIN_BUDGET of its rate budget left.
+# Set PREFETCH_RUN_IN_PROCESS=False to run `manage.py run_prefetch_worker` instead
+PREFETCH_ENABLED = os.getenv('PREFETCH_ENABLED', 'False') == 'True'
+PREFETCH_VIDEOS = int(os.getenv('PREFETCH_VIDEOS', '3'))
+PREFETCH_RUN_IN_PROCESS = os.getenv('PREFETCH_RUN_IN_PROCESS', 'True') == 'True'
+PREFETCH_MIN_BUDGET = float(os.getenv('PREFETCH_MIN_BUDGET', '0.5'))
+PREFETCH_PAUSE_SECONDS = float(os.getenv('PREFETCH_PAUSE_SECONDS', '10'))
+# Running tasks without progress for this long are requeued, like INGEST_STALE_MINUTES
+PREFETCH_STALE_MINUTES = int(os.getenv('PREFETCH_STALE_MINUTES', '30'))
+# How long a user request waits for a running prefetch of the same artifact before generating it itself
+PREFETCH_TAKEOVER_WAIT_SECONDS = float(os.getenv('PREFETCH_TAKEOVER_WAIT_SECONDS', '60'))
@@ -1,5 +1,8 @@
 from django.contrib import admin
-from .models import MindMap, Playlist, Video, Flashcard
+from .models import (
+    MindMap, Playlist, Video, Flashcard, IngestJob, IngestJobVideo,
+    ChatMessage, ChatSession, LLMHedgeStat, LLMResponseCache, PlaylistPassage, PrefetchTask, QuizExplanation, RateLimitBucket, TranscriptIndex
+)
 
 
 @admin.register(Playlist)
@@ -11,7 +14,7 @@ class PlaylistAdmin(admin.ModelAdmin):
 
 @admin.register(Video)
 class VideoAdmin(admin.ModelAdmin):
-    list_display = ('video_id', 'title', 'user')
+    list_display = ('video_id', 'title', 'user', 'transcript_tokens', 'compact_transcript_tokens')
     search_fields = ('video_id', 'title', 'user')
     list_filter = ('user',)
 
@@ -31,3 +34,79 @@ class MindMapAdmin(admin.ModelAdmin):
     search_fields = ('mindmap_video__title', 'user__email')
     list_filter = ('user',)
     readonly_fields = ('uuid_mindmap',)
+
+
+class IngestJobVideoInline(admin.TabularInline):
+    model = IngestJobVideo
+    extra = 0
+    readonly_fields = ('position', 'video_id', 'title', 'stage', 'error', 'updated_at')
+
+
+@admin.register(IngestJob)
+class IngestJobAdmin(admin.ModelAdmin):
+    list_display = ('uuid_job', 'user', 'status', 'stage', 'processed_videos', 'total_videos', 'created_at')
+    search_fields = ('playlist_url', 'user__email')
+    list_filter = ('status',)
+    readonly_fields = ('uuid_job',)
+    inlines = [IngestJobVideoInline]
+
+
+@admin.register(LLMResponseCache)
+class LLMResponseCacheAdmin(admin.ModelAdmin):
+    list_display = ('cache_key', 'provider', 'model', 'temperature', 'hit_count', 'last_used_at')
+    list_filter = ('provider', 'model')
+    search_fields = ('cache_key',)
+    readonly_fields = ('cache_key', 'system_hash', 'user_hash', 'created_at')
+
+
+@admin.register(QuizExplanation)
+class QuizExplanationAdmin(admin.ModelAdmin):
+    list_display = ('content_hash', 'question_index', 'answer_index', 'source', 'hit_count', 'last_used_at')
+    list_filter = ('source',)
+    search_fields = ('content_hash',)
+
+
+@admin.register(RateLimitBucket)
+class RateLimitBucketAdmin(admin.ModelAdmin):
+    list_display = ('provider', 'requests', 'tokens', 'refilled_at')
+
+
+@admin.register(PrefetchTask)
+class PrefetchTaskAdmin(admin.ModelAdmin):
+    list_display = ('video', 'user', 'artifact', 'priority', 'status', 'updated_at')
+    list_filter = ('status', 'artifact')
+    search_fields = ('video__title', 'user__email')
+
+
+@admin.register(LLMHedgeStat)
+class LLMHedgeStatAdmin(admin.ModelAdmin):
+    list_display = ('date', 'endpoint', 'calls', 'hedged', 'hedge_wins', 'saved_seconds')
+    list_filter = ('endpoint',)
+
+
+@admin.register(PlaylistPassage)
+class PlaylistPassageAdmin(admin.ModelAdmin):
+    list_display = ('video', 'playlist', 'kind', 'start', 'length')
+    list_filter = ('kind',)
+    search_fields = ('video__title', 'playlist__title')
+
+
+@admin.register(TranscriptIndex)
+class TranscriptIndexAdmin(admin.ModelAdmin):
+    list_display = ('video', 'window_count', 'updated_at')
+    search_fields = ('video__title',)
+    exclude = ('index',)
+
+
+class ChatMessageInline(admin.TabularInline):
+    model = ChatMessage
+    extra = 0
+    readonly_fields = ('role', 'content', 'tokens', 'created_at')
+
+
+@admin.register(ChatSession)
+class ChatSessionAdmin(admin.ModelAdmin):
+    list_display = ('uuid_session', 'user', 'video', 'summarized_until', 'updated_at')
+    search_fields = ('video__title', 'user__email')
+    readonly_fields = ('uuid_session',)
+    inlines = [ChatMessageInline]
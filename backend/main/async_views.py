@@ -0,0 +1,133 @@
+"""
+Async streaming endpoints for the chatbots and quiz explanations.
+
+DRF views are synchronous, so under WSGI every open stream holds a worker
+thread until the answer is finished. These views are plain Django async
+views: served by ``backennd/asgi.py`` (e.g. ``uvicorn backennd.asgi:application``)
+an open stream is a coroutine waiting on the async LLM client, so open
+streams cost no threads; past a few hundred per process the limit is the
+CPU spent parsing chunks (measure with ``manage.py bench_streams``). ``urls.py`` routes the usual URLs here
+when ``ASGI_STREAMING`` is on.
+"""
+
+import json
+
+from asgiref.sync import sync_to_async
+from django.http import Http404, JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from rest_framework.exceptions import AuthenticationFailed
+
+from main.utils.playlist_chatbot import aprocess_playlist_chatbot_request
+from main.utils.quiz_explanation import aprocess_quiz_explanation_request
+from main.utils.sse import event_stream_response
+from main.utils.summary_chatbot import aprocess_chatbot_request
+from users.authentication import ClerkJWTAuthentication
+
+
+async def _authenticate(request):
+    """
+    Authenticate like the DRF views do.
+
+    Returns:
+        tuple: ``(user, None)`` on success, ``(None, JsonResponse)`` with a 401 otherwise
+    """
+    try:
+        # May fetch the Clerk JWKS: keep it off the shared ORM thread
+        result = await sync_to_async(ClerkJWTAuthentication().authenticate, thread_sensitive=False)(request)
+    except AuthenticationFailed as e:
+        return None, JsonResponse({"detail": str(e.detail)}, status=401)
+    if result is None:
+        return None, JsonResponse({"detail": "Authentication credentials were not provided."}, status=401)
+    return result[0], None
+
+
+def _json_body(request):
+    try:
+        data = json.loads(request.body or b"{}")
+    except json.JSONDecodeError:
+        raise ValueError("Invalid JSON body")
+    if not isinstance(data, dict):
+        raise ValueError("Invalid JSON body")
+    return data
+
+
+@csrf_exempt
+@require_POST
+async def summary_chatbot(request):
+    """Async counterpart of SummaryChatbotAPIView"""
+    user, error_response = await _authenticate(request)
+    if error_response:
+        return error_response
+
+    try:
+        data = _json_body(request)
+        events, session = await aprocess_chatbot_request(
+            user=user,
+            video_uuid=data.get("video_uuid"),
+            user_message=data.get("user_message"),
+            session_uuid=data.get("session_uuid")
+        )
+        response = event_stream_response(events)
+        # The client sends it back as session_uuid to continue the conversation
+        if session is not None:
+            response['X-Chat-Session'] = str(session.uuid_session)
+        return response
+
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    except Http404:
+        return JsonResponse({"error": "Video or chat session not found"}, status=404)
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=500)
+
+
+@csrf_exempt
+@require_POST
+async def playlist_chatbot(request):
+    """Async counterpart of PlaylistChatbotAPIView"""
+    user, error_response = await _authenticate(request)
+    if error_response:
+        return error_response
+
+    try:
+        data = _json_body(request)
+        events = await aprocess_playlist_chatbot_request(
+            user=user,
+            playlist_uuid=data.get("playlist_uuid"),
+            user_message=data.get("user_message")
+        )
+        return event_stream_response(events)
+
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    except Http404:
+        return JsonResponse({"error": "Playlist not found"}, status=404)
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=500)
+
+
+@csrf_exempt
+@require_POST
+async def quiz_explanation(request):
+    """Async counterpart of QuizExplanationAPIView"""
+    user, error_response = await _authenticate(request)
+    if error_response:
+        return error_response
+
+    try:
+        data = _json_body(request)
+        events = await aprocess_quiz_explanation_request(
+            user=user,
+            video_uuid=data.get("video_uuid"),
+            question_index=data.get("question_index"),
+            user_answer_index=data.get("user_answer_index")
+        )
+        return event_stream_response(events)
+
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    except Http404:
+        return JsonResponse({"error": "Video or quiz not found"}, status=404)
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=500)
@@ -0,0 +1,32 @@
+from main.llm.gateway import (
+    GROQ_MODEL,
+    GROQ_ONLY,
+    GROQ_THEN_OPENAI,
+    OPENAI_MODEL,
+    OPENAI_ONLY,
+    OPENAI_THEN_GROQ,
+    LLMError,
+    LLMResult,
+    StreamCanceller,
+    astream_chat_completion,
+    chat_completion,
+    stream_chat_completion,
+)
+from main.llm.hedge import ahedged_stream_chat_completion, hedged_stream_chat_completion
+
+__all__ = [
+    'GROQ_MODEL',
+    'GROQ_ONLY',
+    'GROQ_THEN_OPENAI',
+    'OPENAI_MODEL',
+    'OPENAI_ONLY',
+    'OPENAI_THEN_GROQ',
+    'LLMError',
+    'LLMResult',
+    'StreamCanceller',
+    'ahedged_stream_chat_completion',
+    'astream_chat_completion',
+    'chat_completion',
+    'hedged_stream_chat_completion',
+    'stream_chat_completion',
+]
@@ -0,0 +1,88 @@
+"""
+Per-provider circuit breakers.
+
+After ``LLM_BREAKER_FAILURE_THRESHOLD`` consecutive failures a provider is
+skipped outright for ``LLM_BREAKER_RESET_SECONDS``. Then a single trial call
+is let through: success closes the circuit, failure opens it again. A trial
+that never reports back (a stream the client abandoned, a call skipped by
+the rate limiter) is given back with ``release``; failing that, another
+trial is allowed once ``LLM_BREAKER_RESET_SECONDS`` have passed.
+"""
+
+import threading
+import time
+
+from django.conf import settings
+
+
+class CircuitBreaker:
+    STATE_CLOSED = 'closed'
+    STATE_OPEN = 'open'
+    STATE_HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+        self.state = self.STATE_CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_started_at = 0.0
+        self.lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Return True if a call may be attempted now."""
+        with self.lock:
+            if self.state == self.STATE_CLOSED:
+                return True
+            now = time.monotonic()
+            if self.state == self.STATE_OPEN and now - self.opened_at >= self.reset_seconds:
+                # Let exactly one trial call through
+                self.state = self.STATE_HALF_OPEN
+                self.trial_started_at = now
+                return True
+            if self.state == self.STATE_HALF_OPEN and now - self.trial_started_at >= self.reset_seconds:
+                # The trial never reported back: let another one through
+                self.trial_started_at = now
+                return True
+            return False
+
+    def release(self):
+        """End an allowed call that has no outcome, so the next call may be the trial."""
+        with self.lock:
+            if self.state == self.STATE_HALF_OPEN:
+                self.state = self.STATE_OPEN
+
+    def record_success(self):
+        with self.lock:
+            self.state = self.STATE_CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.state == self.STATE_HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.STATE_OPEN
+                self.opened_at = time.monotonic()
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(provider: str):
+    """
+    Return the shared circuit breaker for a provider.
+
+    Args:
+        provider (str): Provider name, e.g. "groq" or "openai"
+
+    Returns:
+        CircuitBreaker: Breaker shared by every caller in this process
+    """
+    with _breakers_lock:
+        if provider not in _breakers:
+            _breakers[provider] = CircuitBreaker(
+                settings.LLM_BREAKER_FAILURE_THRESHOLD,
+                settings.LLM_BREAKER_RESET_SECONDS
+            )
+        return _breakers[provider]
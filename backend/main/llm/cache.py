@@ -0,0 +1,153 @@
+"""
+Content-addressed cache for chat completion responses.
+
+Entries are keyed by ``(provider, model, temperature, system prompt hash,
+user prompt hash)`` and live in Postgres, so a quiz or mindmap generated for
+one user is reused when anyone asks for the same thing again. Entries expire
+after ``LLM_CACHE_TTL_DAYS`` without use; ``prune_llm_cache`` also trims the
+table to ``LLM_CACHE_MAX_ENTRIES`` by least recent use.
+"""
+
+import hashlib
+import json
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError
+from django.db.models import F, Sum
+from django.utils import timezone
+
+_stats = {'hits': 0, 'misses': 0}
+_stats_lock = threading.Lock()
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _prompt_hashes(messages):
+    system = "\n".join(m.get("content") or "" for m in messages if m.get("role") == "system")
+    conversation = [m for m in messages if m.get("role") != "system"]
+    return _sha256(system), _sha256(json.dumps(conversation, sort_keys=True, ensure_ascii=False))
+
+
+def cache_key(provider, model, temperature, messages):
+    system_hash, user_hash = _prompt_hashes(messages)
+    raw = f"{provider}|{model}|{temperature}|{system_hash}|{user_hash}"
+    return _sha256(raw), system_hash, user_hash
+
+
+def _cutoff():
+    return timezone.now() - timedelta(days=settings.LLM_CACHE_TTL_DAYS)
+
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def get_cached_response(route, temperature, messages):
+    """
+    Look up a fresh cached response for any ``(provider, model)`` pair of a
+    route, in route order.
+
+    Args:
+        route (tuple): Ordered ``(provider, model)`` pairs
+        temperature (callable): Returns the temperature used for a provider
+        messages (list[dict]): Chat messages
+
+    Returns:
+        tuple | None: ``(provider, model, response)`` on a hit, None on a miss
+    """
+    from main.models import LLMResponseCache  # Import here to avoid circular imports
+
+    for provider, model in route:
+        key, _, _ = cache_key(provider, model, temperature(provider), messages)
+        updated = LLMResponseCache.objects.filter(cache_key=key, last_used_at__gte=_cutoff()).update(
+            hit_count=F('hit_count') + 1,
+            last_used_at=timezone.now()
+        )
+        if updated:
+            response = LLMResponseCache.objects.filter(cache_key=key).values_list('response', flat=True).first()
+            if response is not None:
+                _count('hits')
+                return provider, model, response
+
+    _count('misses')
+    return None
+
+
+def store_response(provider, model, temperature, messages, response):
+    from main.models import LLMResponseCache  # Import here to avoid circular imports
+
+    key, system_hash, user_hash = cache_key(provider, model, temperature, messages)
+    try:
+        LLMResponseCache.objects.update_or_create(
+            cache_key=key,
+            defaults={
+                'provider': provider,
+                'model': model,
+                'temperature': temperature,
+                'system_hash': system_hash,
+                'user_hash': user_hash,
+                'response': response,
+                'last_used_at': timezone.now(),
+            }
+        )
+    except IntegrityError:
+        # Another worker stored the same response first
+        pass
+
+
+def invalidate_response(provider, model, temperature, messages):
+    from main.models import LLMResponseCache  # Import here to avoid circular imports
+
+    key, _, _ = cache_key(provider, model, temperature, messages)
+    LLMResponseCache.objects.filter(cache_key=key).delete()
+
+
+def get_cache_stats():
+    """
+    Return hit/miss counters for this process plus table-wide totals.
+
+    Returns:
+        dict: ``hits`` and ``misses`` since process start, ``entries`` and
+        ``total_hits`` across all processes
+    """
+    from main.models import LLMResponseCache  # Import here to avoid circular imports
+
+    with _stats_lock:
+        stats = dict(_stats)
+    stats['entries'] = LLMResponseCache.objects.count()
+    stats['total_hits'] = LLMResponseCache.objects.aggregate(total=Sum('hit_count'))['total'] or 0
+    return stats
+
+
+def prune_llm_cache(clear=False):
+    """
+    Delete expired entries, then the least recently used ones above
+    ``LLM_CACHE_MAX_ENTRIES``.
+
+    Args:
+        clear (bool): Delete every entry
+
+    Returns:
+        int: Number of deleted entries
+    """
+    from main.models import LLMResponseCache  # Import here to avoid circular imports
+
+    if clear:
+        deleted, _ = LLMResponseCache.objects.all().delete()
+        return deleted
+
+    deleted, _ = LLMResponseCache.objects.filter(last_used_at__lt=_cutoff()).delete()
+
+    stale_ids = list(
+        LLMResponseCache.objects.order_by('-last_used_at')
+        .values_list('id', flat=True)[settings.LLM_CACHE_MAX_ENTRIES:]
+    )
+    if stale_ids:
+        evicted, _ = LLMResponseCache.objects.filter(id__in=stale_ids).delete()
+        deleted += evicted
+    return deleted
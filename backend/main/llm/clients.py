@@ -0,0 +1,118 @@
+"""
+Process-wide Groq and OpenAI clients.
+
+Each provider gets one SDK client backed by a pooled ``httpx.Client``, so
+keep-alive connections are reused across requests and worker threads instead
+of a new TLS handshake per generator call. Async views use ``AsyncGroq`` /
+``AsyncOpenAI`` clients, one per event loop, since an ``httpx.AsyncClient``
+pool cannot be shared between loops.
+"""
+
+import asyncio
+import os
+import threading
+import weakref
+
+import httpx
+from django.conf import settings
+from dotenv import load_dotenv
+from groq import AsyncGroq, Groq
+from openai import AsyncOpenAI, OpenAI
+
+load_dotenv()
+
+PROVIDER_CLASSES = {
+    'groq': Groq,
+    'openai': OpenAI,
+}
+
+ASYNC_PROVIDER_CLASSES = {
+    'groq': AsyncGroq,
+    'openai': AsyncOpenAI,
+}
+
+PROVIDER_API_KEYS = {
+    'groq': 'GROQ_API_KEY',
+    'openai': 'OPENAI_API_KEY',
+}
+
+_clients = {}
+_clients_lock = threading.Lock()
+# event loop -> {provider: client}
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def _http_options(max_connections):
+    return {
+        'limits': httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections
+        ),
+        'timeout': httpx.Timeout(settings.LLM_TIMEOUT_SECONDS, connect=settings.LLM_CONNECT_TIMEOUT_SECONDS),
+    }
+
+
+def _build_http_client():
+    return httpx.Client(**_http_options(settings.LLM_MAX_CONNECTIONS))
+
+
+def _client_options(provider):
+    base_url = settings.LLM_BASE_URLS.get(provider)
+    api_key = os.getenv(PROVIDER_API_KEYS[provider])
+    if base_url and not api_key:
+        # A local stub server does not check keys, but the SDKs require one
+        api_key = 'stub'
+    return {
+        'api_key': api_key,
+        'base_url': base_url,
+        'timeout': settings.LLM_TIMEOUT_SECONDS,
+        'max_retries': settings.LLM_MAX_RETRIES,
+    }
+
+
+def get_client(provider: str):
+    """
+    Return the shared SDK client for a provider, creating it on first use.
+
+    Args:
+        provider (str): "groq" or "openai"
+
+    Returns:
+        Groq | OpenAI: Client shared by every caller in this process
+
+    Raises:
+        KeyError: If the provider is unknown
+    """
+    with _clients_lock:
+        if provider not in _clients:
+            _clients[provider] = PROVIDER_CLASSES[provider](
+                http_client=_build_http_client(),
+                **_client_options(provider)
+            )
+        return _clients[provider]
+
+
+def get_async_client(provider: str):
+    """
+    Return the async SDK client for a provider on the running event loop.
+
+    Must be called from a coroutine. Streams are I/O on the loop, so one
+    process holds as many as ``LLM_ASYNC_MAX_CONNECTIONS`` at once without a
+    thread per stream.
+
+    Args:
+        provider (str): "groq" or "openai"
+
+    Returns:
+        AsyncGroq | AsyncOpenAI: Client shared by every coroutine on this loop
+
+    Raises:
+        KeyError: If the provider is unknown
+    """
+    clients = _async_clients.setdefault(asyncio.get_running_loop(), {})
+    if provider not in clients:
+        clients[provider] = ASYNC_PROVIDER_CLASSES[provider](
+            http_client=httpx.AsyncClient(**_http_options(settings.LLM_ASYNC_MAX_CONNECTIONS)),
+            **_client_options(provider)
+        )
+    return clients[provider]
@@ -0,0 +1,475 @@
+"""
+Single entry point for chat completions.
+
+A call walks a *route* — an ordered list of ``(provider, model)`` pairs —
+and falls back to the next pair when a provider errors, times out, has its
+circuit open, or returns output the caller's ``parse`` callback rejects.
+Non-streaming responses are served from and stored in the persistent
+response cache (``main/llm/cache.py``). ``astream_chat_completion`` is the
+coroutine twin of ``stream_chat_completion`` for async views.
+"""
+
+import socket
+import threading
+
+from django.conf import settings
+
+from main.llm import cache as response_cache
+from main.llm.breaker import get_breaker
+from main.llm.clients import get_async_client, get_client
+from main.utils.rate_limit import PRIORITY_CHAT, RateLimitExceeded, get_rate_limiter, run_blocking
+
+GROQ_MODEL = "llama-3.1-8b-instant"
+OPENAI_MODEL = "gpt-4o-mini"
+
+GROQ_THEN_OPENAI = (('groq', GROQ_MODEL), ('openai', OPENAI_MODEL))
+GROQ_ONLY = (('groq', GROQ_MODEL),)
+OPENAI_ONLY = (('openai', OPENAI_MODEL),)
+OPENAI_THEN_GROQ = (('openai', OPENAI_MODEL), ('groq', GROQ_MODEL))
+
+
+class LLMError(Exception):
+    """Raised when every provider in a route failed."""
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__("; ".join(f"{provider}: {error}" for provider, error in errors.items()))
+
+
+class LLMResult:
+    def __init__(self, content, provider, model, parsed=None):
+        self.content = content
+        self.provider = provider
+        self.model = model
+        self.parsed = parsed
+
+
+class StreamCanceller:
+    """
+    Lets another thread cancel a ``stream_chat_completion`` (or hedged) call.
+
+    ``cancel()`` shuts the upstream connection down, so a call blocked on its
+    next chunk (e.g. a provider stalled before its first token) ends at once
+    and releases its request, connection and circuit breaker trial. A
+    cancelled call stops without an error; callers that store the output
+    check ``cancelled`` before doing so.
+    """
+
+    def __init__(self):
+        self.cancelled = False
+        self._stream = None
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    def on_cancel(self, fn):
+        """Call ``fn()`` on ``cancel()`` (now, if the call was already cancelled)."""
+        with self._lock:
+            if not self.cancelled:
+                self._callbacks.append(fn)
+                return
+        fn()
+
+    def attach(self, stream):
+        with self._lock:
+            self._stream = stream
+            if self.cancelled:
+                _shut_down(stream)
+
+    def detach(self):
+        # Before the stream is closed: its connection may go back to the pool
+        # and must not be shut down under another request
+        with self._lock:
+            self._stream = None
+
+    def cancel(self):
+        with self._lock:
+            if self.cancelled:
+                return
+            self.cancelled = True
+            if self._stream is not None:
+                _shut_down(self._stream)
+            callbacks, self._callbacks = self._callbacks, []
+        for fn in callbacks:
+            fn()
+
+
+def _shut_down(stream):
+    # Closing the response from another thread does not wake a read blocked on
+    # it; shutting the socket down does, and the reading thread then closes it
+    network_stream = stream.response.extensions.get('network_stream')
+    sock = network_stream.get_extra_info('socket') if network_stream is not None else None
+    if sock is None:
+        stream.close()
+        return
+    try:
+        sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass
+
+
+def _per_provider(value, provider):
+    # Options such as max_tokens may be given per provider: {"groq": 1500, "openai": 4000}
+    if isinstance(value, dict):
+        return value.get(provider)
+    return value
+
+
+def _request_kwargs(provider, model, messages, temperature, max_tokens, timeout):
+    kwargs = {"model": model, "messages": messages}
+    temperature = _per_provider(temperature, provider)
+    if temperature is not None:
+        kwargs["temperature"] = temperature
+    max_tokens = _per_provider(max_tokens, provider)
+    if max_tokens is not None:
+        kwargs["max_tokens"] = max_tokens
+    if timeout is not None:
+        kwargs["timeout"] = timeout
+    return kwargs
+
+
+def _estimate_tokens(messages, max_tokens):
+    # ~4 characters per token for the prompt, plus the expected output
+    prompt_tokens = sum(len(m.get("content") or "") for m in messages) // 4
+    output_tokens = settings.LLM_OUTPUT_TOKEN_ESTIMATE
+    if max_tokens is not None:
+        output_tokens = min(output_tokens, max_tokens)
+    return prompt_tokens + output_tokens
+
+
+def _acquire(provider, errors, tokens, priority):
+    breaker = get_breaker(provider)
+    if not breaker.allow():
+        print(f"⚡ Skipping {provider}: circuit open")
+        errors[provider] = "circuit open"
+        return None
+    try:
+        get_rate_limiter(provider).acquire(tokens, priority)
+    except RateLimitExceeded as e:
+        # No call is made: a half-open trial taken by allow() must be given back
+        breaker.release()
+        print(f"⏳ Skipping {provider}: {str(e)}")
+        errors[provider] = str(e)
+        return None
+    return breaker
+
+
+async def _aacquire(provider, errors, tokens, priority):
+    # Breakers are in-memory; only the rate limiter may have to wait
+    breaker = get_breaker(provider)
+    if not breaker.allow():
+        print(f"⚡ Skipping {provider}: circuit open")
+        errors[provider] = "circuit open"
+        return None
+    try:
+        await get_rate_limiter(provider).aacquire(tokens, priority)
+    except RateLimitExceeded as e:
+        breaker.release()
+        print(f"⏳ Skipping {provider}: {str(e)}")
+        errors[provider] = str(e)
+        return None
+    return breaker
+
+
+def _stream_options(provider):
+    # OpenAI reports usage in a last chunk only when asked; Groq always sends it in x_groq
+    if provider == 'openai':
+        return {"stream_options": {"include_usage": True}}
+    return {}
+
+
+def _chunk_usage(chunk):
+    usage = getattr(chunk, "usage", None) or getattr(getattr(chunk, "x_groq", None), "usage", None)
+    return getattr(usage, "total_tokens", None)
+
+
+def _stream_charge_delta(messages, estimated_tokens, total_tokens, output_chars):
+    """Tokens to charge (or refund) a finished stream beyond its up-front estimate."""
+    if not total_tokens:
+        # No usage chunk (e.g. a compatible server): same ~4 characters per token as the estimate
+        total_tokens = _estimate_tokens(messages, 0) + output_chars // 4
+    return total_tokens - estimated_tokens
+
+
+def _adjust_stream_charge(provider, messages, estimated_tokens, total_tokens, output_chars):
+    """Correct the up-front token charge of a finished stream from its real usage."""
+    get_rate_limiter(provider).adjust(_stream_charge_delta(messages, estimated_tokens, total_tokens, output_chars))
+
+
+def _is_rate_limited(error):
+    # A 429 means our budget is off, not that the provider is down
+    return getattr(error, "status_code", None) == 429
+
+
+def _record_failure(provider, breaker, error):
+    if _is_rate_limited(error):
+        get_rate_limiter(provider).drain()
+        breaker.release()
+    else:
+        breaker.record_failure()
+
+
+async def _arecord_failure(provider, breaker, error):
+    if _is_rate_limited(error):
+        await get_rate_limiter(provider).adrain()
+        breaker.release()
+    else:
+        breaker.record_failure()
+
+
+def _settle_abandoned(breaker, started):
+    # The consumer closed or cancelled the stream: a provider that was streaming
+    # is healthy, one still waiting for its first token gives its trial back
+    if started:
+        breaker.record_success()
+    else:
+        breaker.release()
+
+
+def _from_cache(messages, route, temperature, parse):
+    hit = response_cache.get_cached_response(
+        route, lambda provider: _per_provider(temperature, provider), messages
+    )
+    if hit is None:
+        return None
+
+    provider, model, content = hit
+    print(f"♻️ LLM cache hit ({provider}/{model})")
+    if parse is None:
+        return LLMResult(content, provider, model)
+    try:
+        return LLMResult(content, provider, model, parsed=parse(content))
+    except Exception:
+        # Entry was written before the caller's validation changed
+        response_cache.invalidate_response(provider, model, _per_provider(temperature, provider), messages)
+        return None
+
+
+def chat_completion(messages, route=GROQ_THEN_OPENAI, temperature=None, max_tokens=None,
+                    timeout=None, parse=None, cache=True, priority=PRIORITY_CHAT):
+    """
+    Run a non-streaming chat completion, falling back along the route.
+
+    Args:
+        messages (list[dict]): OpenAI-style chat messages
+        route (tuple): Ordered ``(provider, model)`` pairs to try
+        temperature (float | dict, optional): Sampling temperature, optionally per provider
+        max_tokens (int | dict, optional): Output token limit, optionally per provider
+        timeout (float, optional): Per-call deadline in seconds; defaults to LLM_TIMEOUT_SECONDS
+        parse (callable, optional): Turns the response text into a value; raising
+            makes the gateway try the next provider
+        cache (bool): Use the persistent response cache (if LLM_CACHE_ENABLED)
+        priority (str): Rate limit priority, see ``main/utils/rate_limit.py``
+
+    Returns:
+        LLMResult: Response text, the provider/model that produced it and the parsed value
+
+    Raises:
+        LLMError: If every provider failed
+    """
+    use_cache = cache and settings.LLM_CACHE_ENABLED
+    if use_cache:
+        cached = _from_cache(messages, route, temperature, parse)
+        if cached is not None:
+            return cached
+
+    errors = {}
+    for provider, model in route:
+        estimated_tokens = _estimate_tokens(messages, _per_provider(max_tokens, provider))
+        breaker = _acquire(provider, errors, estimated_tokens, priority)
+        if breaker is None:
+            continue
+
+        settled = False
+        try:
+            response = get_client(provider).chat.completions.create(
+                **_request_kwargs(provider, model, messages, temperature, max_tokens, timeout)
+            )
+            content = (response.choices[0].message.content or "").strip()
+        except Exception as e:
+            _record_failure(provider, breaker, e)
+            settled = True
+            print(f"❌ {provider} failed: {str(e)}")
+            errors[provider] = str(e)
+            continue
+        else:
+            breaker.record_success()
+            settled = True
+        finally:
+            if not settled:
+                # Interrupted without an outcome; a half-open trial must not stay taken
+                breaker.release()
+
+        usage = getattr(response, "usage", None)
+        if usage is not None and getattr(usage, "total_tokens", None):
+            get_rate_limiter(provider).adjust(usage.total_tokens - estimated_tokens)
+
+        try:
+            result = LLMResult(content, provider, model, parsed=parse(content) if parse else None)
+        except Exception as e:
+            # The provider is healthy, only this output is unusable
+            print(f"❌ {provider} returned unusable output: {str(e)}")
+            errors[provider] = f"invalid output: {str(e)}"
+            continue
+
+        # Only output the caller accepted is cached
+        if use_cache and content:
+            response_cache.store_response(provider, model, _per_provider(temperature, provider), messages, content)
+        return result
+
+    raise LLMError(errors)
+
+
+def stream_chat_completion(messages, route=OPENAI_ONLY, temperature=None, max_tokens=None, timeout=None,
+                           priority=PRIORITY_CHAT, canceller=None):
+    """
+    Stream a chat completion as text deltas.
+
+    Falls back to the next provider only while nothing has been yielded yet;
+    a failure mid-stream raises instead of mixing two answers. The upstream
+    response is closed when the consumer stops iterating. Once it ends, the
+    rate limiter's up-front token charge is corrected from the usage the
+    provider reported, like ``chat_completion`` does.
+
+    Args:
+        messages (list[dict]): OpenAI-style chat messages
+        route (tuple): Ordered ``(provider, model)`` pairs to try
+        temperature (float | dict, optional): Sampling temperature, optionally per provider
+        max_tokens (int | dict, optional): Output token limit, optionally per provider
+        timeout (float, optional): Per-call deadline in seconds; defaults to LLM_TIMEOUT_SECONDS
+        priority (str): Rate limit priority, see ``main/utils/rate_limit.py``
+        canceller (StreamCanceller, optional): Lets another thread end the call; the
+            stream then stops without an error
+
+    Yields:
+        str: Text pieces as they arrive
+
+    Raises:
+        LLMError: If every provider failed, or the stream broke after the first token
+    """
+    errors = {}
+    for provider, model in route:
+        if canceller is not None and canceller.cancelled:
+            return
+        estimated_tokens = _estimate_tokens(messages, _per_provider(max_tokens, provider))
+        breaker = _acquire(provider, errors, estimated_tokens, priority)
+        if breaker is None:
+            continue
+
+        started = False
+        settled = False
+        total_tokens = None
+        output_chars = 0
+        try:
+            stream = get_client(provider).chat.completions.create(
+                stream=True,
+                **_stream_options(provider),
+                **_request_kwargs(provider, model, messages, temperature, max_tokens, timeout)
+            )
+            if canceller is not None:
+                canceller.attach(stream)
+            try:
+                for chunk in stream:
+                    total_tokens = _chunk_usage(chunk) or total_tokens
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        started = True
+                        output_chars += len(chunk.choices[0].delta.content)
+                        yield chunk.choices[0].delta.content
+            finally:
+                if canceller is not None:
+                    canceller.detach()
+                stream.close()
+                if started:
+                    _adjust_stream_charge(provider, messages, estimated_tokens, total_tokens, output_chars)
+        except Exception as e:
+            if canceller is not None and canceller.cancelled:
+                # Shut down by the caller, not by the provider: settled below like a closed stream
+                print(f"🛑 {provider} stream cancelled")
+                return
+            _record_failure(provider, breaker, e)
+            settled = True
+            print(f"❌ {provider} stream failed: {str(e)}")
+            if started:
+                raise LLMError({provider: str(e)})
+            errors[provider] = str(e)
+            continue
+        else:
+            breaker.record_success()
+            settled = True
+            return
+        finally:
+            if not settled:
+                _settle_abandoned(breaker, started)
+
+    raise LLMError(errors)
+
+
+async def astream_chat_completion(messages, route=OPENAI_ONLY, temperature=None, max_tokens=None, timeout=None,
+                                  priority=PRIORITY_CHAT):
+    """
+    Async version of ``stream_chat_completion`` on the async SDK clients.
+
+    Everything waits on the event loop: the stream itself and the rate
+    limiter's budget. Only updates of a database or file rate limit store
+    run on the limiter's bookkeeping pool (``main/utils/rate_limit.py``).
+
+    Args:
+        messages (list[dict]): OpenAI-style chat messages
+        route (tuple): Ordered ``(provider, model)`` pairs to try
+        temperature (float | dict, optional): Sampling temperature, optionally per provider
+        max_tokens (int | dict, optional): Output token limit, optionally per provider
+        timeout (float, optional): Per-call deadline in seconds; defaults to LLM_TIMEOUT_SECONDS
+        priority (str): Rate limit priority, see ``main/utils/rate_limit.py``
+
+    Yields:
+        str: Text pieces as they arrive
+
+    Raises:
+        LLMError: If every provider failed, or the stream broke after the first token
+    """
+    errors = {}
+    for provider, model in route:
+        estimated_tokens = _estimate_tokens(messages, _per_provider(max_tokens, provider))
+        breaker = await _aacquire(provider, errors, estimated_tokens, priority)
+        if breaker is None:
+            continue
+
+        started = False
+        settled = False
+        total_tokens = None
+        output_chars = 0
+        try:
+            stream = await get_async_client(provider).chat.completions.create(
+                stream=True,
+                **_stream_options(provider),
+                **_request_kwargs(provider, model, messages, temperature, max_tokens, timeout)
+            )
+            try:
+                async for chunk in stream:
+                    total_tokens = _chunk_usage(chunk) or total_tokens
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        started = True
+                        output_chars += len(chunk.choices[0].delta.content)
+                        yield chunk.choices[0].delta.content
+            finally:
+                await stream.close()
+                if started:
+                    await get_rate_limiter(provider).aadjust(
+                        _stream_charge_delta(messages, estimated_tokens, total_tokens, output_chars)
+                    )
+        except Exception as e:
+            await _arecord_failure(provider, breaker, e)
+            settled = True
+            print(f"❌ {provider} stream failed: {str(e)}")
+            if started:
+                raise LLMError({provider: str(e)})
+            errors[provider] = str(e)
+            continue
+        else:
+            breaker.record_success()
+            settled = True
+            return
+        finally:
+            if not settled:
+                _settle_abandoned(breaker, started)
+
+    raise LLMError(errors)
@@ -0,0 +1,442 @@
+"""
+Hedged streaming for latency-critical calls.
+
+The primary provider of the route is started alone. If it has produced no
+first token after ``LLM_HEDGE_AFTER_SECONDS[provider]`` (configured near
+that provider's p95 first-token latency), the next provider is started as
+well. Whichever streams a token first wins; the other leg is cancelled at
+once, even while it is still waiting for its first token, so its upstream
+request, connection and rate budget are released instead of being held until
+the timeout. A leg that fails before any token simply hands over to the next
+one, like a normal fallback.
+
+Each leg is a single-provider ``stream_chat_completion`` on its own thread,
+so circuit breakers and rate limits apply to hedges as usual. Daily counters
+per endpoint are kept in ``LLMHedgeStat``: calls, how often the hedge fired,
+how often it won, and the first-token time it saved (for a primary cancelled
+before its first token, the time it was known to be behind: a lower bound).
+
+``ahedged_stream_chat_completion`` does the same for async views, with each
+leg an ``asyncio`` task instead of a thread.
+"""
+
+import asyncio
+import functools
+import queue
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from main.llm.gateway import (
+    OPENAI_THEN_GROQ,
+    LLMError,
+    StreamCanceller,
+    astream_chat_completion,
+    stream_chat_completion,
+)
+from main.utils.rate_limit import PRIORITY_CHAT, run_blocking
+
+_TOKEN = 'token'
+_DONE = 'done'
+_ERROR = 'error'
+_CANCELLED = 'cancelled'
+
+
+class _Leg:
+    """One provider's stream, pumped into the shared event queue by a thread."""
+
+    def __init__(self, provider, model, events, options):
+        self.provider = provider
+        self.model = model
+        self.events = events
+        self.options = options
+        self.cancelled = threading.Event()
+        self.canceller = StreamCanceller()
+        self.started_at = time.monotonic()
+        self.first_token_at = None
+        self.ended_at = None
+        self.failed = False
+        self._lock = threading.Lock()
+        self._on_end = None
+
+    def start(self):
+        threading.Thread(target=self._run, name=f"hedge-{self.provider}", daemon=True).start()
+        return self
+
+    def cancel(self):
+        """Stop the leg now, closing its upstream stream even if it is blocked on it."""
+        self.cancelled.set()
+        self.canceller.cancel()
+
+    def _run(self):
+        pieces = stream_chat_completion(route=((self.provider, self.model),), canceller=self.canceller,
+                                        **self.options)
+        try:
+            for piece in pieces:
+                if self.first_token_at is None:
+                    self.first_token_at = time.monotonic()
+                if self.cancelled.is_set():
+                    break
+                self.events.put((_TOKEN, self, piece))
+            else:
+                if not self.cancelled.is_set():
+                    self.failed = self.first_token_at is None
+                    self.events.put((_DONE, self, None))
+        except LLMError as e:
+            if not self.cancelled.is_set():
+                self.failed = True
+                self.events.put((_ERROR, self, e.errors.get(self.provider, str(e))))
+        finally:
+            # Closing the generator closes the upstream response
+            pieces.close()
+            with self._lock:
+                self.ended_at = time.monotonic()
+                on_end = self._on_end
+            if on_end:
+                on_end(self)
+            # The rate limiter and stats may have used this thread's DB connection
+            connection.close()
+
+    def when_ended(self, fn):
+        """Call ``fn(leg)`` once the thread has finished (now, if it already has)."""
+        with self._lock:
+            if self.ended_at is None:
+                self._on_end = fn
+                return
+        fn(self)
+
+
+def _record(endpoint, calls=0, hedged=0, hedge_wins=0, saved_seconds=0.0):
+    from main.models import LLMHedgeStat  # Import here to avoid circular imports
+
+    try:
+        stat, _ = LLMHedgeStat.objects.get_or_create(endpoint=endpoint, date=timezone.localdate())
+        LLMHedgeStat.objects.filter(pk=stat.pk).update(
+            calls=F('calls') + calls,
+            hedged=F('hedged') + hedged,
+            hedge_wins=F('hedge_wins') + hedge_wins,
+            saved_seconds=F('saved_seconds') + saved_seconds,
+        )
+    except Exception as e:
+        # Metrics must never break a response
+        print(f"⚠️ Could not record hedge stats: {str(e)}")
+
+
+def _saved_seconds(endpoint, primary, hedge):
+    """How much sooner the hedge produced its first token than the (finished) primary would have."""
+    if primary.first_token_at is not None:
+        serial_first_token = primary.first_token_at
+    elif primary.failed:
+        # Primary failed: a plain fallback would only have started the hedge now
+        serial_first_token = primary.ended_at + (hedge.first_token_at - hedge.started_at)
+    else:
+        # Cancelled while still waiting: it had no token at least until then
+        serial_first_token = primary.ended_at
+    saved = max(0.0, serial_first_token - hedge.first_token_at)
+    print(f"🏁 Hedge on {endpoint} saved {saved:.2f}s to first token")
+    return saved
+
+
+def _record_saving(endpoint, primary, hedge):
+    """Once the cancelled primary has finished, record how much sooner the hedge answered."""
+    def record(leg):
+        _record(endpoint, saved_seconds=_saved_seconds(endpoint, leg, hedge))
+
+    primary.when_ended(record)
+
+
+def hedged_stream_chat_completion(messages, route=OPENAI_THEN_GROQ, endpoint='chat', temperature=None,
+                                  max_tokens=None, timeout=None, priority=PRIORITY_CHAT, canceller=None):
+    """
+    Stream a chat completion, hedging a slow primary with the next provider.
+
+    Args:
+        messages (list[dict]): OpenAI-style chat messages
+        route (tuple): Ordered ``(provider, model)`` pairs; the first two are raced
+        endpoint (str): Name the hedge stats are recorded under
+        temperature (float | dict, optional): Sampling temperature, optionally per provider
+        max_tokens (int | dict, optional): Output token limit, optionally per provider
+        timeout (float, optional): Per-call deadline in seconds; defaults to LLM_TIMEOUT_SECONDS
+        priority (str): Rate limit priority, see ``main/utils/rate_limit.py``
+        canceller (StreamCanceller, optional): Lets another thread end the call and
+            every leg at once; the stream then stops without an error
+
+    Yields:
+        str: Text pieces of the winning provider
+
+    Raises:
+        LLMError: If every provider failed, or the winner broke after its first token
+    """
+    if not settings.LLM_HEDGE_ENABLED or len(route) < 2:
+        yield from stream_chat_completion(messages, route=route, temperature=temperature, max_tokens=max_tokens,
+                                          timeout=timeout, priority=priority, canceller=canceller)
+        return
+
+    events = queue.Queue()
+    options = {
+        'messages': messages,
+        'temperature': temperature,
+        'max_tokens': max_tokens,
+        'timeout': timeout,
+        'priority': priority,
+    }
+    primary_provider, primary_model = route[0]
+    hedge_at = time.monotonic() + settings.LLM_HEDGE_AFTER_SECONDS.get(primary_provider, 0)
+    legs = [_Leg(primary_provider, primary_model, events, options).start()]
+    hedged = False
+    errors = {}
+    winner = None
+    if canceller is not None:
+        # Wakes this generator wherever it waits; its finally then cancels the legs
+        canceller.on_cancel(lambda: events.put((_CANCELLED, None, None)))
+
+    try:
+        while winner is None:
+            wait = None
+            if len(legs) < len(route) and not hedged:
+                wait = max(0.0, hedge_at - time.monotonic())
+            try:
+                kind, leg, payload = events.get(timeout=wait)
+            except queue.Empty:
+                provider, model = route[len(legs)]
+                print(f"🔀 No first token from {primary_provider} yet, hedging with {provider}")
+                hedged = True
+                legs.append(_Leg(provider, model, events, options).start())
+                continue
+
+            if kind == _CANCELLED:
+                return
+            if kind == _TOKEN:
+                winner = leg
+                first_piece = payload
+                continue
+
+            errors[leg.provider] = payload if kind == _ERROR else "empty response"
+            if all(l.provider in errors for l in legs):
+                if len(legs) == len(route):
+                    raise LLMError(errors)
+                # Nothing is running: plain fallback to the next provider
+                provider, model = route[len(legs)]
+                legs.append(_Leg(provider, model, events, options).start())
+
+        for leg in legs:
+            if leg is not winner:
+                leg.cancel()
+
+        hedge_won = hedged and winner is not legs[0]
+        _record(endpoint, calls=1, hedged=int(hedged), hedge_wins=int(hedge_won))
+        if hedge_won:
+            print(f"🏎️ Hedge {winner.provider} beat {primary_provider} on {endpoint}")
+            _record_saving(endpoint, legs[0], winner)
+
+        yield first_piece
+        while True:
+            kind, leg, payload = events.get()
+            if kind == _CANCELLED:
+                return
+            if leg is not winner:
+                continue
+            if kind == _TOKEN:
+                yield payload
+            elif kind == _DONE:
+                return
+            else:
+                raise LLMError({leg.provider: payload})
+    finally:
+        # Consumer went away or everything is settled: stop any leg still running
+        for leg in legs:
+            leg.cancel()
+
+
+class _AsyncLeg:
+    """One provider's stream, pumped into the shared event queue by a task."""
+
+    # Cancelled legs finish on their own; keep them referenced until they do
+    running = set()
+
+    def __init__(self, provider, model, events, options):
+        self.provider = provider
+        self.model = model
+        self.events = events
+        self.options = options
+        self.cancelled = False
+        self.task = None
+        self.started_at = time.monotonic()
+        self.first_token_at = None
+        self.ended_at = None
+        self.failed = False
+        self.on_end = None
+
+    def start(self):
+        self.task = asyncio.create_task(self._run(), name=f"hedge-{self.provider}")
+        self.running.add(self.task)
+        self.task.add_done_callback(self.running.discard)
+        return self
+
+    def cancel(self):
+        """Cancel the task now, which closes the upstream stream even before its first token."""
+        self.cancelled = True
+        self.task.cancel()
+
+    async def wait(self):
+        try:
+            await self.task
+        except (asyncio.CancelledError, Exception):
+            pass
+
+    async def _run(self):
+        pieces = astream_chat_completion(route=((self.provider, self.model),), **self.options)
+        try:
+            async for piece in pieces:
+                if self.first_token_at is None:
+                    self.first_token_at = time.monotonic()
+                if self.cancelled:
+                    break
+                self.events.put_nowait((_TOKEN, self, piece))
+            else:
+                if not self.cancelled:
+                    self.failed = self.first_token_at is None
+                    self.events.put_nowait((_DONE, self, None))
+        except LLMError as e:
+            if not self.cancelled:
+                self.failed = True
+                self.events.put_nowait((_ERROR, self, e.errors.get(self.provider, str(e))))
+        except asyncio.CancelledError:
+            if not self.cancelled:
+                # The event loop is shutting down: there is no first-token time to compare against
+                self.on_end = None
+            raise
+        finally:
+            # Closing the generator closes the upstream response
+            await pieces.aclose()
+            self.ended_at = time.monotonic()
+            if self.on_end:
+                await self.on_end(self)
+
+
+async def ahedged_stream_chat_completion(messages, route=OPENAI_THEN_GROQ, endpoint='chat', temperature=None,
+                                         max_tokens=None, timeout=None, priority=PRIORITY_CHAT):
+    """
+    Async version of ``hedged_stream_chat_completion``; see there for the arguments.
+
+    Yields:
+        str: Text pieces of the winning provider
+
+    Raises:
+        LLMError: If every provider failed, or the winner broke after its first token
+    """
+    if not settings.LLM_HEDGE_ENABLED or len(route) < 2:
+        async for piece in astream_chat_completion(messages, route=route, temperature=temperature,
+                                                   max_tokens=max_tokens, timeout=timeout, priority=priority):
+            yield piece
+        return
+
+    events = asyncio.Queue()
+    options = {
+        'messages': messages,
+        'temperature': temperature,
+        'max_tokens': max_tokens,
+        'timeout': timeout,
+        'priority': priority,
+    }
+    # Stats rows are written on the rate limiter's bookkeeping pool
+    record = functools.partial(run_blocking, _record)
+    primary_provider, primary_model = route[0]
+    hedge_at = time.monotonic() + settings.LLM_HEDGE_AFTER_SECONDS.get(primary_provider, 0)
+    legs = [_AsyncLeg(primary_provider, primary_model, events, options).start()]
+    hedged = False
+    errors = {}
+    winner = None
+
+    try:
+        while winner is None:
+            wait = None
+            if len(legs) < len(route) and not hedged:
+                wait = max(0.0, hedge_at - time.monotonic())
+            try:
+                kind, leg, payload = await asyncio.wait_for(events.get(), timeout=wait)
+            except asyncio.TimeoutError:
+                provider, model = route[len(legs)]
+                print(f"🔀 No first token from {primary_provider} yet, hedging with {provider}")
+                hedged = True
+                legs.append(_AsyncLeg(provider, model, events, options).start())
+                continue
+
+            if kind == _TOKEN:
+                winner = leg
+                first_piece = payload
+                continue
+
+            errors[leg.provider] = payload if kind == _ERROR else "empty response"
+            if all(l.provider in errors for l in legs):
+                if len(legs) == len(route):
+                    raise LLMError(errors)
+                # Nothing is running: plain fallback to the next provider
+                provider, model = route[len(legs)]
+                legs.append(_AsyncLeg(provider, model, events, options).start())
+
+        for leg in legs:
+            if leg is not winner:
+                leg.cancel()
+
+        hedge_won = hedged and winner is not legs[0]
+        await record(endpoint, calls=1, hedged=int(hedged), hedge_wins=int(hedge_won))
+        if hedge_won:
+            print(f"🏎️ Hedge {winner.provider} beat {primary_provider} on {endpoint}")
+            hedge = winner
+
+            async def record_saving(primary):
+                await record(endpoint, saved_seconds=_saved_seconds(endpoint, primary, hedge))
+
+            if legs[0].ended_at is None:
+                legs[0].on_end = record_saving
+            else:
+                await record_saving(legs[0])
+
+        yield first_piece
+        while True:
+            kind, leg, payload = await events.get()
+            if leg is not winner:
+                continue
+            if kind == _TOKEN:
+                yield payload
+            elif kind == _DONE:
+                return
+            else:
+                raise LLMError({leg.provider: payload})
+    finally:
+        # Consumer went away or everything is settled: stop any leg still running
+        # and wait for it to close its stream and settle its breaker and stats
+        for leg in legs:
+            if not leg.task.done():
+                leg.cancel()
+        for leg in legs:
+            await leg.wait()
+
+
+def get_hedge_stats(days=7):
+    """
+    Hedge counters per endpoint over the last ``days`` days.
+
+    Returns:
+        list[dict]: ``endpoint``, ``calls``, ``hedged``, ``hedge_wins`` and ``saved_seconds``
+    """
+    from main.models import LLMHedgeStat  # Import here to avoid circular imports
+
+    since = timezone.localdate() - timedelta(days=days - 1)
+    return list(
+        LLMHedgeStat.objects.filter(date__gte=since)
+        .values('endpoint')
+        .annotate(
+            calls=Sum('calls'),
+            hedged=Sum('hedged'),
+            hedge_wins=Sum('hedge_wins'),
+            saved_seconds=Sum('saved_seconds'),
+        )
+        .order_by('endpoint')
+    )
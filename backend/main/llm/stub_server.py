@@ -0,0 +1,351 @@
+"""
+Local stand-in for the Groq and OpenAI chat-completions API.
+
+Point ``GROQ_BASE_URL`` / ``OPENAI_BASE_URL`` at it (see ``manage.py
+run_llm_stub``) to benchmark ingest and generation with no network and no
+API keys. It answers ``POST /v1/chat/completions`` (OpenAI) and
+``POST /openai/v1/chat/completions`` (Groq), streaming or not, with:
+
+* canned quiz, flashcards, mindmap and study-pack JSON, recognised from the
+  system prompt, and filler Markdown for summaries and chat;
+* a configurable first-token latency (plus jitter), output speed in tokens
+  per second and error rate.
+
+It also answers ``POST /api/transcripts`` like the youtube-transcript.io
+batch endpoint (point ``YOUTUBE_TRANSCRIPT_API_URL`` at it), with filler
+captions of ``transcript_seconds`` for every requested video ID. Playlist
+enumeration still goes through yt_dlp, so ingest needs network access to
+YouTube for that step.
+
+Only the standard library is used, so the server runs anywhere Django does.
+"""
+
+import json
+import random
+import re
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CHAT_PATHS = ('/v1/chat/completions', '/openai/v1/chat/completions')
+TRANSCRIPT_PATH = '/api/transcripts'
+
+# One filler caption every this many seconds of video
+CAPTION_SECONDS = 5
+
+# ~4 characters per token, like main/utils/summarizer.estimate_tokens
+CHARS_PER_TOKEN = 4
+
+FILLER_SENTENCES = [
+    "The video introduces the main idea and explains why it matters.",
+    "A worked example shows how the concept is applied step by step.",
+    "Common mistakes are discussed together with ways to avoid them.",
+    "The speaker compares two approaches and summarises their trade-offs.",
+    "Finally, the key points are reviewed so they are easy to remember.",
+]
+
+
+class StubConfig:
+    def __init__(self, latency=0.3, jitter=0.0, tokens_per_second=200.0, error_rate=0.0,
+                 error_status=500, max_output_tokens=400, transcript_seconds=600, seed=None):
+        """
+        Args:
+            latency (float): Seconds before the first token (or the whole response)
+            jitter (float): Up to this many seconds are added to ``latency`` at random
+            tokens_per_second (float): Output speed; 0 sends everything at once
+            error_rate (float): Share of requests answered with ``error_status`` (0..1)
+            error_status (int): HTTP status of injected errors, e.g. 500, 503 or 429
+            max_output_tokens (int): Length cap of filler text answers
+            transcript_seconds (int): Length of every stub video and its captions
+            seed (int, optional): Seed for reproducible errors and jitter
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.max_output_tokens = max_output_tokens
+        self.transcript_seconds = transcript_seconds
+        self.random = random.Random(seed)
+
+
+def _quiz(count):
+    return [
+        {
+            "question": f"Which statement about key concept {i + 1} from the video is correct?",
+            "answers": [
+                f"Concept {i + 1} is applied as shown in the example",
+                f"Concept {i + 1} is never used in practice",
+                f"Concept {i + 1} only applies to unrelated topics",
+                f"Concept {i + 1} was not mentioned at all",
+            ],
+            "correct_index": 0,
+        }
+        for i in range(count)
+    ]
+
+
+def _flashcards(count=10):
+    return [
+        {
+            "question": f"What is key concept {i + 1} from the video?",
+            "answer": f"Key concept {i + 1} is one of the main ideas explained with an example in the video.",
+        }
+        for i in range(count)
+    ]
+
+
+def _mindmap():
+    return {
+        "title": "Video Topic",
+        "root": {
+            "message": "Main Subject",
+            "children": [
+                {
+                    "message": f"Category {c + 1}",
+                    "children": [
+                        {
+                            "message": f"Sub-topic {c + 1}.{s + 1}",
+                            "description": f"Explanation of sub-topic {c + 1}.{s + 1} from the video.",
+                        }
+                        for s in range(3)
+                    ],
+                }
+                for c in range(4)
+            ],
+        },
+    }
+
+
+def _filler_text(max_tokens, markdown):
+    sentences = []
+    length = 0
+    i = 0
+    while length < max_tokens * CHARS_PER_TOKEN:
+        sentence = FILLER_SENTENCES[i % len(FILLER_SENTENCES)]
+        sentences.append(f"- {sentence}" if markdown else sentence)
+        length += len(sentence) + 1
+        i += 1
+    if markdown:
+        return "## Summary\n\n" + "\n".join(sentences)
+    return " ".join(sentences)
+
+
+def canned_response(messages, max_tokens=None, config=None):
+    """
+    Pick a plausible answer for a chat request from its prompts.
+
+    Returns:
+        str: Response content
+    """
+    config = config or StubConfig()
+    system = next((m.get("content") or "" for m in messages if m.get("role") == "system"), "")
+    user = next((m.get("content") or "" for m in reversed(messages) if m.get("role") == "user"), "")
+    lowered = system.lower()
+
+    if "one valid json object with these fields" in lowered:
+        fields = re.findall(r'^- "(\w+)"', system, re.MULTILINE)
+        count = re.search(r'exactly (\d+) multiple-choice', system)
+        builders = {
+            "flashcards": _flashcards,
+            "mindmap": _mindmap,
+            "quiz": lambda: _quiz(int(count.group(1)) if count else 5),
+        }
+        return json.dumps({name: builders[name]() for name in fields if name in builders})
+    if "quiz generator" in lowered:
+        count = re.search(r'exactly (\d+)', system)
+        return json.dumps(_quiz(int(count.group(1)) if count else 5))
+    if "flashcards" in lowered:
+        return json.dumps(_flashcards())
+    if "mind map" in lowered:
+        return json.dumps(_mindmap())
+
+    limit = min(max_tokens or config.max_output_tokens, config.max_output_tokens)
+    return _filler_text(limit, markdown="summar" in lowered or "summar" in user.lower())
+
+
+def transcript_payload(video_id, seconds):
+    """
+    Build one video's entry of a transcript batch response.
+
+    Returns:
+        dict: ``id``, ``title``, ``tracks`` with timed captions and the
+        ``microformat`` block ingest reads the video length from
+    """
+    captions = [
+        {
+            "text": FILLER_SENTENCES[i % len(FILLER_SENTENCES)],
+            "start": str(start),
+            "dur": str(CAPTION_SECONDS),
+        }
+        for i, start in enumerate(range(0, seconds, CAPTION_SECONDS))
+    ]
+    return {
+        "id": video_id,
+        "title": f"Stub video {video_id}",
+        "tracks": [{"language": "English", "transcript": captions}],
+        "microformat": {"playerMicroformatRenderer": {"lengthSeconds": str(seconds)}},
+    }
+
+
+def _tokens(content):
+    return [content[i:i + CHARS_PER_TOKEN] for i in range(0, len(content), CHARS_PER_TOKEN)]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, like the real APIs
+    config = StubConfig()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _write_chunk(self, text):
+        data = text.encode()
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def _sleep_latency(self):
+        config = self.config
+        time.sleep(config.latency + config.random.uniform(0, config.jitter))
+
+    def _token_delay(self):
+        return 1.0 / self.config.tokens_per_second if self.config.tokens_per_second > 0 else 0.0
+
+    def do_GET(self):
+        if self.path.rstrip('/').endswith('/models'):
+            self._send_json(200, {"object": "list", "data": []})
+            return
+        self._send_json(404, {"error": {"message": "Not found", "type": "invalid_request_error"}})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError:
+            self._send_json(400, {"error": {"message": "Invalid JSON body", "type": "invalid_request_error"}})
+            return
+
+        if self.path not in CHAT_PATHS and self.path != TRANSCRIPT_PATH:
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}", "type": "invalid_request_error"}})
+            return
+
+        config = self.config
+        if config.error_rate and config.random.random() < config.error_rate:
+            self._sleep_latency()
+            self._send_json(config.error_status, {
+                "error": {"message": "Injected stub error", "type": "server_error", "code": config.error_status}
+            })
+            return
+
+        if self.path == TRANSCRIPT_PATH:
+            self._sleep_latency()
+            ids = [video_id for video_id in request.get("ids") or [] if isinstance(video_id, str)]
+            self._send_json(200, [transcript_payload(video_id, config.transcript_seconds) for video_id in ids])
+            return
+
+        messages = request.get("messages") or []
+        model = request.get("model") or "stub"
+        content = canned_response(messages, request.get("max_tokens"), config)
+        prompt_tokens = sum(len(m.get("content") or "") for m in messages) // CHARS_PER_TOKEN
+        completion_tokens = len(_tokens(content))
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+
+        if request.get("stream"):
+            usage = {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            }
+            # A last chunk with usage, like OpenAI with stream_options.include_usage
+            include_usage = (request.get("stream_options") or {}).get("include_usage")
+            self._stream(content, completion_id, created, model, usage if include_usage else None)
+            return
+
+        self._sleep_latency()
+        time.sleep(completion_tokens * self._token_delay())
+        self._send_json(200, {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        })
+
+    def _stream(self, content, completion_id, created, model, usage=None):
+        def event(delta, finish_reason=None):
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            return f"data: {json.dumps(chunk)}\n\n"
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        delay = self._token_delay()
+        try:
+            self._sleep_latency()
+            self._write_chunk(event({"role": "assistant", "content": ""}))
+            for token in _tokens(content):
+                self._write_chunk(event({"content": token}))
+                if delay:
+                    time.sleep(delay)
+            self._write_chunk(event({}, "stop"))
+            if usage:
+                usage_chunk = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [],
+                    "usage": usage,
+                }
+                self._write_chunk(f"data: {json.dumps(usage_chunk)}\n\n")
+            self._write_chunk("data: [DONE]\n\n")
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # The client cancelled the stream (e.g. a hedge lost)
+            self.close_connection = True
+
+
+class _StubServer(ThreadingHTTPServer):
+    # The default backlog of 5 refuses connections when a benchmark opens hundreds of streams at once
+    request_queue_size = 1024
+
+
+def make_server(host="127.0.0.1", port=8765, config=None):
+    """
+    Build a threaded stub server; call ``serve_forever()`` on it.
+
+    Returns:
+        ThreadingHTTPServer: Server bound to ``host:port``
+    """
+    handler = type("ConfiguredStubHandler", (StubHandler,), {"config": config or StubConfig()})
+    server = _StubServer((host, port), handler)
+    server.daemon_threads = True
+    return server
@@ -0,0 +1,200 @@
+import asyncio
+import os
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from main.llm import OPENAI_THEN_GROQ, ahedged_stream_chat_completion, hedged_stream_chat_completion
+
+BENCH_PROMPT = "In two sentences, what is the main idea of the video about gradient descent?"
+
+
+class _Sampler:
+    """Records the peak thread count and resident memory of this process."""
+
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.peak_threads = threading.active_count()
+        self.peak_rss_mb = self._rss_mb()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="bench-sampler", daemon=True)
+
+    @staticmethod
+    def _rss_mb():
+        # Linux only; other platforms report n/a
+        try:
+            with open('/proc/self/statm') as f:
+                return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+        except (OSError, ValueError):
+            return None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak_threads = max(self.peak_threads, threading.active_count())
+            rss = self._rss_mb()
+            if rss is not None:
+                self.peak_rss_mb = max(self.peak_rss_mb or 0, rss)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+class Command(BaseCommand):
+    help = (
+        "Open many chat streams at once and report how many one process holds: in-process "
+        "(async coroutines vs a thread per stream, against `manage.py run_llm_stub`) or over "
+        "HTTP against a running server (--url)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--streams', type=int, default=500,
+                            help="Concurrent streams to open")
+        parser.add_argument('--mode', choices=['async', 'sync', 'both'], default='both',
+                            help="In-process: coroutines, a thread per stream, or both one after the other")
+        parser.add_argument('--url', default=None,
+                            help="Benchmark a running server instead, e.g. http://127.0.0.1:8001/api/summary-chatbot/")
+        parser.add_argument('--token', default=None,
+                            help="Bearer token for --url")
+        parser.add_argument('--video', default=None,
+                            help="video_uuid sent to --url")
+        parser.add_argument('--message', default=BENCH_PROMPT,
+                            help="Question sent with every stream")
+        parser.add_argument('--timeout', type=float, default=120.0,
+                            help="Seconds a single stream may take")
+
+    def handle(self, *args, **options):
+        streams = options['streams']
+        if streams < 1:
+            raise CommandError("--streams must be at least 1")
+
+        if options['url']:
+            if not options['video']:
+                raise CommandError("--video is required with --url")
+            result = asyncio.run(self._bench_http(options))
+            # Threads and memory of the server are not visible from here
+            self._report(f"HTTP {options['url']}", streams, result, process_stats=False)
+            return
+
+        if not all(settings.LLM_BASE_URLS.get(provider) for provider, _ in OPENAI_THEN_GROQ):
+            raise CommandError(
+                "In-process benchmarks must not hit the real APIs: run `python manage.py run_llm_stub` and set "
+                "GROQ_BASE_URL / OPENAI_BASE_URL (see .env.example)"
+            )
+
+        messages = [{"role": "user", "content": options['message']}]
+        modes = ['async', 'sync'] if options['mode'] == 'both' else [options['mode']]
+        for mode in modes:
+            if mode == 'async':
+                result = asyncio.run(self._bench_async(messages, streams, options['timeout']))
+                self._report("async (one coroutine per stream)", streams, result)
+            else:
+                result = self._bench_sync(messages, streams, options['timeout'])
+                self._report("sync (one thread per stream, like WSGI workers)", streams, result)
+
+    async def _bench_async(self, messages, streams, timeout):
+        started = time.monotonic()
+
+        async def one():
+            begin = time.monotonic()
+            first = None
+            async for _ in ahedged_stream_chat_completion(messages, endpoint='bench_streams', timeout=timeout):
+                if first is None:
+                    first = time.monotonic() - begin
+            return first, time.monotonic() - begin
+
+        with _Sampler() as sampler:
+            outcomes = await asyncio.gather(*(one() for _ in range(streams)), return_exceptions=True)
+        return outcomes, time.monotonic() - started, sampler
+
+    def _bench_sync(self, messages, streams, timeout):
+        started = time.monotonic()
+
+        def one():
+            begin = time.monotonic()
+            first = None
+            for _ in hedged_stream_chat_completion(messages, endpoint='bench_streams', timeout=timeout):
+                if first is None:
+                    first = time.monotonic() - begin
+            return first, time.monotonic() - begin
+
+        def guarded():
+            try:
+                return one()
+            except Exception as e:
+                return e
+
+        with _Sampler() as sampler, ThreadPoolExecutor(max_workers=streams) as pool:
+            outcomes = list(pool.map(lambda _: guarded(), range(streams)))
+        return outcomes, time.monotonic() - started, sampler
+
+    async def _bench_http(self, options):
+        streams = options['streams']
+        headers = {"Content-Type": "application/json"}
+        if options['token']:
+            headers["Authorization"] = f"Bearer {options['token']}"
+        payload = {"video_uuid": options['video'], "user_message": options['message']}
+        limits = httpx.Limits(max_connections=streams, max_keepalive_connections=streams)
+        started = time.monotonic()
+
+        async def one(client):
+            begin = time.monotonic()
+            first = None
+            async with client.stream("POST", options['url'], json=payload, headers=headers) as response:
+                if response.status_code != 200:
+                    await response.aread()
+                    raise RuntimeError(f"HTTP {response.status_code}: {response.text[:200]}")
+                async for line in response.aiter_lines():
+                    if not line.startswith("data: "):
+                        continue
+                    if first is None:
+                        first = time.monotonic() - begin
+                    if line.startswith("data: [Error:"):
+                        raise RuntimeError(line[6:])
+                    if line.strip() == "data: [DONE]":
+                        break
+            return first, time.monotonic() - begin
+
+        with _Sampler() as sampler:
+            async with httpx.AsyncClient(limits=limits, timeout=options['timeout']) as client:
+                outcomes = await asyncio.gather(*(one(client) for _ in range(streams)), return_exceptions=True)
+        return outcomes, time.monotonic() - started, sampler
+
+    def _report(self, label, streams, result, process_stats=True):
+        outcomes, wall, sampler = result
+        ok = [outcome for outcome in outcomes if not isinstance(outcome, BaseException)]
+        failures = [outcome for outcome in outcomes if isinstance(outcome, BaseException)]
+
+        def percentile(values, q):
+            if not values:
+                return float('nan')
+            if len(values) == 1:
+                return values[0]
+            return statistics.quantiles(values, n=100)[q - 1]
+
+        first_tokens = sorted(first for first, _ in ok if first is not None)
+        totals = sorted(total for _, total in ok)
+        rss = f"{sampler.peak_rss_mb:.0f} MB" if sampler.peak_rss_mb is not None else "n/a"
+
+        self.stdout.write(f"\n📊 {label}")
+        self.stdout.write(f"   streams:        {len(ok)}/{streams} completed in {wall:.2f}s")
+        self.stdout.write(
+            f"   first token:    p50 {percentile(first_tokens, 50):.2f}s  p95 {percentile(first_tokens, 95):.2f}s"
+        )
+        self.stdout.write(f"   full answer:    p50 {percentile(totals, 50):.2f}s  p95 {percentile(totals, 95):.2f}s")
+        if process_stats:
+            self.stdout.write(f"   peak threads:   {sampler.peak_threads}")
+            self.stdout.write(f"   peak RSS:       {rss}")
+        if failures:
+            self.stdout.write(self.style.WARNING(f"   failed:         {len(failures)}"))
+            for error in sorted({str(failure)[:160] for failure in failures})[:5]:
+                self.stdout.write(self.style.WARNING(f"     - {error}"))
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from main.models import Playlist, Video
+from main.utils.playlist_index import index_playlist
+from main.utils.transcript_index import save_transcript_index
+
+
+class Command(BaseCommand):
+    help = "Build chatbot retrieval indexes for videos imported before transcript indexes existed"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true',
+                            help="Rebuild every video, not only those without an index")
+        parser.add_argument('--playlists', action='store_true',
+                            help="Also rebuild the cross-video indexes of the playlist chatbot")
+
+    def handle(self, *args, **options):
+        videos = Video.objects.exclude(timecode_transcript__isnull=True)
+        if not options['all']:
+            videos = videos.filter(transcript_index__isnull=True)
+
+        indexed = 0
+        windows = 0
+        for video in videos.iterator():
+            transcript_index = save_transcript_index(video)
+            if transcript_index:
+                indexed += 1
+                windows += transcript_index.window_count
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Indexed {indexed} videos ({windows} transcript windows)"))
+
+        if options['playlists']:
+            playlists = 0
+            passages = 0
+            for playlist in Playlist.objects.iterator():
+                passages += index_playlist(playlist)
+                playlists += 1
+            self.stdout.write(self.style.SUCCESS(f"✅ Indexed {playlists} playlists ({passages} passages)"))
@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from main.models import Video
+from main.utils.transcript_compact import compact_transcript
+
+
+class Command(BaseCommand):
+    help = "Build compacted transcripts for videos imported before transcript compaction existed"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true',
+                            help="Recompute every video, not only those without a compacted transcript")
+
+    def handle(self, *args, **options):
+        videos = Video.objects.exclude(full_transcript__isnull=True).exclude(full_transcript='')
+        if not options['all']:
+            videos = videos.filter(compact_transcript__isnull=True)
+
+        updated = []
+        saved_tokens = 0
+        for video in videos.iterator():
+            text, _, stats = compact_transcript(video.full_transcript, video.timecode_transcript)
+            video.compact_transcript = text
+            video.transcript_tokens = stats['original_tokens']
+            video.compact_transcript_tokens = stats['compact_tokens']
+            saved_tokens += stats['saved_tokens']
+            updated.append(video)
+
+        Video.objects.bulk_update(
+            updated,
+            ['compact_transcript', 'transcript_tokens', 'compact_transcript_tokens'],
+            batch_size=settings.INGEST_BULK_BATCH_SIZE
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Compacted {len(updated)} transcripts, saving ~{saved_tokens} tokens"
+        ))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from main.llm.hedge import get_hedge_stats
+
+
+class Command(BaseCommand):
+    help = "Show how often hedged streaming fired and how much first-token time it saved"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=7,
+                            help="Number of days to report, including today")
+
+    def handle(self, *args, **options):
+        stats = get_hedge_stats(options['days'])
+        if not stats:
+            self.stdout.write("📊 No hedged calls recorded")
+            return
+
+        for row in stats:
+            calls = row['calls'] or 0
+            hedged = row['hedged'] or 0
+            wins = row['hedge_wins'] or 0
+            saved = row['saved_seconds'] or 0.0
+            hedge_rate = 100.0 * hedged / calls if calls else 0.0
+            per_win = saved / wins if wins else 0.0
+            self.stdout.write(
+                f"📊 {row['endpoint']}: {calls} calls, hedged {hedged} ({hedge_rate:.1f}%), "
+                f"hedge won {wins}, saved {saved:.1f}s ({per_win:.2f}s per win)"
+            )
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from main.utils.content_cache import prune_content_cache
+
+
+class Command(BaseCommand):
+    help = "Evict expired transcript/summary cache entries and summaries from old prompt versions"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--invalidate-summaries', action='store_true',
+                            help="Delete every cached summary, e.g. after changing the summarizer model")
+
+    def handle(self, *args, **options):
+        transcripts, summaries = prune_content_cache(options['invalidate_summaries'])
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Removed {transcripts} transcript and {summaries} summary cache entries"
+        ))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from main.llm.cache import get_cache_stats, prune_llm_cache
+from main.utils.quiz_explanation_cache import prune_quiz_explanations
+
+
+class Command(BaseCommand):
+    help = "Evict expired and least recently used LLM response cache entries and quiz explanations"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clear', action='store_true',
+                            help="Delete every cached response, e.g. after changing a prompt")
+        parser.add_argument('--stats', action='store_true',
+                            help="Only print cache size and hit counts")
+
+    def handle(self, *args, **options):
+        if not options['stats']:
+            deleted = prune_llm_cache(options['clear'])
+            self.stdout.write(self.style.SUCCESS(f"✅ Removed {deleted} LLM cache entries"))
+            deleted = prune_quiz_explanations(options['clear'])
+            self.stdout.write(self.style.SUCCESS(f"✅ Removed {deleted} quiz explanations"))
+
+        stats = get_cache_stats()
+        self.stdout.write(f"📊 {stats['entries']} entries, {stats['total_hits']} hits served")
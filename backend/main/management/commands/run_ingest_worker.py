@@ -0,0 +1,57 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from main.utils.ingest_jobs import claim_job, requeue_stale_jobs, run_job
+
+
+class Command(BaseCommand):
+    help = "Process queued playlist ingest jobs from the database"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=settings.INGEST_WORKERS,
+                            help="Number of jobs to run concurrently")
+        parser.add_argument('--poll-interval', type=float, default=2.0,
+                            help="Seconds to wait between polls when the queue is empty")
+        parser.add_argument('--stale-minutes', type=int, default=settings.INGEST_STALE_MINUTES,
+                            help="Requeue running jobs that have not updated for this long")
+        parser.add_argument('--once', action='store_true',
+                            help="Drain the queue and exit instead of polling forever")
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        requeued = requeue_stale_jobs(timedelta(minutes=options['stale_minutes']))
+        if requeued:
+            self.stdout.write(f"🔁 Requeued {requeued} stale ingest jobs")
+
+        self.stdout.write(f"🚀 Ingest worker started with {workers} threads")
+        running = set()
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ingest-worker") as executor:
+            while True:
+                while len(running) < workers:
+                    job = claim_job()
+                    if job is None:
+                        break
+                    running.add(executor.submit(self._run_claimed, job))
+
+                if not running:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+
+                done, running = wait(running, timeout=options['poll_interval'], return_when=FIRST_COMPLETED)
+
+        self.stdout.write(self.style.SUCCESS("✅ Ingest queue drained"))
+
+    @staticmethod
+    def _run_claimed(job):
+        close_old_connections()
+        try:
+            run_job(job)
+        finally:
+            close_old_connections()
@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand
+
+from main.llm.stub_server import StubConfig, make_server
+
+
+class Command(BaseCommand):
+    help = "Serve a local Groq/OpenAI-compatible chat-completions and transcript stub for offline benchmarks"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--latency', type=float, default=0.3,
+                            help="Seconds before the first token")
+        parser.add_argument('--jitter', type=float, default=0.0,
+                            help="Up to this many extra seconds of latency, at random")
+        parser.add_argument('--tokens-per-second', type=float, default=200.0,
+                            help="Output speed; 0 sends the whole answer at once")
+        parser.add_argument('--error-rate', type=float, default=0.0,
+                            help="Share of requests that fail (0..1)")
+        parser.add_argument('--error-status', type=int, default=500,
+                            help="HTTP status of injected errors, e.g. 429 or 503")
+        parser.add_argument('--max-output-tokens', type=int, default=400,
+                            help="Length cap of summary and chat answers")
+        parser.add_argument('--transcript-seconds', type=int, default=600,
+                            help="Length of every stub video's captions")
+        parser.add_argument('--seed', type=int, default=None,
+                            help="Seed for reproducible errors and jitter")
+
+    def handle(self, *args, **options):
+        config = StubConfig(
+            latency=options['latency'],
+            jitter=options['jitter'],
+            tokens_per_second=options['tokens_per_second'],
+            error_rate=options['error_rate'],
+            error_status=options['error_status'],
+            max_output_tokens=options['max_output_tokens'],
+            transcript_seconds=options['transcript_seconds'],
+            seed=options['seed'],
+        )
+        server = make_server(options['host'], options['port'], config)
+        base = f"http://{options['host']}:{options['port']}"
+        self.stdout.write(f"🤖 LLM stub listening on {base}")
+        self.stdout.write(f"   GROQ_BASE_URL={base}")
+        self.stdout.write(f"   OPENAI_BASE_URL={base}/v1")
+        self.stdout.write(f"   YOUTUBE_TRANSCRIPT_API_URL={base}/api/transcripts")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+        self.stdout.write(self.style.SUCCESS("✅ LLM stub stopped"))
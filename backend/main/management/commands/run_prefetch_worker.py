@@ -0,0 +1,25 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from main.utils.prefetch import drain_prefetch_queue, requeue_stale_tasks
+
+
+class Command(BaseCommand):
+    help = "Pre-generate queued flashcards, mindmaps and quizzes from the database"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--stale-minutes', type=int, default=settings.PREFETCH_STALE_MINUTES,
+                            help="Requeue running tasks that have not updated for this long")
+        parser.add_argument('--once', action='store_true',
+                            help="Drain the queue and exit instead of polling forever")
+
+    def handle(self, *args, **options):
+        requeued = requeue_stale_tasks(timedelta(minutes=options['stale_minutes']))
+        if requeued:
+            self.stdout.write(f"🔁 Requeued {requeued} stale prefetch tasks")
+
+        self.stdout.write("🚀 Prefetch worker started")
+        drain_prefetch_queue(stop_when_empty=options['once'])
+        self.stdout.write(self.style.SUCCESS("✅ Prefetch queue drained"))
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.1 on 2026-10-18 13:55
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0003_ingest_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TranscriptCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('video_id', models.CharField(max_length=100, unique=True)),
+                ('transcript_hash', models.CharField(db_index=True, max_length=64)),
+                ('raw_payload', models.JSONField()),
+                ('full_transcript', models.TextField(blank=True, default='')),
+                ('timecode_transcript', models.JSONField(blank=True, null=True)),
+                ('duration_sec', models.PositiveIntegerField(default=0)),
+                ('fetched_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('last_used_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SummaryCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('transcript_hash', models.CharField(max_length=64)),
+                ('model', models.CharField(max_length=100)),
+                ('prompt_version', models.CharField(max_length=50)),
+                ('summary', models.TextField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_used_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+            options={
+                'unique_together': {('transcript_hash', 'model', 'prompt_version')},
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.1 on 2026-10-18 13:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0004_content_cache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingestjob',
+            name='stage_timings',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='ingestjobvideo',
+            name='stage_timings',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.1 on 2026-10-18 13:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0005_ingest_stage_timings'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingestjob',
+            name='kind',
+            field=models.CharField(choices=[('import', 'Import'), ('resync', 'Resync')], default='import', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='ingestjob',
+            name='remove_missing',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='video',
+            name='is_removed',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.1 on 2026-10-18 14:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0007_llm_response_cache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='video',
+            name='compact_transcript',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='video',
+            name='compact_transcript_tokens',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='video',
+            name='transcript_tokens',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.1 on 2026-10-18 14:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0008_video_compact_transcript'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RateLimitBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('provider', models.CharField(max_length=20, unique=True)),
+                ('requests', models.FloatField()),
+                ('tokens', models.FloatField()),
+                ('refilled_at', models.FloatField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.1 on 2026-10-18 14:16
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0009_rate_limit_buckets'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PrefetchTask',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('artifact', models.CharField(choices=[('flashcards', 'Flashcards'), ('mindmap', 'Mind map'), ('quiz', 'Quiz')], max_length=20)),
+                ('priority', models.PositiveSmallIntegerField(db_index=True, default=100)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('skipped', 'Skipped'), ('failed', 'Failed')], db_index=True, default='queued', max_length=20)),
+                ('error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='prefetch_tasks', to=settings.AUTH_USER_MODEL)),
+                ('video', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='prefetch_tasks', to='main.video')),
+            ],
+            options={
+                'ordering': ['priority', 'created_at'],
+                'unique_together': {('video', 'user', 'artifact')},
+            },
+        ),
+    ]
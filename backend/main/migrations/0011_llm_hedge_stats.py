@@ -0,0 +1,29 @@
+# Generated by Django 5.2.1 on 2026-10-18 14:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0010_prefetch_tasks'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LLMHedgeStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('endpoint', models.CharField(max_length=50)),
+                ('date', models.DateField()),
+                ('calls', models.PositiveIntegerField(default=0)),
+                ('hedged', models.PositiveIntegerField(default=0)),
+                ('hedge_wins', models.PositiveIntegerField(default=0)),
+                ('saved_seconds', models.FloatField(default=0.0)),
+            ],
+            options={
+                'ordering': ['-date', 'endpoint'],
+                'unique_together': {('endpoint', 'date')},
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.1 on 2026-10-18 14:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0011_llm_hedge_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TranscriptIndex',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('index', models.JSONField()),
+                ('window_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('video', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='transcript_index', to='main.video')),
+            ],
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.1 on 2026-10-18 14:33
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0013_chat_sessions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuizExplanation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_hash', models.CharField(max_length=64)),
+                ('question_index', models.PositiveIntegerField()),
+                ('answer_index', models.PositiveIntegerField()),
+                ('explanation', models.TextField()),
+                ('source', models.CharField(choices=[('stream', 'Streamed on request'), ('batch', 'Pre-generated after a submission')], default='stream', max_length=10)),
+                ('hit_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_used_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+            options={
+                'unique_together': {('content_hash', 'question_index', 'answer_index')},
+            },
+        ),
+    ]
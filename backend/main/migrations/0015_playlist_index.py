@@ -0,0 +1,40 @@
+# Generated by Django 5.2.1 on 2026-10-18 14:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0014_quiz_explanations'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlaylistPassage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('transcript', 'Transcript'), ('summary', 'Summary')], max_length=20)),
+                ('start', models.FloatField(blank=True, null=True)),
+                ('end', models.FloatField(blank=True, null=True)),
+                ('text', models.TextField()),
+                ('length', models.PositiveIntegerField(default=0)),
+                ('playlist', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='passages', to='main.playlist')),
+                ('video', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='playlist_passages', to='main.video')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PlaylistPosting',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('frequency', models.PositiveIntegerField()),
+                ('passage', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='postings', to='main.playlistpassage')),
+                ('playlist', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='main.playlist')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['playlist', 'term'], name='main_playli_playlis_64897b_idx')],
+            },
+        ),
+    ]
@@ -1,5 +1,6 @@
 import uuid
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
@@ -34,7 +35,11 @@ class Video(models.Model):
     duration_string = models.CharField(max_length=20, null=True, blank=True)
     summary = models.TextField()
     full_transcript = models.TextField(null=True, blank=True)
+    compact_transcript = models.TextField(null=True, blank=True)  # Without rolling-caption repeats, [Music] and fillers
+    transcript_tokens = models.PositiveIntegerField(default=0)  # Estimated tokens of full_transcript
+    compact_transcript_tokens = models.PositiveIntegerField(default=0)  # Estimated tokens of compact_transcript
     timecode_transcript = models.JSONField(null=True, blank=True)
+    is_removed = models.BooleanField(default=False)  # No longer in the YouTube playlist (set by resync)
     playlist = models.ForeignKey(
         Playlist,
         related_name="videos",
@@ -122,5 +127,352 @@ class Quiz(models.Model):
 
     def __str__(self):
         return f"Quiz for {self.quiz_video.title} - {self.user.email}"
-    
-    
\ No newline at end of file
+
+
+class IngestJob(models.Model):
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCEEDED = 'succeeded'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_SUCCEEDED, 'Succeeded'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    KIND_IMPORT = 'import'
+    KIND_RESYNC = 'resync'
+    KIND_CHOICES = [
+        (KIND_IMPORT, 'Import'),
+        (KIND_RESYNC, 'Resync'),
+    ]
+
+    uuid_job = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, default=KIND_IMPORT)
+    remove_missing = models.BooleanField(default=False)  # Resync: delete dropped videos instead of flagging them
+    playlist_url = models.URLField(max_length=500)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_QUEUED, db_index=True)
+    stage = models.CharField(max_length=30, default='queued')
+    total_videos = models.PositiveIntegerField(default=0)
+    processed_videos = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True, default='')
+    stage_timings = models.JSONField(default=dict, blank=True)  # stage -> seconds since the job started
+    user = models.ForeignKey(
+        User,
+        related_name="ingest_jobs",
+        on_delete=models.CASCADE
+    )
+    playlist = models.ForeignKey(
+        Playlist,
+        related_name="ingest_jobs",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Ingest {self.uuid_job} ({self.status}) - {self.user.email}"
+
+
+class IngestJobVideo(models.Model):
+    STAGE_PENDING = 'pending'
+    STAGE_TRANSCRIPT = 'transcript'
+    STAGE_SUMMARIZING = 'summarizing'
+    STAGE_SUMMARIZED = 'summarized'
+    STAGE_SAVED = 'saved'
+    STAGE_SKIPPED = 'skipped'
+    STAGE_FAILED = 'failed'
+    STAGE_CHOICES = [
+        (STAGE_PENDING, 'Pending'),
+        (STAGE_TRANSCRIPT, 'Transcript fetched'),
+        (STAGE_SUMMARIZING, 'Summarizing'),
+        (STAGE_SUMMARIZED, 'Summarized'),
+        (STAGE_SAVED, 'Saved'),
+        (STAGE_SKIPPED, 'Skipped'),
+        (STAGE_FAILED, 'Failed'),
+    ]
+
+    job = models.ForeignKey(
+        IngestJob,
+        related_name="videos",
+        on_delete=models.CASCADE
+    )
+    position = models.PositiveIntegerField()
+    video_id = models.CharField(max_length=100)
+    title = models.CharField(max_length=255)
+    stage = models.CharField(max_length=20, choices=STAGE_CHOICES, default=STAGE_PENDING)
+    error = models.TextField(blank=True, default='')
+    stage_timings = models.JSONField(default=dict, blank=True)  # stage -> seconds since the job started
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['position']
+        unique_together = ['job', 'video_id']
+
+    def __str__(self):
+        return f"{self.video_id} [{self.stage}] - job {self.job.uuid_job}"
+
+
+class TranscriptCache(models.Model):
+    """Transcript payloads shared by every user who imports the same video."""
+    video_id = models.CharField(max_length=100, unique=True)
+    transcript_hash = models.CharField(max_length=64, db_index=True)
+    raw_payload = models.JSONField()
+    full_transcript = models.TextField(blank=True, default='')
+    timecode_transcript = models.JSONField(null=True, blank=True)
+    duration_sec = models.PositiveIntegerField(default=0)
+    fetched_at = models.DateTimeField(default=timezone.now, db_index=True)
+    last_used_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Transcript cache {self.video_id}"
+
+
+class SummaryCache(models.Model):
+    """Generated summaries keyed by transcript content, model and prompt version."""
+    transcript_hash = models.CharField(max_length=64)
+    model = models.CharField(max_length=100)
+    prompt_version = models.CharField(max_length=50)
+    summary = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        unique_together = ['transcript_hash', 'model', 'prompt_version']
+
+    def __str__(self):
+        return f"Summary cache {self.transcript_hash[:12]} ({self.model}, v{self.prompt_version})"
+
+
+class LLMResponseCache(models.Model):
+    """Chat completion responses keyed by provider, model, temperature and prompt hashes."""
+    cache_key = models.CharField(max_length=64, unique=True)
+    provider = models.CharField(max_length=20)
+    model = models.CharField(max_length=100)
+    temperature = models.FloatField(null=True, blank=True)
+    system_hash = models.CharField(max_length=64)
+    user_hash = models.CharField(max_length=64)
+    response = models.TextField()
+    hit_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f"LLM cache {self.cache_key[:12]} ({self.provider}/{self.model})"
+
+
+class QuizExplanation(models.Model):
+    """Explanation of one answer of a quiz, shared by every user with the same quiz (see main/utils/quiz_explanation_cache.py)."""
+    SOURCE_STREAM = 'stream'
+    SOURCE_BATCH = 'batch'
+    SOURCE_CHOICES = [
+        (SOURCE_STREAM, 'Streamed on request'),
+        (SOURCE_BATCH, 'Pre-generated after a submission'),
+    ]
+
+    content_hash = models.CharField(max_length=64)  # Questions, answers and video summary
+    question_index = models.PositiveIntegerField()
+    answer_index = models.PositiveIntegerField()
+    explanation = models.TextField()
+    source = models.CharField(max_length=10, choices=SOURCE_CHOICES, default=SOURCE_STREAM)
+    hit_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        unique_together = ['content_hash', 'question_index', 'answer_index']
+
+    def __str__(self):
+        return f"Explanation {self.content_hash[:12]} Q{self.question_index + 1}/A{self.answer_index + 1}"
+
+
+class RateLimitBucket(models.Model):
+    """Shared token-bucket state of one LLM provider (see main/utils/rate_limit.py)."""
+    provider = models.CharField(max_length=20, unique=True)
+    requests = models.FloatField()
+    tokens = models.FloatField()
+    refilled_at = models.FloatField()  # Unix timestamp of the last refill
+
+    def __str__(self):
+        return f"{self.provider}: {self.requests:.1f} requests, {self.tokens:.0f} tokens"
+
+
+class PrefetchTask(models.Model):
+    """One flashcards/mindmap/quiz pre-generation queued after ingest (see main/utils/prefetch.py)."""
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_SKIPPED = 'skipped'  # Already generated, or taken over by a user request
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_SKIPPED, 'Skipped'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    ARTIFACT_CHOICES = [
+        ('flashcards', 'Flashcards'),
+        ('mindmap', 'Mind map'),
+        ('quiz', 'Quiz'),
+    ]
+
+    video = models.ForeignKey(
+        Video,
+        related_name="prefetch_tasks",
+        on_delete=models.CASCADE
+    )
+    user = models.ForeignKey(
+        User,
+        related_name="prefetch_tasks",
+        on_delete=models.CASCADE
+    )
+    artifact = models.CharField(max_length=20, choices=ARTIFACT_CHOICES)
+    priority = models.PositiveSmallIntegerField(default=100, db_index=True)  # Lower runs first
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_QUEUED, db_index=True)
+    error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['video', 'user', 'artifact']
+        ordering = ['priority', 'created_at']
+
+    def __str__(self):
+        return f"Prefetch {self.artifact} ({self.status}) - {self.video.title}"
+
+
+class LLMHedgeStat(models.Model):
+    """Daily hedged-streaming counters of one endpoint (see main/llm/hedge.py)."""
+    endpoint = models.CharField(max_length=50)
+    date = models.DateField()
+    calls = models.PositiveIntegerField(default=0)
+    hedged = models.PositiveIntegerField(default=0)  # A second provider was started
+    hedge_wins = models.PositiveIntegerField(default=0)  # ...and answered first
+    saved_seconds = models.FloatField(default=0.0)  # First-token time saved by hedge wins
+
+    class Meta:
+        unique_together = ['endpoint', 'date']
+        ordering = ['-date', 'endpoint']
+
+    def __str__(self):
+        return f"{self.endpoint} {self.date}: {self.hedged}/{self.calls} hedged"
+
+
+class PlaylistPassage(models.Model):
+    """A transcript window or summary chunk of a video, searchable across its playlist (see main/utils/playlist_index.py)."""
+    KIND_TRANSCRIPT = 'transcript'
+    KIND_SUMMARY = 'summary'
+    KIND_CHOICES = [
+        (KIND_TRANSCRIPT, 'Transcript'),
+        (KIND_SUMMARY, 'Summary'),
+    ]
+
+    playlist = models.ForeignKey(
+        Playlist,
+        related_name="passages",
+        on_delete=models.CASCADE
+    )
+    video = models.ForeignKey(
+        Video,
+        related_name="playlist_passages",
+        on_delete=models.CASCADE
+    )
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    start = models.FloatField(null=True, blank=True)  # Seconds; None for untimed text
+    end = models.FloatField(null=True, blank=True)
+    text = models.TextField()
+    length = models.PositiveIntegerField(default=0)  # Indexed terms, for BM25 length normalisation
+
+    def __str__(self):
+        return f"{self.kind} passage of {self.video.title}"
+
+
+class PlaylistPosting(models.Model):
+    """One term of a passage; the inverted index of a playlist."""
+    playlist = models.ForeignKey(Playlist, on_delete=models.CASCADE)  # Denormalised for the lookup index
+    passage = models.ForeignKey(
+        PlaylistPassage,
+        related_name="postings",
+        on_delete=models.CASCADE
+    )
+    term = models.CharField(max_length=64)
+    frequency = models.PositiveIntegerField()
+
+    class Meta:
+        indexes = [models.Index(fields=['playlist', 'term'])]
+
+
+class TranscriptIndex(models.Model):
+    """BM25 index of a video's timecoded transcript windows (see main/utils/transcript_index.py)."""
+    video = models.OneToOneField(
+        Video,
+        related_name="transcript_index",
+        on_delete=models.CASCADE
+    )
+    index = models.JSONField()
+    window_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Index of {self.video.title} ({self.window_count} windows)"
+
+
+class ChatSession(models.Model):
+    """A summary-chatbot conversation of one user about one video (see main/utils/chat_memory.py)."""
+    uuid_session = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
+    user = models.ForeignKey(
+        User,
+        related_name="chat_sessions",
+        on_delete=models.CASCADE
+    )
+    video = models.ForeignKey(
+        Video,
+        related_name="chat_sessions",
+        on_delete=models.CASCADE
+    )
+    running_summary = models.TextField(blank=True, default='')  # Compressed turns older than the window
+    summarized_until = models.PositiveIntegerField(default=0)  # ID of the last message folded into the summary
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-updated_at']
+
+    def __str__(self):
+        return f"Chat {self.uuid_session} - {self.video.title}"
+
+
+class ChatMessage(models.Model):
+    ROLE_USER = 'user'
+    ROLE_ASSISTANT = 'assistant'
+    ROLE_CHOICES = [
+        (ROLE_USER, 'User'),
+        (ROLE_ASSISTANT, 'Assistant'),
+    ]
+
+    session = models.ForeignKey(
+        ChatSession,
+        related_name="messages",
+        on_delete=models.CASCADE
+    )
+    role = models.CharField(max_length=20, choices=ROLE_CHOICES)
+    content = models.TextField()
+    tokens = models.PositiveIntegerField(default=0)  # Estimated
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+
+    def __str__(self):
+        return f"{self.role}: {self.content[:50]}"
@@ -1,7 +1,7 @@
 from rest_framework import serializers
 
 from rest_framework import serializers
-from main.models import Flashcard, MindMap, Playlist, Video, Quiz
+from main.models import ChatMessage, ChatSession, Flashcard, MindMap, Playlist, Video, Quiz, IngestJob, IngestJobVideo
 
 
 class PlaylistSerializer(serializers.ModelSerializer):
@@ -22,7 +22,7 @@ class VideoSerializer(serializers.ModelSerializer):
 class VideoListSerializer(serializers.ModelSerializer):
     class Meta:
         model = Video
-        fields = ['uuid_video', 'title', 'thumbnail', 'duration_sec', 'url']
+        fields = ['uuid_video', 'title', 'thumbnail', 'duration_sec', 'url', 'is_removed']
 
 
 # Lightweight serializer for playlist with minimal video data
@@ -60,4 +60,35 @@ class QuizSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
+class IngestJobVideoSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = IngestJobVideo
+        fields = ['position', 'video_id', 'title', 'stage', 'error', 'stage_timings', 'updated_at']
+
+
+class IngestJobSerializer(serializers.ModelSerializer):
+    videos = IngestJobVideoSerializer(many=True, read_only=True)
+    playlist_uuid = serializers.UUIDField(source='playlist.uuid_playlist', read_only=True, default=None)
+
+    class Meta:
+        model = IngestJob
+        fields = [
+            'uuid_job', 'kind', 'playlist_url', 'status', 'stage', 'total_videos',
+            'processed_videos', 'error', 'stage_timings', 'playlist_uuid', 'created_at',
+            'started_at', 'finished_at', 'videos'
+        ]
+
 
+class ChatMessageSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ChatMessage
+        fields = ['role', 'content', 'created_at']
+
+
+class ChatSessionSerializer(serializers.ModelSerializer):
+    messages = ChatMessageSerializer(many=True, read_only=True)
+    video_uuid = serializers.UUIDField(source='video.uuid_video', read_only=True)
+
+    class Meta:
+        model = ChatSession
+        fields = ['uuid_session', 'video_uuid', 'running_summary', 'created_at', 'updated_at', 'messages']
@@ -1,3 +1,289 @@
-from django.test import TestCase
+import asyncio
+import json
+from unittest import mock
 
-# Create your tests here.
+from django.test import SimpleTestCase, override_settings
+
+from main.llm import LLMError
+from main.llm.breaker import CircuitBreaker
+from main.utils.json_stream import ANY_INDEX, JSONStreamParser, StructuredStream
+from main.utils.rate_limit import (
+    PRIORITY_CHAT, MemoryBackend, RateLimiter, RateLimitExceeded, _refill, _take
+)
+
+QUIZ_JSON = '[{"question": "Q1", "answers": ["a", "b"]}, {"question": "Q2 \\"quoted\\" }", "answers": ["c"]}]'
+
+ROUTE = (('groq', 'groq-model'), ('openai', 'openai-model'))
+
+
+def _validate(item, index):
+    if 'question' not in item:
+        raise ValueError("missing question")
+    return item
+
+
+class JSONStreamParserTests(SimpleTestCase):
+    def feed_all(self, parser, text, size=3):
+        items = []
+        for i in range(0, len(text), size):
+            items.extend(value for _, value in parser.feed(text[i:i + size]))
+        return items
+
+    def test_emits_items_as_they_close(self):
+        parser = JSONStreamParser((ANY_INDEX,))
+        self.assertEqual(parser.feed('[{"question": "Q1"}, {"quest'), [((0,), {"question": "Q1"})])
+        self.assertEqual(parser.feed('ion": "Q2"}]'), [((1,), {"question": "Q2"})])
+        self.assertTrue(parser.done)
+        self.assertEqual(parser.document(), [{"question": "Q1"}, {"question": "Q2"}])
+
+    def test_braces_inside_strings_and_surrounding_prose_are_ignored(self):
+        parser = JSONStreamParser((ANY_INDEX,))
+        items = self.feed_all(parser, f"Here is the quiz:\n```json\n{QUIZ_JSON}\n```\nEnjoy!")
+        self.assertEqual([item["question"] for item in items], ["Q1", 'Q2 "quoted" }'])
+        self.assertTrue(parser.done)
+
+    def test_cut_off_output_keeps_complete_items_only(self):
+        parser = JSONStreamParser((ANY_INDEX,))
+        items = self.feed_all(parser, QUIZ_JSON[:QUIZ_JSON.index('Q2') + 4])
+        self.assertEqual(items, [{"question": "Q1", "answers": ["a", "b"]}])
+        self.assertFalse(parser.done)
+        self.assertIsNone(parser.document())
+
+    def test_nested_item_path_and_scalars(self):
+        parser = JSONStreamParser(('root', 'children', ANY_INDEX))
+        text = '{"title": "Map", "root": {"message": "M", "children": [{"message": "A"}, {"message": "B"}]}}'
+        items = self.feed_all(parser, text)
+        self.assertEqual(items, [{"message": "A"}, {"message": "B"}])
+        self.assertEqual(parser.scalars[("title",)], "Map")
+
+
+@override_settings(LLM_CACHE_ENABLED=False)
+class StructuredStreamTests(SimpleTestCase):
+    def run_stream(self, outputs, recover=None):
+        """``outputs`` maps provider to its text pieces, or to an exception raised after them."""
+        def fake_stream(messages, route, **kwargs):
+            provider = route[0][0]
+            pieces, error = outputs[provider]
+            yield from pieces
+            if error:
+                raise error
+
+        with mock.patch('main.utils.json_stream.stream_chat_completion', side_effect=fake_stream):
+            stream = StructuredStream([], (ANY_INDEX,), _validate, route=ROUTE, recover=recover)
+            items = list(stream)
+        return stream, items
+
+    def test_complete_response(self):
+        stream, items = self.run_stream({'groq': ([QUIZ_JSON[:20], QUIZ_JSON[20:]], None)})
+        self.assertEqual(len(items), 2)
+        self.assertEqual(stream.provider, 'groq')
+        self.assertTrue(stream.complete)
+        self.assertFalse(stream.salvaged)
+
+    def test_cut_off_response_keeps_items_but_is_not_complete(self):
+        stream, items = self.run_stream({'groq': ([QUIZ_JSON[:QUIZ_JSON.index('Q2')]], None)})
+        self.assertEqual([item["question"] for item in items], ["Q1"])
+        self.assertEqual(stream.provider, 'groq')
+        self.assertFalse(stream.complete)
+
+    def test_broken_stream_after_items_does_not_fall_back(self):
+        stream, items = self.run_stream({
+            'groq': ([QUIZ_JSON[:QUIZ_JSON.index('Q2')]], LLMError({'groq': 'connection reset'})),
+            'openai': ([QUIZ_JSON], None),
+        })
+        self.assertEqual(len(items), 1)
+        self.assertEqual(stream.provider, 'groq')
+        self.assertFalse(stream.complete)
+
+    def test_falls_back_when_first_provider_yields_no_valid_item(self):
+        stream, items = self.run_stream({
+            'groq': (['[{"wrong": 1}]'], None),
+            'openai': ([QUIZ_JSON], None),
+        })
+        self.assertEqual(len(items), 2)
+        self.assertEqual(stream.provider, 'openai')
+        self.assertEqual(stream.errors['groq'], "no valid items in response")
+
+    def test_salvaged_output_is_marked(self):
+        text = '{"1": {"question": "Q1"}, "2": {"question": "Q2"}}'
+        stream, items = self.run_stream(
+            {'groq': ([text], None)}, recover=lambda buffer: list(json.loads(buffer).values())
+        )
+        self.assertEqual(len(items), 2)
+        self.assertTrue(stream.salvaged)
+        self.assertTrue(stream.complete)
+
+    def test_collect_raises_when_no_provider_produced_items(self):
+        with mock.patch('main.utils.json_stream.stream_chat_completion', side_effect=LLMError({'x': 'down'})):
+            stream = StructuredStream([], (ANY_INDEX,), _validate, route=ROUTE)
+            with self.assertRaises(LLMError):
+                stream.collect()
+        self.assertEqual(set(stream.errors), {'groq', 'openai'})
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch('main.llm.breaker.time.monotonic', side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.breaker = CircuitBreaker(failure_threshold=2, reset_seconds=30)
+
+    def open_breaker(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+
+    def test_opens_after_threshold_consecutive_failures(self):
+        self.breaker.record_failure()
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.STATE_OPEN)
+        self.assertFalse(self.breaker.allow())
+
+    def test_success_resets_the_failure_count(self):
+        self.breaker.record_failure()
+        self.breaker.record_success()
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.STATE_CLOSED)
+
+    def test_half_open_allows_a_single_trial(self):
+        self.open_breaker()
+        self.now += 30
+        self.assertTrue(self.breaker.allow())
+        self.assertEqual(self.breaker.state, CircuitBreaker.STATE_HALF_OPEN)
+        self.assertFalse(self.breaker.allow())
+
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, CircuitBreaker.STATE_CLOSED)
+        self.assertTrue(self.breaker.allow())
+
+    def test_failed_trial_reopens(self):
+        self.open_breaker()
+        self.now += 30
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.STATE_OPEN)
+        self.assertFalse(self.breaker.allow())
+
+    def test_release_hands_the_trial_to_the_next_call(self):
+        self.open_breaker()
+        self.now += 30
+        self.assertTrue(self.breaker.allow())
+        self.breaker.release()
+        self.assertEqual(self.breaker.state, CircuitBreaker.STATE_OPEN)
+        self.assertTrue(self.breaker.allow())
+
+    def test_abandoned_trial_is_replaced_after_reset_seconds(self):
+        self.open_breaker()
+        self.now += 30
+        self.assertTrue(self.breaker.allow())
+        self.now += 29
+        self.assertFalse(self.breaker.allow())
+        self.now += 1
+        self.assertTrue(self.breaker.allow())
+        self.assertFalse(self.breaker.allow())
+
+    def test_release_is_a_no_op_when_closed(self):
+        self.breaker.release()
+        self.assertEqual(self.breaker.state, CircuitBreaker.STATE_CLOSED)
+
+
+class TokenBucketTests(SimpleTestCase):
+    limits = (60, 6000)
+
+    def bucket(self, requests=60.0, tokens=6000.0, refilled_at=0.0):
+        return {'requests': requests, 'tokens': tokens, 'refilled_at': refilled_at}
+
+    def test_refill_is_proportional_to_elapsed_time(self):
+        bucket = self.bucket(requests=0.0, tokens=0.0)
+        _refill(bucket, 10.0, self.limits)
+        self.assertEqual(bucket, {'requests': 10.0, 'tokens': 1000.0, 'refilled_at': 10.0})
+
+    def test_refill_is_capped_at_the_limits(self):
+        bucket = self.bucket(requests=59.0, tokens=5990.0)
+        _refill(bucket, 600.0, self.limits)
+        self.assertEqual((bucket['requests'], bucket['tokens']), (60.0, 6000.0))
+
+    def test_refill_ignores_a_clock_going_backwards(self):
+        bucket = self.bucket(requests=5.0, tokens=500.0, refilled_at=10.0)
+        _refill(bucket, 5.0, self.limits)
+        self.assertEqual((bucket['requests'], bucket['tokens']), (5.0, 500.0))
+
+    def test_take_draws_from_both_buckets(self):
+        bucket = self.bucket()
+        self.assertEqual(_take(bucket, 0.0, self.limits, 100, 0.0), 0.0)
+        self.assertEqual((bucket['requests'], bucket['tokens']), (59.0, 5900.0))
+
+    def test_take_returns_the_refill_wait(self):
+        bucket = self.bucket(requests=60.0, tokens=0.0)
+        self.assertAlmostEqual(_take(bucket, 0.0, self.limits, 500, 0.0), 5.0)
+        self.assertEqual(bucket['tokens'], 0.0)
+
+    def test_reserve_keeps_budget_for_higher_priorities(self):
+        bucket = self.bucket(requests=60.0, tokens=1500.0)
+        # 30% of 6000 must stay free on top of the 100 tokens asked for
+        self.assertGreater(_take(bucket, 0.0, self.limits, 100, 0.3), 0.0)
+        self.assertEqual(_take(bucket, 0.0, self.limits, 100, 0.0), 0.0)
+
+    def test_oversized_call_runs_once_the_bucket_is_full(self):
+        bucket = self.bucket()
+        self.assertEqual(_take(bucket, 0.0, self.limits, 50000, 0.0), 0.0)
+        self.assertEqual(bucket['tokens'], 0.0)
+
+
+class MemoryBackendTests(SimpleTestCase):
+    def test_buckets_start_full_and_persist_per_provider(self):
+        backend = MemoryBackend()
+        limits = (60, 6000)
+        backend.update('groq', limits, lambda bucket, now: bucket.update(tokens=100.0))
+        self.assertEqual(backend.update('groq', limits, lambda bucket, now: bucket['tokens']), 100.0)
+        self.assertEqual(backend.update('openai', limits, lambda bucket, now: bucket['tokens']), 6000.0)
+
+
+@override_settings(LLM_RATE_LIMITS={'groq': 60}, LLM_TOKEN_LIMITS={'groq': 6000})
+class RateLimiterTests(SimpleTestCase):
+    def setUp(self):
+        self.limiter = RateLimiter('groq', MemoryBackend())
+
+    def tokens(self):
+        return self.limiter.backend.buckets['groq']['tokens']
+
+    def test_acquire_takes_from_the_bucket(self):
+        self.limiter.acquire(tokens=1000)
+        self.assertAlmostEqual(self.tokens(), 5000, delta=1)
+
+    def test_acquire_raises_when_the_wait_exceeds_the_priority_limit(self):
+        self.limiter.drain()
+        # A full bucket takes 60s to refill; chat calls wait at most 10s
+        with self.assertRaises(RateLimitExceeded):
+            self.limiter.acquire(tokens=6000, priority=PRIORITY_CHAT)
+
+    def test_acquire_waits_for_a_short_refill(self):
+        self.limiter.drain()
+        self.limiter.backend.buckets['groq']['refilled_at'] = 0.0
+        with mock.patch('main.utils.rate_limit.time.sleep') as sleep, \
+                mock.patch('main.utils.rate_limit.time.time', side_effect=[0.0, 2.0]):
+            self.limiter.acquire(tokens=10, priority=PRIORITY_CHAT)
+        sleep.assert_called_once_with(1.0)
+
+    def test_adjust_charges_and_refunds_within_bounds(self):
+        self.limiter.adjust(1000)
+        self.assertAlmostEqual(self.tokens(), 5000, delta=1)
+        self.limiter.adjust(-100000)
+        self.assertEqual(self.tokens(), 6000)
+        self.limiter.adjust(100000)
+        self.assertEqual(self.tokens(), -6000)
+
+    def test_drain_empties_the_buckets(self):
+        self.limiter.drain()
+        self.assertLess(self.limiter.available(), 0.01)
+
+    def test_async_path_updates_memory_backend_inline(self):
+        async def run():
+            await self.limiter.aacquire(tokens=1000)
+            await self.limiter.aadjust(500)
+
+        with mock.patch('main.utils.rate_limit.run_blocking') as run_blocking:
+            asyncio.run(run())
+        run_blocking.assert_not_called()
+        self.assertAlmostEqual(self.tokens(), 4500, delta=1)
@@ -1,24 +1,41 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
+
+# Under ASGI the chat streams are served by coroutines instead of worker threads
+if settings.ASGI_STREAMING:
+    summary_chatbot_view = async_views.summary_chatbot
+    playlist_chatbot_view = async_views.playlist_chatbot
+    quiz_explanation_view = async_views.quiz_explanation
+else:
+    summary_chatbot_view = views.SummaryChatbotAPIView.as_view()
+    playlist_chatbot_view = views.PlaylistChatbotAPIView.as_view()
+    quiz_explanation_view = views.QuizExplanationAPIView.as_view()
 
 urlpatterns = [
     # Playlists and videos
     path('playlists/', views.PlaylistAPIView.as_view(), name='playlist-list-create'),
     path('playlists/<uuid:playlist_uuid>/', views.PlaylistDetailAPIView.as_view(), name='playlist-detail'),
     path('playlists/<uuid:playlist_uuid>/videos/', views.PlaylistVideosListAPIView.as_view(), name='playlist-videos-list'),
+    path('playlists/<uuid:playlist_uuid>/resync/', views.PlaylistResyncAPIView.as_view(), name='playlist-resync'),
     path('videos/<uuid:video_uuid>/', views.VideoDetailAPIView.as_view(), name='video-detail'),
+    path('ingest-jobs/<uuid:job_uuid>/', views.IngestJobDetailAPIView.as_view(), name='ingest-job-detail'),
+    path('ingest-jobs/<uuid:job_uuid>/events/', views.IngestJobEventsAPIView.as_view(), name='ingest-job-events'),
     
     # My courses
     path('my-courses/', views.MyCoursesAPIView.as_view(), name='my-courses'),
     path('my-courses/<uuid:playlist_id>/delete/', views.MyCourseDeleteAPIView.as_view(), name='my-course-delete'),
     
     # AI Features
-    path('summary-chatbot/', views.SummaryChatbotAPIView.as_view(), name='summary-chatbot'),
+    path('summary-chatbot/', summary_chatbot_view, name='summary-chatbot'),
+    path('summary-chatbot/sessions/<uuid:session_uuid>/', views.ChatSessionDetailAPIView.as_view(), name='chat-session-detail'),
+    path('playlist-chatbot/', playlist_chatbot_view, name='playlist-chatbot'),
     path('flashcards/', views.GenerateFlashCardsView.as_view(), name='flashcards'),
     path('mindmap/', views.GenerateMindMapView.as_view(), name='mindmap'),
     path('quiz/', views.GenerateQuizView.as_view(), name='quiz'),
     path('quiz/submit/', views.SubmitQuizResultsView.as_view(), name='quiz-submit'),
-    path('quiz/explain/', views.QuizExplanationAPIView.as_view(), name='quiz-explain'),
+    path('quiz/explain/', quiz_explanation_view, name='quiz-explain'),
+    path('study-pack/', views.StudyPackView.as_view(), name='study-pack'),
 ]
 
 
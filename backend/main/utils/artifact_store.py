@@ -0,0 +1,51 @@
+"""
+Conditional saves of generated study materials.
+
+A user request and a prefetch task may generate the same artifact at the
+same time. The first result to be saved is kept: a later one never
+overwrites a filled artifact, so a quiz cannot change under a user who has
+started answering it.
+"""
+
+from django.db import IntegrityError, transaction
+
+
+def save_if_empty(model, lookup, field, data, **fields):
+    """
+    Store ``data`` in ``field`` of the row matching ``lookup``, unless that
+    row already has content.
+
+    Args:
+        model: Flashcard, MindMap or Quiz
+        lookup (dict): Identifies the user's artifact, e.g. ``{'quiz_video': video, 'user': user}``
+        field (str): JSON field holding the artifact
+        data: Generated artifact
+        **fields: Other fields to set along with it
+
+    Returns:
+        tuple: ``(obj, saved)``; when ``saved`` is False, ``obj`` holds the
+        artifact that was saved first
+    """
+    try:
+        with transaction.atomic():
+            obj = model.objects.select_for_update().filter(**lookup).first()
+            if obj is None:
+                return model.objects.create(**lookup, **{field: data}, **fields), True
+            if getattr(obj, field):
+                return obj, False
+            setattr(obj, field, data)
+            for name, value in fields.items():
+                setattr(obj, name, value)
+            obj.save()
+            return obj, True
+    except IntegrityError:
+        # Created concurrently by the other writer
+        return model.objects.get(**lookup), False
+
+
+def delete_if_empty(model, lookup, field):
+    """Drop the placeholder row of a failed generation, unless another writer has filled it since."""
+    with transaction.atomic():
+        obj = model.objects.select_for_update().filter(**lookup).first()
+        if obj is not None and not getattr(obj, field):
+            obj.delete()
@@ -0,0 +1,176 @@
+"""
+Server-side memory for the summary chatbot.
+
+Each ``ChatSession`` stores the turns of one user's conversation about one
+video. A prompt carries the newest turns verbatim, up to
+``CHAT_HISTORY_MAX_TOKENS``, plus a running summary of everything older.
+After each answer, turns that have fallen out of that window are folded into
+the summary by a small LLM call on a background thread, so prompt size stays
+bounded however long the conversation gets.
+
+A question and its answer are stored together once the answer has been
+streamed; a failed answer leaves no dangling question in the history.
+"""
+
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.shortcuts import get_object_or_404
+
+from main.llm import GROQ_THEN_OPENAI, LLMError, chat_completion
+from main.models import ChatMessage, ChatSession
+from main.utils.prompts.chatbot_prompt import get_conversation_context_prompt, get_conversation_summary_prompt
+from main.utils.summarizer import estimate_tokens
+
+# One worker: compressions run one at a time, so a session is never folded twice at once
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="chat-memory")
+    return _executor
+
+
+def get_or_create_session(user, video, session_uuid=None):
+    """
+    Resume the user's session for this video, or start a new one.
+
+    Args:
+        user: Django user object
+        video: Video the conversation is about
+        session_uuid (str, optional): Session to resume
+
+    Returns:
+        ChatSession: The session
+
+    Raises:
+        ValueError: If ``session_uuid`` is not a valid UUID
+        Http404: If ``session_uuid`` is not a session of this user and video
+    """
+    if session_uuid:
+        try:
+            uuid.UUID(str(session_uuid))
+        except ValueError:
+            raise ValueError("session_uuid must be a valid UUID")
+        return get_object_or_404(ChatSession, uuid_session=session_uuid, user=user, video=video)
+    return ChatSession.objects.create(user=user, video=video)
+
+
+def add_message(session, role, content):
+    message = ChatMessage.objects.create(
+        session=session, role=role, content=content, tokens=estimate_tokens(content)
+    )
+    # Bumps updated_at, so the latest conversation sorts first
+    session.save(update_fields=['updated_at'])
+    return message
+
+
+def add_turn(session, question, answer):
+    """Store a question together with its answer, so neither is kept without the other."""
+    with transaction.atomic():
+        add_message(session, ChatMessage.ROLE_USER, question)
+        add_message(session, ChatMessage.ROLE_ASSISTANT, answer)
+
+
+def _window(session):
+    """Newest not yet summarized messages that fit in CHAT_HISTORY_MAX_TOKENS, oldest first."""
+    window = []
+    budget = settings.CHAT_HISTORY_MAX_TOKENS
+    for message in session.messages.filter(id__gt=session.summarized_until).order_by('-id').iterator():
+        if message.tokens > budget:
+            break
+        window.append(message)
+        budget -= message.tokens
+    window.reverse()
+    return window
+
+
+def history_messages(session):
+    """
+    Chat messages that put the conversation so far in front of a new question.
+
+    Returns:
+        list[dict]: Optional system message with the running summary, then the
+        window of recent turns as user/assistant messages
+    """
+    messages = []
+    if session.running_summary:
+        messages.append({"role": "system", "content": get_conversation_context_prompt(session.running_summary)})
+    messages.extend({"role": message.role, "content": message.content} for message in _window(session))
+    return messages
+
+
+def compress_history(session):
+    """
+    Fold turns that have left the window into the running summary.
+
+    Runs after an answer has been streamed. If the LLM call fails, the turns
+    stay unsummarized and are retried after the next answer.
+
+    Returns:
+        int: Number of messages folded in
+    """
+    window = _window(session)
+    oldest_kept = window[0].id if window else None
+    pending = session.messages.filter(id__gt=session.summarized_until)
+    if oldest_kept is not None:
+        pending = pending.filter(id__lt=oldest_kept)
+    # Oldest first, a bounded batch per call (the rest is folded after the next answer)
+    batch = []
+    batch_tokens = 0
+    for message in pending.order_by('id').iterator():
+        if batch and batch_tokens + message.tokens > 2 * settings.CHAT_HISTORY_MAX_TOKENS:
+            break
+        batch.append(message)
+        batch_tokens += message.tokens
+    pending = batch
+    if not pending:
+        return 0
+
+    turns = "\n".join(
+        f"{'User' if message.role == ChatMessage.ROLE_USER else 'Assistant'}: {message.content}"
+        for message in pending
+    )
+    max_tokens = settings.CHAT_SUMMARY_MAX_TOKENS
+    prompt = get_conversation_summary_prompt(session.running_summary, turns, max_words=max_tokens * 3 // 4)
+    try:
+        result = chat_completion(
+            [{"role": "user", "content": prompt}],
+            route=GROQ_THEN_OPENAI,
+            temperature=0.2,
+            max_tokens=max_tokens,
+            cache=False
+        )
+    except LLMError as e:
+        print(f"⚠️ Could not compress chat history of session {session.uuid_session}: {str(e)}")
+        return 0
+
+    session.running_summary = result.content
+    session.summarized_until = pending[-1].id
+    session.save(update_fields=['running_summary', 'summarized_until', 'updated_at'])
+    print(f"🗜️ Folded {len(pending)} chat messages into the summary of session {session.uuid_session}")
+    return len(pending)
+
+
+def _compress_in_background(session_id):
+    close_old_connections()
+    try:
+        session = ChatSession.objects.filter(id=session_id).first()
+        if session:
+            compress_history(session)
+    except Exception as e:
+        print(f"❌ Chat history compression failed: {str(e)}")
+    finally:
+        close_old_connections()
+
+
+def schedule_compression(session):
+    """Queue ``compress_history`` for the session without blocking the caller."""
+    _get_executor().submit(_compress_in_background, session.id)
@@ -0,0 +1,133 @@
+"""
+Cross-user cache for transcripts and summaries.
+
+``Video`` rows are per user, but the transcript of a YouTube video and the
+summary generated from it are not. Entries are keyed by YouTube ``video_id``
+(transcripts) and by transcript hash + model + prompt version (summaries).
+"""
+
+import hashlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError
+from django.db.models import Q
+from django.utils import timezone
+
+from main.models import TranscriptCache, SummaryCache
+from main.utils.prompts.summarizer_prompt import SUMMARY_PROMPT_VERSION
+
+
+def transcript_hash(transcript: str) -> str:
+    return hashlib.sha256((transcript or "").encode("utf-8")).hexdigest()
+
+
+def _transcript_cutoff():
+    return timezone.now() - timedelta(days=settings.TRANSCRIPT_CACHE_TTL_DAYS)
+
+
+def _summary_cutoff():
+    return timezone.now() - timedelta(days=settings.SUMMARY_CACHE_TTL_DAYS)
+
+
+def get_cached_transcripts(video_ids):
+    """
+    Look up fresh transcript payloads for the given videos.
+
+    Args:
+        video_ids (list[str]): YouTube video IDs
+
+    Returns:
+        dict: Raw youtube-transcript.io payload by video ID, for cache hits only
+    """
+    entries = TranscriptCache.objects.filter(
+        video_id__in=video_ids,
+        fetched_at__gte=_transcript_cutoff()
+    )
+    payloads = {entry.video_id: entry.raw_payload for entry in entries}
+    if payloads:
+        TranscriptCache.objects.filter(video_id__in=payloads.keys()).update(last_used_at=timezone.now())
+    return payloads
+
+
+def store_transcripts(payloads, transcripts_by_id, timecodes_by_id, durations_by_id):
+    """
+    Save freshly fetched transcript payloads. Videos without a transcript are
+    not cached so captions added later are picked up on the next import.
+    """
+    now = timezone.now()
+    for payload in payloads or []:
+        video_id = payload.get('id')
+        transcript = transcripts_by_id.get(video_id, "")
+        if not video_id or not transcript.strip():
+            continue
+
+        TranscriptCache.objects.update_or_create(
+            video_id=video_id,
+            defaults={
+                'transcript_hash': transcript_hash(transcript),
+                'raw_payload': payload,
+                'full_transcript': transcript,
+                'timecode_transcript': timecodes_by_id.get(video_id),
+                'duration_sec': durations_by_id.get(video_id, 0),
+                'fetched_at': now,
+                'last_used_at': now,
+            }
+        )
+
+
+def get_cached_summary(transcript: str, model: str):
+    """
+    Return the cached summary for a transcript under the current prompt version.
+
+    Returns:
+        str | None: The summary, or None on a miss
+    """
+    entry = SummaryCache.objects.filter(
+        transcript_hash=transcript_hash(transcript),
+        model=model,
+        prompt_version=SUMMARY_PROMPT_VERSION,
+        last_used_at__gte=_summary_cutoff()
+    ).first()
+    if entry is None:
+        return None
+
+    entry.last_used_at = timezone.now()
+    entry.save(update_fields=['last_used_at'])
+    return entry.summary
+
+
+def store_summary(transcript: str, model: str, summary: str):
+    try:
+        SummaryCache.objects.update_or_create(
+            transcript_hash=transcript_hash(transcript),
+            model=model,
+            prompt_version=SUMMARY_PROMPT_VERSION,
+            defaults={'summary': summary, 'last_used_at': timezone.now()}
+        )
+    except IntegrityError:
+        # Another worker stored the same summary first
+        pass
+
+
+def prune_content_cache(invalidate_summaries=False):
+    """
+    Delete expired transcripts and summaries, plus summaries produced by an
+    older prompt version.
+
+    Args:
+        invalidate_summaries (bool): Drop every cached summary regardless of age
+
+    Returns:
+        tuple[int, int]: Number of deleted transcript and summary entries
+    """
+    transcripts_deleted, _ = TranscriptCache.objects.filter(fetched_at__lt=_transcript_cutoff()).delete()
+
+    if invalidate_summaries:
+        summaries_deleted, _ = SummaryCache.objects.all().delete()
+    else:
+        summaries_deleted, _ = SummaryCache.objects.filter(
+            Q(last_used_at__lt=_summary_cutoff()) | ~Q(prompt_version=SUMMARY_PROMPT_VERSION)
+        ).delete()
+
+    return transcripts_deleted, summaries_deleted
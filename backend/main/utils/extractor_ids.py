@@ -1,45 +1,94 @@
+import threading
+import time
+from urllib.parse import urlparse, parse_qs
+
 import yt_dlp
+from django.conf import settings
 
-def fetch_playlist_info(playlist_url: str):
+_playlist_cache = {}
+_playlist_cache_lock = threading.Lock()
+
+
+def _playlist_cache_key(playlist_url: str):
+    """Key playlists by their list ID so different URL forms share one entry."""
+    list_ids = parse_qs(urlparse(playlist_url).query).get("list")
+    return list_ids[0] if list_ids else playlist_url
+
+
+def _extract_playlist(playlist_url: str):
     opts = {"quiet": True, "extract_flat": True, "skip_download": True, "no_warnings": True}
     with yt_dlp.YoutubeDL(opts) as ydl:
         pl = ydl.extract_info(playlist_url, download=False)
 
+    entries = [v for v in (pl.get("entries") or []) if v and v.get("id")]
+
     # Try first video thumbnail
     thumbnail = ""
-    if "entries" in pl and pl["entries"]:
-        first_video = pl["entries"][0]
-        if "id" in first_video:
-            thumbnail = f"https://img.youtube.com/vi/{first_video['id']}/maxresdefault.jpg"
+    if entries:
+        thumbnail = f"https://img.youtube.com/vi/{entries[0]['id']}/maxresdefault.jpg"
 
     return {
-        "id": pl.get("id"),
-        "title": pl.get("title", "Без названия"),
-        "url": playlist_url,
-        "playlist_thumbnail": thumbnail,
+        "info": {
+            "id": pl.get("id"),
+            "title": pl.get("title", "Без названия"),
+            "url": playlist_url,
+            "playlist_thumbnail": thumbnail,
+        },
+        "videos": [
+            {
+                "id": v["id"],
+                "title": v["title"],
+                "url": f"https://www.youtube.com/watch?v={v['id']}",
+                "thumbnail": f"https://img.youtube.com/vi/{v['id']}/maxresdefault.jpg",
+                # Flat extraction usually includes the length; None when YouTube omits it
+                "duration": int(v["duration"]) if v.get("duration") else None,
+            }
+            for v in entries
+        ],
     }
 
 
+def fetch_playlist(playlist_url: str, use_cache: bool = True):
+    """
+    Enumerate a playlist once and return its metadata together with its videos.
 
+    Results are kept in an in-process cache for ``PLAYLIST_CACHE_TTL_SECONDS``
+    so retries and repeat imports do not hit YouTube again.
 
+    Args:
+        playlist_url (str): YouTube playlist URL
+        use_cache (bool): Set to False to force a fresh extraction
 
-def fetch_playlist_videos(playlist_url: str):
-    opts = {"quiet": True, "extract_flat": True, "skip_download": True, "no_warnings": True}
-    with yt_dlp.YoutubeDL(opts) as ydl:
-        pl = ydl.extract_info(playlist_url, download=False)
+    Returns:
+        dict: ``{"info": {...}, "videos": [...]}``
+    """
+    key = _playlist_cache_key(playlist_url)
+    now = time.monotonic()
+
+    if use_cache:
+        with _playlist_cache_lock:
+            cached = _playlist_cache.get(key)
+            if cached and cached[0] > now:
+                print(f"🗄️ Using cached playlist enumeration for {key}")
+                return cached[1]
+
+    playlist = _extract_playlist(playlist_url)
 
-    return [
-        {
-            "id": v["id"],
-            "title": v["title"],
-            "url": f"https://www.youtube.com/watch?v={v['id']}",
-            "thumbnail": f"https://img.youtube.com/vi/{v['id']}/maxresdefault.jpg",
-        }
-        for v in pl.get("entries", [])
-    ]
+    with _playlist_cache_lock:
+        # Drop expired entries so the cache cannot grow without bound
+        for stale_key in [k for k, (expires, _) in _playlist_cache.items() if expires <= now]:
+            del _playlist_cache[stale_key]
+        _playlist_cache[key] = (now + settings.PLAYLIST_CACHE_TTL_SECONDS, playlist)
 
+    return playlist
 
 
+def fetch_playlist_info(playlist_url: str):
+    return fetch_playlist(playlist_url)["info"]
+
+
+def fetch_playlist_videos(playlist_url: str):
+    return fetch_playlist(playlist_url)["videos"]
 
 
 if __name__ == '__main__':
@@ -1,14 +1,27 @@
-import json
-import os
-from groq import Groq
-from openai import OpenAI
+from main.llm import LLMError
+from .artifact_store import delete_if_empty, save_if_empty
+from .json_stream import ANY_INDEX, StructuredStream
+from .rate_limit import PRIORITY_FLASHCARDS
 from .prompts.flashcards_prompt import get_system_prompt, get_user_prompt
+from .transcript_compact import prompt_transcript
 
-# Initialize API clients
-groq_client = Groq(api_key=os.getenv("GROQ_API_KEY"))
-openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
-def generate_flashcards_from_transcript(video, user):
+def validate_flashcard(card, index=0):
+    if not isinstance(card, dict) or "question" not in card or "answer" not in card:
+        raise ValueError(f"Invalid flashcard {index + 1}: {card}")
+    return card
+
+
+def validate_flashcards(flashcards_data):
+    """Raise ValueError unless the data is a list of question/answer cards."""
+    if not isinstance(flashcards_data, list):
+        raise ValueError("Flashcards must be a list")
+    for index, card in enumerate(flashcards_data):
+        validate_flashcard(card, index)
+    return flashcards_data
+
+
+def generate_flashcards_from_transcript(video, user, priority=PRIORITY_FLASHCARDS):
     from ..models import Flashcard  # Import here to avoid circular imports
     
     # Check if flashcards already exist for this video and user
@@ -30,61 +43,38 @@ def generate_flashcards_from_transcript(video, user):
         raise ValueError("No transcript available for this video")
     
     system_prompt = get_system_prompt()
-    user_prompt = get_user_prompt(video.full_transcript)
-
-    # Try Groq first (faster and cheaper)
-    try:
-        print("🚀 Trying Groq API...")
-        response = groq_client.chat.completions.create(
-            model="llama-3.1-8b-instant",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
-            temperature=0.7,
-            max_tokens=2000,
-        )
-        
-        result = response.choices[0].message.content.strip()
-        print("✅ Groq API successful")
-        
-    except Exception as groq_error:
-        print(f"❌ Groq API failed: {groq_error}")
-        print("🔄 Falling back to OpenAI...")
-        
-        # Fallback to OpenAI
-        try:
-            response = openai_client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt},
-                ],
-                temperature=0.7,
-            )
-            
-            result = response.choices[0].message.content.strip()
-            print("✅ OpenAI API successful")
-            
-        except Exception as openai_error:
-            raise ValueError(f"Both APIs failed. Groq: {groq_error}, OpenAI: {openai_error}")
+    user_prompt = get_user_prompt(prompt_transcript(video))
 
+    # Groq first (faster and cheaper), OpenAI as fallback. Cards are parsed
+    # as they stream in, so a cut-off response keeps every complete card
+    stream = StructuredStream(
+        [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt},
+        ],
+        item_path=(ANY_INDEX,),
+        validate_item=validate_flashcard,
+        temperature=0.7,
+        max_tokens={"groq": 2000},
+        priority=priority,
+    )
     try:
-        flashcards_data = json.loads(result)
-        assert isinstance(flashcards_data, list)
-        for card in flashcards_data:
-            assert "question" in card and "answer" in card
-        
-        # Save the generated flashcards to the database
-        flashcard_obj.flashcards_json = flashcards_data
-        flashcard_obj.save()
-        
-        print(f"✅ Generated and saved {len(flashcards_data)} flashcards")
-        return flashcards_data, True
-        
-    except Exception as e:
-        # If parsing failed, delete the empty flashcard object if it was just created
+        flashcards_data = stream.collect()
+    except LLMError as e:
+        # Nothing was generated, drop the empty flashcard object if it was just created
         if created:
-            flashcard_obj.delete()
-        raise ValueError(f"Failed to parse flashcards: {e}\nRaw output: {result}")
+            delete_if_empty(Flashcard, {'flashcard_video': video, 'user': user}, 'flashcards_json')
+        raise ValueError(f"Failed to generate flashcards: {e}")
+
+    if not stream.complete:
+        print(f"⚠️ Flashcards output was cut off, keeping {len(flashcards_data)} cards")
+    print(f"✅ Flashcards generated with {stream.provider}")
+
+    # Save the generated flashcards unless a prefetch saved its own meanwhile
+    flashcard_obj, saved = save_if_empty(Flashcard, {'flashcard_video': video, 'user': user}, 'flashcards_json', flashcards_data)
+    if not saved:
+        print(f"✅ Kept the flashcards saved meanwhile for video: {video.title}")
+        return flashcard_obj.flashcards_json, False
 
+    print(f"✅ Generated and saved {len(flashcards_data)} flashcards")
+    return flashcards_data, True
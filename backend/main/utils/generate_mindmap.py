@@ -1,11 +1,12 @@
-import json
-import os
-from groq import Groq
-from openai import OpenAI
+from main.llm import LLMError
+from .artifact_store import delete_if_empty, save_if_empty
+from .json_stream import ANY_INDEX, StructuredStream
+from .rate_limit import PRIORITY_MINDMAP
 from .prompts.mindmap_prompt import get_system_prompt
+from .transcript_compact import prompt_transcript
 
 
-def generate_mindmap_from_video(video, user):
+def generate_mindmap_from_video(video, user, priority=PRIORITY_MINDMAP):
     """
     Generate mindmap from video transcript, similar to flashcards logic.
     Returns mindmap data and whether it was newly created.
@@ -32,28 +33,30 @@ def generate_mindmap_from_video(video, user):
     
     try:
         # Generate mindmap data using the transcript
-        mindmap_data = generate_mindmap_from_transcript(video.full_transcript)
-        
-        # Save the generated mindmap to the database
-        mindmap_obj.mindmap_json = mindmap_data
-        mindmap_obj.save()
-        
-        print(f"✅ Generated and saved mindmap")
-        return mindmap_data, True
-        
+        mindmap_data = generate_mindmap_from_transcript(prompt_transcript(video), priority)
     except Exception as e:
         # If generation failed, delete the empty mindmap object if it was just created
         if created:
-            mindmap_obj.delete()
+            delete_if_empty(MindMap, {'mindmap_video': video, 'user': user}, 'mindmap_json')
         raise ValueError(f"Failed to generate mindmap: {e}")
 
+    # Save the generated mindmap unless a prefetch saved its own meanwhile
+    mindmap_obj, saved = save_if_empty(MindMap, {'mindmap_video': video, 'user': user}, 'mindmap_json', mindmap_data)
+    if not saved:
+        print(f"✅ Kept the mindmap saved meanwhile for video: {video.title}")
+        return mindmap_obj.mindmap_json, False
 
-def generate_mindmap_from_transcript(transcript):
+    print(f"✅ Generated and saved mindmap")
+    return mindmap_data, True
+
+
+def generate_mindmap_from_transcript(transcript, priority=PRIORITY_MINDMAP):
     """
     Generate a detailed mindmap from video transcript using AI.
     
     Args:
         transcript (str): The full transcript of the video
+        priority (str): Rate limit priority, see ``rate_limit.py``
         
     Returns:
         dict: Generated mindmap in JSON format
@@ -83,64 +86,37 @@ def generate_mindmap_from_transcript(transcript):
     Generate the mind map as valid JSON following the specified format.
     """
     
-    # Try Groq first
+    # Groq first, OpenAI as fallback. Categories are parsed as the response
+    # streams in, so a cut-off mindmap keeps every complete category
+    stream = StructuredStream(
+        [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ],
+        item_path=('root', 'children', ANY_INDEX),
+        validate_item=validate_mindmap_category,
+        temperature=0.7,
+        max_tokens={"groq": 1500, "openai": 4000},
+        priority=priority,
+    )
     try:
-        print("🧠 Attempting to generate mindmap with Groq...")
-        groq_client = Groq(api_key=os.getenv('GROQ_API_KEY'))
-        
-        response = groq_client.chat.completions.create(
-            model="llama-3.1-8b-instant",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            temperature=0.7,
-            max_tokens=1500,
-        )
-        
-        mindmap_text = response.choices[0].message.content.strip()
-        
-        # Parse and validate JSON
-        try:
-            mindmap_data = json.loads(mindmap_text)
-            print("✅ Mindmap generated successfully with Groq")
-            return mindmap_data
-        except json.JSONDecodeError as e:
-            print(f"❌ Groq returned invalid JSON: {e}")
-            raise Exception(f"Groq returned invalid JSON: {e}")
-            
-    except Exception as e:
-        print(f"❌ Groq failed: {str(e)}")
-        print("🔄 Falling back to OpenAI...")
-        
-        # Fallback to OpenAI
-        try:
-            openai_client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
-            
-            response = openai_client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.7,
-                max_tokens=4000,
-            )
-            
-            mindmap_text = response.choices[0].message.content.strip()
-            
-            # Parse and validate JSON
-            try:
-                mindmap_data = json.loads(mindmap_text)
-                print("✅ Mindmap generated successfully with OpenAI")
-                return mindmap_data
-            except json.JSONDecodeError as e:
-                print(f"❌ OpenAI returned invalid JSON: {e}")
-                raise Exception(f"OpenAI returned invalid JSON: {e}")
-                
-        except Exception as openai_error:
-            print(f"❌ OpenAI also failed: {str(openai_error)}")
-            raise Exception(f"Both Groq and OpenAI failed to generate mindmap. Groq: {str(e)}, OpenAI: {str(openai_error)}")
+        categories = stream.collect()
+    except LLMError as e:
+        raise Exception(f"Both Groq and OpenAI failed to generate mindmap. {str(e)}")
+
+    mindmap_data = stream.parser.document()
+    if not validate_mindmap_structure(mindmap_data):
+        # Output stopped part-way: rebuild the map around the categories that did arrive
+        print(f"⚠️ Mindmap output was cut off, keeping {len(categories)} categories")
+        scalars = stream.parser.scalars
+        message = scalars.get(('root', 'message')) or scalars.get(('title',)) or "Mind Map"
+        mindmap_data = {
+            "title": scalars.get(('title',)) or message,
+            "root": {"message": message, "children": categories},
+        }
+
+    print(f"✅ Mindmap generated successfully with {stream.provider}")
+    return mindmap_data
 
 
 def validate_mindmap_structure(mindmap_data):
@@ -171,17 +147,34 @@ def validate_mindmap_structure(mindmap_data):
             return False
             
         # Validate each category
-        for category in children:
-            if not isinstance(category, dict) or 'message' not in category:
-                return False
-                
-            # Each category should have children (sub-nodes)
-            if 'children' in category:
-                for sub_node in category['children']:
-                    if not isinstance(sub_node, dict) or 'message' not in sub_node:
-                        return False
+        for index, category in enumerate(children):
+            validate_mindmap_category(category, index)
                         
         return True
         
     except Exception:
         return False
+
+
+def validate_mindmap_category(category, index=0):
+    """
+    Validate one category node of the mindmap root.
+
+    Returns:
+        dict: The category
+
+    Raises:
+        ValueError: If the category or one of its sub-nodes has no message
+    """
+    if not isinstance(category, dict) or 'message' not in category:
+        raise ValueError(f"Category {index + 1} has no message")
+
+    # Each category should have children (sub-nodes)
+    if 'children' in category:
+        if not isinstance(category['children'], list):
+            raise ValueError(f"Category {index + 1} children must be a list")
+        for sub_node in category['children']:
+            if not isinstance(sub_node, dict) or 'message' not in sub_node:
+                raise ValueError(f"Category {index + 1} has a sub-node without a message")
+
+    return category
@@ -0,0 +1,127 @@
+"""
+Server-sent event stream for playlist ingest progress.
+"""
+
+import json
+import time
+
+from django.conf import settings
+
+from main.models import IngestJob, IngestJobVideo
+from main.utils.sse import DONE, Frame, sse_stream
+
+# Event names sent to the client for each per-video stage
+VIDEO_STAGE_EVENTS = {
+    IngestJobVideo.STAGE_PENDING: 'enumerated',
+    IngestJobVideo.STAGE_TRANSCRIPT: 'transcript_fetched',
+    IngestJobVideo.STAGE_SUMMARIZING: 'summarizing',
+    IngestJobVideo.STAGE_SUMMARIZED: 'summarized',
+    IngestJobVideo.STAGE_SAVED: 'saved',
+    IngestJobVideo.STAGE_SKIPPED: 'skipped',
+    IngestJobVideo.STAGE_FAILED: 'failed',
+}
+
+FINISHED_STATUSES = (IngestJob.STATUS_SUCCEEDED, IngestJob.STATUS_FAILED)
+
+
+def _event(payload):
+    return Frame(json.dumps(payload, default=str))
+
+
+def _new_stages(timings, seen):
+    """
+    Stages recorded in ``timings`` that are not in ``seen`` yet, in the order they happened.
+
+    ``seen`` holds ``(stage, timing)`` pairs: a stage run again after a requeue
+    records a new timing, so it is reported again.
+    """
+    new = sorted(
+        (stage for stage, timing in timings.items() if (stage, timing) not in seen),
+        key=lambda stage: timings[stage] or 0
+    )
+    seen.update((stage, timings[stage]) for stage in new)
+    return new
+
+
+def _job_event(job, stage, status):
+    return _event({
+        "type": "job",
+        "status": status,
+        "stage": stage,
+        "processed_videos": job.processed_videos,
+        "total_videos": job.total_videos,
+        "playlist_uuid": job.playlist.uuid_playlist if job.playlist_id else None,
+        "error": job.error if stage == job.stage else "",
+        "timings": job.stage_timings,
+    })
+
+
+def _video_event(job_video, stage):
+    return _event({
+        "type": VIDEO_STAGE_EVENTS.get(stage, stage),
+        "video_id": job_video.video_id,
+        "title": job_video.title,
+        "position": job_video.position,
+        "error": job_video.error if stage == job_video.stage else "",
+        "timings": job_video.stage_timings,
+    })
+
+
+def ingest_job_event_stream(job_id):
+    """
+    Stream job and per-video progress until the job finishes.
+
+    Each event is a JSON object with a ``type`` field (``job`` or a per-video
+    event such as ``transcript_fetched``) and the stage timings recorded so
+    far, in seconds since the job started. Every recorded stage gets its
+    event, in order, even one that started and ended between two polls, and
+    again each time it is recorded anew (e.g. after the job was requeued).
+
+    Args:
+        job_id (int): Primary key of the IngestJob
+
+    Returns:
+        generator: Formatted SSE data, with keepalive comments while nothing changes
+    """
+    return sse_stream(_job_events(job_id))
+
+
+def _job_events(job_id):
+    poll_interval = settings.INGEST_EVENTS_POLL_SECONDS
+    deadline = time.monotonic() + settings.INGEST_EVENTS_TIMEOUT_SECONDS
+    last_job_state = None
+    job_stages = set()
+    last_video_states = {}
+    video_stages = {}
+
+    while True:
+        job = IngestJob.objects.get(id=job_id)
+        job_state = (job.status, job.stage, job.processed_videos, job.total_videos)
+        new_stages = _new_stages(job.stage_timings, job_stages)
+        if job_state != last_job_state or new_stages:
+            last_job_state = job_state
+            # Stages passed since the last poll; the job was running through them
+            for stage in new_stages:
+                if stage != job.stage:
+                    yield _job_event(job, stage, IngestJob.STATUS_RUNNING)
+            yield _job_event(job, job.stage, job.status)
+
+        for job_video in job.videos.all():
+            video_state = (job_video.stage, job_video.error)
+            new_stages = _new_stages(job_video.stage_timings, video_stages.setdefault(job_video.video_id, set()))
+            if last_video_states.get(job_video.video_id) == video_state and not new_stages:
+                continue
+            last_video_states[job_video.video_id] = video_state
+            for stage in new_stages:
+                if stage != job_video.stage:
+                    yield _video_event(job_video, stage)
+            yield _video_event(job_video, job_video.stage)
+
+        if job.status in FINISHED_STATUSES:
+            break
+        if time.monotonic() > deadline:
+            yield _event({"type": "timeout", "status": job.status})
+            break
+        time.sleep(poll_interval)
+
+    yield DONE
@@ -0,0 +1,183 @@
+"""
+Postgres-backed job queue for playlist ingestion.
+
+Jobs are rows in ``IngestJob``. Workers claim them with
+``SELECT ... FOR UPDATE SKIP LOCKED`` so the in-process thread pool and the
+``run_ingest_worker`` management command can share the same table without a
+separate broker.
+
+A job whose worker died with its process stays ``running`` until it is
+requeued: ``run_ingest_worker`` does so at start, and with
+``INGEST_RUN_IN_PROCESS`` ``recover_stale_jobs`` does it whenever jobs are
+created or polled.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from main.models import IngestJob
+from main.utils.playlist_ingest import IngestError, mark_job_finished, run_playlist_ingest
+from main.utils.prefetch import enqueue_prefetch
+
+# In-process recovery runs at most this often per process
+RECOVERY_INTERVAL_SECONDS = 60
+
+_executor = None
+_executor_lock = threading.Lock()
+_last_recovery = None
+_recovery_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.INGEST_WORKERS,
+                thread_name_prefix="ingest"
+            )
+    return _executor
+
+
+def create_ingest_job(user, playlist_url: str, kind=IngestJob.KIND_IMPORT, playlist=None, remove_missing=False):
+    """
+    Persist a new queued job and hand it to the worker pool once the
+    surrounding transaction commits.
+
+    Args:
+        user: Django user object
+        playlist_url (str): YouTube playlist URL
+        kind (str): ``IngestJob.KIND_IMPORT`` or ``IngestJob.KIND_RESYNC``
+        playlist (Playlist, optional): Playlist to resync
+        remove_missing (bool): Resync only; delete videos dropped from YouTube
+
+    Returns:
+        IngestJob: The queued job
+    """
+    job = IngestJob.objects.create(
+        user=user,
+        playlist_url=playlist_url,
+        kind=kind,
+        playlist=playlist,
+        remove_missing=remove_missing
+    )
+    if settings.INGEST_RUN_IN_PROCESS:
+        transaction.on_commit(lambda: _get_executor().submit(run_job_by_id, job.id))
+        recover_stale_jobs()
+    return job
+
+
+def claim_job(job_id=None):
+    """
+    Atomically move one queued job to ``running``.
+
+    Args:
+        job_id (int, optional): Claim this job only; otherwise the oldest queued one
+
+    Returns:
+        IngestJob | None: The claimed job, or None if nothing was available
+    """
+    with transaction.atomic():
+        queryset = IngestJob.objects.select_for_update(skip_locked=True).filter(
+            status=IngestJob.STATUS_QUEUED
+        )
+        if job_id is not None:
+            queryset = queryset.filter(id=job_id)
+        job = queryset.order_by('created_at').first()
+        if job is None:
+            return None
+
+        job.status = IngestJob.STATUS_RUNNING
+        job.started_at = timezone.now()
+        job.save(update_fields=['status', 'started_at', 'updated_at'])
+    return job
+
+
+def run_job(job):
+    """Run a claimed job to completion and record its final status."""
+    print(f"🚀 Starting ingest job {job.uuid_job} for {job.playlist_url}")
+    try:
+        run_playlist_ingest(job)
+        mark_job_finished(job, IngestJob.STATUS_SUCCEEDED)
+        print(f"✅ Ingest job {job.uuid_job} finished")
+    except IngestError as e:
+        print(f"❌ {e}")
+        mark_job_finished(job, IngestJob.STATUS_FAILED, str(e))
+        return
+    except Exception as e:
+        print(f"❌ Ingest job {job.uuid_job} failed: {str(e)}")
+        mark_job_finished(job, IngestJob.STATUS_FAILED, str(e))
+        return
+
+    if settings.PREFETCH_ENABLED and job.playlist_id:
+        try:
+            enqueue_prefetch(job.playlist, job.user)
+        except Exception as e:
+            # Prefetch is an optimization; the ingest itself succeeded
+            print(f"⚠️ Could not queue study material prefetch: {str(e)}")
+
+
+def run_job_by_id(job_id):
+    close_old_connections()
+    try:
+        job = claim_job(job_id)
+        if job is not None:
+            run_job(job)
+    finally:
+        close_old_connections()
+
+
+def requeue_stale_jobs(older_than):
+    """
+    Return jobs stuck in ``running`` (e.g. after a worker restart) to the queue.
+
+    Args:
+        older_than (timedelta): Minimum time since the job's last update
+
+    Returns:
+        int: Number of requeued jobs
+    """
+    cutoff = timezone.now() - older_than
+    return IngestJob.objects.filter(
+        status=IngestJob.STATUS_RUNNING,
+        updated_at__lt=cutoff
+    ).update(status=IngestJob.STATUS_QUEUED, stage='queued')
+
+
+def recover_stale_jobs():
+    """
+    In-process mode: requeue jobs left ``running`` by a process that is gone
+    and run them, along with queued jobs nobody picked up, on this process's
+    pool. Cheap to call often; it only queries every RECOVERY_INTERVAL_SECONDS.
+
+    Returns:
+        int: Number of jobs handed to the pool
+    """
+    global _last_recovery
+    if not settings.INGEST_RUN_IN_PROCESS:
+        return 0
+    with _recovery_lock:
+        now = time.monotonic()
+        if _last_recovery is not None and now - _last_recovery < RECOVERY_INTERVAL_SECONDS:
+            return 0
+        _last_recovery = now
+
+    older_than = timedelta(minutes=settings.INGEST_STALE_MINUTES)
+    requeued = requeue_stale_jobs(older_than)
+    if requeued:
+        print(f"🔁 Requeued {requeued} stale ingest jobs")
+    # Requeueing does not touch updated_at. Claiming is atomic, so a job that
+    # another process still has in its pool only runs once.
+    job_ids = list(IngestJob.objects.filter(
+        status=IngestJob.STATUS_QUEUED,
+        updated_at__lt=timezone.now() - older_than
+    ).values_list('id', flat=True))
+    for job_id in job_ids:
+        _get_executor().submit(run_job_by_id, job_id)
+    return len(job_ids)
@@ -0,0 +1,314 @@
+"""
+Incremental JSON parsing for streamed LLM output.
+
+``JSONStreamParser`` is fed completion text as it arrives and hands back
+each object at a chosen path (e.g. every quiz question in the top-level
+array) as soon as its closing brace is seen. ``StructuredStream`` runs a
+streamed completion through the parser with per-item validation, so a
+response cut off part-way still yields every item that was complete.
+"""
+
+import json
+
+from django.conf import settings
+
+from main.llm import GROQ_THEN_OPENAI, LLMError, stream_chat_completion
+from main.llm import cache as response_cache
+from main.utils.rate_limit import PRIORITY_CHAT
+
+# Matches any array index in an item path, e.g. ('root', 'children', ANY_INDEX)
+ANY_INDEX = '*'
+
+
+class _Frame:
+    def __init__(self, kind, start, path):
+        self.kind = kind  # '{' or '['
+        self.start = start
+        self.path = path
+        self.key = None
+        self.index = -1
+        self.expect_key = kind == '{'
+        self.awaiting_value = kind == '['
+
+
+class JSONStreamParser:
+    """
+    Character-level JSON scanner that tracks strings, nesting and the key
+    path of every container.
+
+    Text before the first ``{`` or ``[`` (prose, code fences) and after the
+    root value closes is ignored.
+    """
+
+    def __init__(self, item_path, scalar_depth=2):
+        """
+        Args:
+            item_path (tuple): Path of the containers to emit; use ``ANY_INDEX``
+                for array positions. ``(ANY_INDEX,)`` emits top-level array elements
+            scalar_depth (int): String values at paths up to this length are kept
+                in ``scalars`` (e.g. a mindmap ``title``)
+        """
+        self.item_path = tuple(item_path)
+        self.scalar_depth = scalar_depth
+        self.buffer = ""
+        self.pos = 0
+        self.stack = []
+        self.in_string = False
+        self.escape = False
+        self.string_start = 0
+        self.root_start = None
+        self.root_end = None
+        self.scalars = {}
+        self.errors = []
+
+    @property
+    def done(self):
+        return self.root_end is not None
+
+    def _path_matches(self, path):
+        if len(path) != len(self.item_path):
+            return False
+        return all(
+            expected == actual or (expected == ANY_INDEX and isinstance(actual, int))
+            for expected, actual in zip(self.item_path, path)
+        )
+
+    def _value_path(self):
+        # Path of the value that starts at the current position
+        top = self.stack[-1]
+        if top.kind == '[':
+            if top.awaiting_value:
+                top.index += 1
+                top.awaiting_value = False
+            return top.path + (top.index,)
+        return top.path + (top.key,)
+
+    def _close_string(self, end):
+        token = self.buffer[self.string_start:end + 1]
+        top = self.stack[-1]
+        if top.kind == '{' and top.expect_key:
+            top.key = json.loads(token)
+            top.expect_key = False
+            return
+        path = top.path + ((top.key,) if top.kind == '{' else (top.index,))
+        if len(path) <= self.scalar_depth:
+            self.scalars[path] = json.loads(token)
+
+    def feed(self, text):
+        """
+        Consume more text.
+
+        Returns:
+            list[tuple[tuple, object]]: ``(path, value)`` for every item completed by this text
+        """
+        self.buffer += text
+        items = []
+        while self.pos < len(self.buffer) and not self.done:
+            i = self.pos
+            c = self.buffer[i]
+            self.pos += 1
+
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif c == '\\':
+                    self.escape = True
+                elif c == '"':
+                    self.in_string = False
+                    self._close_string(i)
+                continue
+
+            if not self.stack:
+                # Skip anything before the root container
+                if c in '{[':
+                    self.root_start = i
+                    self.stack.append(_Frame(c, i, ()))
+                continue
+
+            if c == '"':
+                top = self.stack[-1]
+                if not (top.kind == '{' and top.expect_key):
+                    self._value_path()
+                self.in_string = True
+                self.string_start = i
+            elif c in '{[':
+                self.stack.append(_Frame(c, i, self._value_path()))
+            elif c in '}]':
+                frame = self.stack.pop()
+                if self._path_matches(frame.path):
+                    try:
+                        items.append((frame.path, json.loads(self.buffer[frame.start:i + 1])))
+                    except json.JSONDecodeError as e:
+                        self.errors.append(f"Item at {frame.path} is not valid JSON: {e}")
+                if not self.stack:
+                    self.root_end = i
+            elif c == ',':
+                top = self.stack[-1]
+                if top.kind == '{':
+                    top.expect_key = True
+                else:
+                    top.awaiting_value = True
+            elif not c.isspace() and c != ':':
+                top = self.stack[-1]
+                if top.kind == '[' and top.awaiting_value:
+                    self._value_path()
+        return items
+
+    def document(self):
+        """
+        Return the complete root value, or None if the text stopped part-way
+        or the document is not valid JSON.
+        """
+        if not self.done:
+            return None
+        try:
+            return json.loads(self.buffer[self.root_start:self.root_end + 1])
+        except json.JSONDecodeError:
+            return None
+
+
+class StructuredStream:
+    """
+    Stream a completion and yield validated items as they complete.
+
+    Providers are tried in route order. A provider is abandoned for the next
+    one only if it produced no valid item; once items have arrived, a broken
+    or truncated stream keeps what was parsed. After iterating, ``items``,
+    ``provider``, ``complete`` and ``parser`` describe the outcome.
+
+    Complete responses whose items were parsed at ``item_path`` are stored in
+    the LLM response cache and replayed through the same parser on a hit.
+    Output that needed ``recover`` is never cached: it may have been cut off.
+    """
+
+    def __init__(self, messages, item_path, validate_item, route=GROQ_THEN_OPENAI,
+                 temperature=None, max_tokens=None, recover=None, priority=PRIORITY_CHAT):
+        """
+        Args:
+            messages (list[dict]): Chat messages
+            item_path (tuple): Passed to ``JSONStreamParser``
+            validate_item (callable): ``validate_item(item, index)`` returns the item or raises ValueError
+            route (tuple): Ordered ``(provider, model)`` pairs
+            temperature (float | dict, optional): Sampling temperature, optionally per provider
+            max_tokens (int | dict, optional): Output token limit, optionally per provider
+            recover (callable, optional): Given the full text of a complete response that
+                yielded no items, returns a list of items salvaged another way
+            priority (str): Rate limit priority, see ``main/utils/rate_limit.py``
+        """
+        self.messages = messages
+        self.item_path = item_path
+        self.validate_item = validate_item
+        self.route = route
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.recover = recover
+        self.priority = priority
+        self.items = []
+        self.provider = None
+        self.complete = False
+        self.salvaged = False
+        self.parser = None
+        self.errors = {}
+
+    def _temperature(self, provider):
+        if isinstance(self.temperature, dict):
+            return self.temperature.get(provider)
+        return self.temperature
+
+    def _accept(self, candidates):
+        for item in candidates:
+            try:
+                item = self.validate_item(item, len(self.items))
+            except (ValueError, TypeError, KeyError) as e:
+                print(f"⚠️ Skipping invalid item: {e}")
+                continue
+            self.items.append(item)
+            yield item
+
+    def _consume(self, pieces):
+        """Feed text pieces through a fresh parser, yielding valid items."""
+        self.parser = JSONStreamParser(self.item_path)
+        for piece in pieces:
+            for _, item in self.parser.feed(piece):
+                yield from self._accept([item])
+
+    def _salvage(self):
+        # Complete response without items at item_path, e.g. numbered objects instead of an array
+        if self.items or not self.recover:
+            return
+        yield from self._accept(self.recover(self.parser.buffer))
+        self.salvaged = bool(self.items)
+
+    def _replay_cache(self):
+        hit = response_cache.get_cached_response(self.route, self._temperature, self.messages)
+        if hit is None:
+            return
+        provider, model, content = hit
+        yield from self._consume([content])
+        try:
+            yield from self._salvage()
+        except ValueError:
+            pass
+        if self.items:
+            print(f"♻️ LLM cache hit ({provider}/{model})")
+            self.provider = provider
+            self.complete = True
+        else:
+            response_cache.invalidate_response(provider, model, self._temperature(provider), self.messages)
+
+    def __iter__(self):
+        if settings.LLM_CACHE_ENABLED:
+            yield from self._replay_cache()
+            if self.items:
+                return
+
+        for provider, model in self.route:
+            try:
+                yield from self._consume(stream_chat_completion(
+                    self.messages,
+                    route=((provider, model),),
+                    temperature=self.temperature,
+                    max_tokens=self.max_tokens,
+                    priority=self.priority
+                ))
+                complete = True
+            except LLMError as e:
+                self.errors[provider] = str(e)
+                complete = False
+
+            if complete:
+                try:
+                    yield from self._salvage()
+                except ValueError as e:
+                    self.errors[provider] = f"invalid output: {e}"
+
+            if not self.items:
+                self.errors.setdefault(provider, "no valid items in response")
+                continue
+
+            self.provider = provider
+            # Only a closed root value proves the response was not cut off by max_tokens
+            self.complete = complete and self.parser.done
+            if not self.complete:
+                print(f"⚠️ {provider} output stopped early, keeping {len(self.items)} parsed items")
+            elif settings.LLM_CACHE_ENABLED and not self.salvaged:
+                response_cache.store_response(
+                    provider, model, self._temperature(provider), self.messages, self.parser.buffer
+                )
+            return
+
+    def collect(self):
+        """
+        Run the stream to the end.
+
+        Returns:
+            list: Validated items
+
+        Raises:
+            LLMError: If no provider produced a valid item
+        """
+        for _ in self:
+            pass
+        if not self.items:
+            raise LLMError(self.errors or {"stream": "no valid items in response"})
+        return self.items
@@ -0,0 +1,147 @@
+"""
+Course-level chatbot: answers questions about a whole playlist from the
+passages ``main/utils/playlist_index.py`` retrieves across its videos.
+"""
+
+from asgiref.sync import sync_to_async
+from django.shortcuts import get_object_or_404
+from main.llm import OPENAI_THEN_GROQ, StreamCanceller, ahedged_stream_chat_completion, hedged_stream_chat_completion
+from main.models import Playlist, PlaylistPassage
+from .playlist_index import passage_source, retrieve_passages
+from .prompts.chatbot_prompt import get_playlist_chatbot_prompt
+from .sse import DONE, asse_stream, astatic_stream, error_frame, sse_stream, static_stream
+from .summary_chatbot import TIMESTAMP_RE
+from .transcript_index import format_timestamp
+
+NO_CONTENT_MESSAGE = (
+    "I'm sorry, but I couldn't find anything about this in the course videos. "
+    "Try rephrasing the question or asking about a specific topic."
+)
+
+
+def _format_excerpts(passages) -> str:
+    excerpts = []
+    for passage in passages:
+        if passage['start'] is not None:
+            label = f"{passage['video_title']} @ {format_timestamp(passage['start'])}"
+        elif passage['kind'] == PlaylistPassage.KIND_SUMMARY:
+            label = f"{passage['video_title']}, summary"
+        else:
+            label = passage['video_title']
+        excerpts.append(f"[{label}] {passage['text']}")
+    return "\n\n".join(excerpts)
+
+
+def _sources_trailer(answer, sources):
+    # The model cited no timestamp: name the passages it was given
+    if sources and not TIMESTAMP_RE.search("".join(answer)):
+        return f" (Sources: {'; '.join(dict.fromkeys(sources))})"
+    return None
+
+
+def _prepare_playlist_chatbot_request(user, playlist_uuid, user_message):
+    """
+    Validate a question and build its prompt.
+
+    Returns:
+        tuple: ``(prompt, sources)``; ``prompt`` is None if no passage matched
+    """
+    # Validation
+    if not playlist_uuid:
+        raise ValueError("playlist_uuid is required")
+
+    if not user_message or not user_message.strip():
+        raise ValueError("user_message is required")
+
+    playlist = get_object_or_404(Playlist, uuid_playlist=playlist_uuid, user=user)
+    passages = retrieve_passages(playlist, user_message)
+    if not passages:
+        return None, None
+
+    prompt = get_playlist_chatbot_prompt(playlist.title, _format_excerpts(passages), user_message.strip())
+    return prompt, [passage_source(passage) for passage in passages]
+
+
+def process_playlist_chatbot_request(user, playlist_uuid: str, user_message: str):
+    """
+    Build the streamed answer to a question about a whole playlist.
+
+    Args:
+        user: Django user object
+        playlist_uuid (str): Playlist the question is about
+        user_message (str): The question
+
+    Returns:
+        generator: SSE chunks of the answer
+
+    Raises:
+        ValueError: If validation fails
+        Http404: If the playlist is not the user's
+    """
+    prompt, sources = _prepare_playlist_chatbot_request(user, playlist_uuid, user_message)
+    if prompt is None:
+        return _generate_static_response(NO_CONTENT_MESSAGE)
+    return playlist_chatbot_stream(prompt, sources)
+
+
+async def aprocess_playlist_chatbot_request(user, playlist_uuid: str, user_message: str):
+    """
+    Async version of ``process_playlist_chatbot_request`` for ASGI views.
+
+    Returns:
+        async generator: SSE chunks of the answer
+    """
+    prompt, sources = await sync_to_async(_prepare_playlist_chatbot_request)(user, playlist_uuid, user_message)
+    if prompt is None:
+        return _agenerate_static_response(NO_CONTENT_MESSAGE)
+    return aplaylist_chatbot_stream(prompt, sources)
+
+
+def _generate_static_response(message: str):
+    return static_stream(message, DONE)
+
+
+def _agenerate_static_response(message: str):
+    return astatic_stream(message, DONE)
+
+
+def playlist_chatbot_stream(prompt: str, sources=None):
+    canceller = StreamCanceller()
+    return sse_stream(_answer_pieces(prompt, sources, canceller), canceller)
+
+
+def aplaylist_chatbot_stream(prompt: str, sources=None):
+    return asse_stream(_aanswer_pieces(prompt, sources))
+
+
+def _answer_pieces(prompt, sources, canceller=None):
+    answer = []
+    try:
+        for text_piece in hedged_stream_chat_completion(
+            [{"role": "user", "content": prompt}], route=OPENAI_THEN_GROQ, endpoint="playlist_chatbot",
+            canceller=canceller
+        ):
+            answer.append(text_piece)
+            yield text_piece
+        trailer = _sources_trailer(answer, sources)
+        if trailer:
+            yield trailer
+        yield DONE
+    except Exception as e:
+        yield error_frame(e)
+
+
+async def _aanswer_pieces(prompt, sources):
+    answer = []
+    try:
+        async for text_piece in ahedged_stream_chat_completion(
+            [{"role": "user", "content": prompt}], route=OPENAI_THEN_GROQ, endpoint="playlist_chatbot"
+        ):
+            answer.append(text_piece)
+            yield text_piece
+        trailer = _sources_trailer(answer, sources)
+        if trailer:
+            yield trailer
+        yield DONE
+    except Exception as e:
+        yield error_frame(e)
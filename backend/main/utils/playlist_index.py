@@ -0,0 +1,211 @@
+"""
+Cross-video retrieval for the playlist chatbot.
+
+Every video of a playlist contributes passages: its timecoded transcript
+windows (the same windows as its ``TranscriptIndex``; plain
+``full_transcript`` chunks for videos without timecodes) and chunks of its
+summary. Their terms are stored as rows of an inverted index
+(``PlaylistPosting``, looked up by ``(playlist, term)``), so a question only
+reads the postings of its own terms, and adding a video only inserts that
+video's rows — nothing is rebuilt per query or per ingest.
+
+Passages are ranked with BM25 over the whole playlist and at most
+``PLAYLIST_RAG_MAX_PER_VIDEO`` are kept per video, so course-level questions
+("which lecture covers X?") see several lectures.
+"""
+
+import math
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Avg, Count
+
+from main.models import PlaylistPassage, PlaylistPosting
+from main.utils.summarizer import estimate_tokens
+from main.utils.transcript_index import B, K1, format_timestamp, get_transcript_index, tokenize
+
+MAX_TERM_LENGTH = 64
+
+
+def _text_chunks(text, window_tokens=None):
+    """Split untimed text into consecutive chunks of about ``window_tokens`` tokens."""
+    limit = (window_tokens or settings.RAG_WINDOW_TOKENS) * 4
+    chunks = []
+    current = []
+    size = 0
+    for word in (text or '').split():
+        if current and size + len(word) + 1 > limit:
+            chunks.append(' '.join(current))
+            current = []
+            size = 0
+        current.append(word)
+        size += len(word) + 1
+    if current:
+        chunks.append(' '.join(current))
+    return chunks
+
+
+def _video_passages(video):
+    """Unsaved passages of one video: transcript windows (or chunks), then summary chunks."""
+    passages = []
+    index = get_transcript_index(video)
+    if index:
+        for window in index['windows']:
+            passages.append(PlaylistPassage(
+                kind=PlaylistPassage.KIND_TRANSCRIPT, start=window['start'], end=window['end'], text=window['text']
+            ))
+    else:
+        for chunk in _text_chunks(video.full_transcript):
+            passages.append(PlaylistPassage(kind=PlaylistPassage.KIND_TRANSCRIPT, text=chunk))
+
+    for chunk in _text_chunks(video.summary):
+        passages.append(PlaylistPassage(kind=PlaylistPassage.KIND_SUMMARY, text=chunk))
+    return passages
+
+
+def index_video(video):
+    """
+    (Re)index one video in its playlist's inverted index.
+
+    Returns:
+        int: Number of passages stored
+    """
+    if not video.playlist_id:
+        return 0
+
+    passages = _video_passages(video)
+    term_counts = []
+    for passage in passages:
+        counts = Counter(term for term in tokenize(passage.text) if len(term) <= MAX_TERM_LENGTH)
+        passage.playlist_id = video.playlist_id
+        passage.video = video
+        passage.length = sum(counts.values())
+        term_counts.append(counts)
+
+    with transaction.atomic():
+        PlaylistPassage.objects.filter(video=video).delete()
+        # Needs the primary keys bulk_create sets on Postgres
+        saved = PlaylistPassage.objects.bulk_create(passages, batch_size=settings.INGEST_BULK_BATCH_SIZE)
+        PlaylistPosting.objects.bulk_create(
+            (
+                PlaylistPosting(playlist_id=video.playlist_id, passage=passage, term=term, frequency=frequency)
+                for passage, counts in zip(saved, term_counts)
+                for term, frequency in counts.items()
+            ),
+            batch_size=settings.INGEST_BULK_BATCH_SIZE * 10
+        )
+    return len(saved)
+
+
+def index_playlist(playlist):
+    """
+    Index every video of a playlist, e.g. one ingested before playlist indexes existed.
+
+    Returns:
+        int: Number of passages stored
+    """
+    return sum(index_video(video) for video in playlist.videos.all())
+
+
+def _live_passages(playlist):
+    return PlaylistPassage.objects.filter(playlist=playlist, video__is_removed=False)
+
+
+def search_playlist(playlist, question, top_k=None):
+    """
+    Rank the passages of a playlist against a question with BM25.
+
+    Args:
+        playlist: Playlist to search
+        question (str): User question
+        top_k (int, optional): Number of passages; defaults to PLAYLIST_RAG_TOP_K
+
+    Returns:
+        list[dict]: Passages best first, with ``video_title``, ``video_uuid``,
+        ``kind``, ``start``, ``text``, ``tokens`` and ``score``; at most
+        PLAYLIST_RAG_MAX_PER_VIDEO per video
+    """
+    top_k = top_k or settings.PLAYLIST_RAG_TOP_K
+    terms = {term for term in tokenize(question) if len(term) <= MAX_TERM_LENGTH}
+    if not terms:
+        return []
+
+    stats = _live_passages(playlist).aggregate(count=Count('id'), avg_length=Avg('length'))
+    if not stats['count']:
+        return []
+    avg_length = stats['avg_length'] or 1.0
+
+    postings = list(
+        PlaylistPosting.objects.filter(playlist=playlist, term__in=terms, passage__video__is_removed=False)
+        .values_list('term', 'passage_id', 'frequency', 'passage__length', 'passage__video_id')
+    )
+    document_frequency = Counter(term for term, *_ in postings)
+
+    scores = Counter()
+    videos = {}
+    for term, passage_id, frequency, length, video_id in postings:
+        df = document_frequency[term]
+        idf = math.log(1 + (stats['count'] - df + 0.5) / (df + 0.5))
+        norm = K1 * (1 - B + B * length / avg_length)
+        scores[passage_id] += idf * frequency * (K1 + 1) / (frequency + norm)
+        videos[passage_id] = video_id
+
+    chosen = []
+    per_video = Counter()
+    for passage_id, score in scores.most_common():
+        video_id = videos[passage_id]
+        if per_video[video_id] >= settings.PLAYLIST_RAG_MAX_PER_VIDEO:
+            continue
+        per_video[video_id] += 1
+        chosen.append((passage_id, score))
+        if len(chosen) >= top_k:
+            break
+
+    passages = PlaylistPassage.objects.select_related('video').in_bulk([passage_id for passage_id, _ in chosen])
+    return [
+        {
+            'video_title': passages[passage_id].video.title,
+            'video_uuid': str(passages[passage_id].video.uuid_video),
+            'kind': passages[passage_id].kind,
+            'start': passages[passage_id].start,
+            'text': passages[passage_id].text,
+            'tokens': estimate_tokens(passages[passage_id].text),
+            'score': round(score, 3),
+        }
+        for passage_id, score in chosen
+    ]
+
+
+def retrieve_passages(playlist, question):
+    """
+    Passages of a playlist most relevant to ``question``, capped at
+    ``PLAYLIST_RAG_MAX_CONTEXT_TOKENS`` in total. Playlists ingested before
+    playlist indexes existed are indexed on first use.
+
+    Returns:
+        list[dict]: See ``search_playlist``, grouped by video
+    """
+    if not PlaylistPassage.objects.filter(playlist=playlist).exists():
+        index_playlist(playlist)
+
+    selected = []
+    budget = settings.PLAYLIST_RAG_MAX_CONTEXT_TOKENS
+    for passage in search_playlist(playlist, question):
+        if passage['tokens'] > budget:
+            continue
+        selected.append(passage)
+        budget -= passage['tokens']
+
+    # Excerpts of the same video next to each other, most relevant video first
+    order = {video: position for position, video in enumerate(dict.fromkeys(p['video_uuid'] for p in selected))}
+    return sorted(selected, key=lambda p: (order[p['video_uuid']], p['start'] if p['start'] is not None else float('inf')))
+
+
+def passage_source(passage):
+    """``Title [12:34]`` for transcript windows, ``Title (summary)`` otherwise."""
+    if passage['start'] is not None:
+        return f"{passage['video_title']} [{format_timestamp(passage['start'])}]"
+    if passage['kind'] == PlaylistPassage.KIND_SUMMARY:
+        return f"{passage['video_title']} (summary)"
+    return passage['video_title']
@@ -0,0 +1,522 @@
+"""
+Playlist ingestion pipeline.
+
+Runs the stages that used to live inside ``PlaylistAPIView.post``:
+playlist enumeration, transcript fetch, summarization and persistence.
+Progress is written to the ``IngestJob`` / ``IngestJobVideo`` rows so the
+status endpoint can report it while the job is running.
+"""
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from main.models import IngestJob, IngestJobVideo, Playlist, Video
+from main.utils.extractor_ids import fetch_playlist
+from main.utils.transcript_fetch import get_transcript_client, extract_full_transcript
+from main.utils.summarizer import summarize_transcripts_concurrently, SUMMARY_MODEL
+from main.utils.transcript_compact import compact_transcript
+from main.utils.transcript_index import save_transcript_index
+from main.utils.playlist_index import index_video
+from main.utils.content_cache import (
+    get_cached_transcripts,
+    store_transcripts,
+    get_cached_summary,
+    store_summary
+)
+
+# Check total duration limit (30 hours = 108,000 seconds by default)
+MAX_PLAYLIST_DURATION = settings.MAX_PLAYLIST_DURATION_SECONDS
+
+
+class IngestError(Exception):
+    """Raised when a playlist cannot be ingested for a user-facing reason."""
+
+
+def _elapsed(job):
+    started_at = job.started_at or job.created_at
+    return round((timezone.now() - started_at).total_seconds(), 3)
+
+
+def _set_job_stage(job, stage, **fields):
+    job.stage = stage
+    job.stage_timings[stage] = _elapsed(job)
+    for name, value in fields.items():
+        setattr(job, name, value)
+    job.save(update_fields=['stage', 'stage_timings', 'updated_at', *fields.keys()])
+
+
+def _set_video_stage(job_video, stage, error=''):
+    job_video.stage = stage
+    job_video.error = error
+    job_video.stage_timings[stage] = _elapsed(job_video.job)
+    job_video.save(update_fields=['stage', 'error', 'stage_timings', 'updated_at'])
+
+
+def _parse_transcript_data(transcript_data):
+    """
+    Split the youtube-transcript.io payload into per-video transcripts,
+    timecodes and durations.
+    """
+    transcripts_by_id = {}
+    timecodes_by_id = {}
+    durations_by_id = {}
+
+    for video_transcript in transcript_data or []:
+        video_id = video_transcript.get('id')
+        if not video_id:
+            continue
+
+        # Extract full transcript (plain text)
+        transcripts_by_id[video_id] = extract_full_transcript([video_transcript])
+
+        # Extract timecode transcript (JSON with timestamps)
+        try:
+            if 'tracks' in video_transcript and len(video_transcript['tracks']) > 0:
+                timecodes_by_id[video_id] = video_transcript['tracks'][0]['transcript']
+            else:
+                timecodes_by_id[video_id] = None
+        except (KeyError, IndexError) as e:
+            print(f"❌ Error extracting timecode for video {video_id}: {str(e)}")
+            timecodes_by_id[video_id] = None
+
+        # Extract duration in seconds
+        try:
+            duration_seconds = int(video_transcript['microformat']['playerMicroformatRenderer']['lengthSeconds'])
+            durations_by_id[video_id] = duration_seconds
+            print(f"📏 Video {video_id} duration: {duration_seconds} seconds")
+        except (KeyError, ValueError, TypeError) as e:
+            print(f"❌ Error extracting duration for video {video_id}: {str(e)}")
+            durations_by_id[video_id] = 0
+
+    return transcripts_by_id, timecodes_by_id, durations_by_id
+
+
+def _compact_transcripts(videos, transcripts_by_id, timecodes_by_id):
+    """
+    Compact every fetched transcript.
+
+    Returns:
+        dict: ``(text, segments, stats)`` from ``compact_transcript`` by video ID
+    """
+    compacts_by_id = {}
+    saved_tokens = 0
+    for v in videos:
+        compacts_by_id[v["id"]] = compact_transcript(transcripts_by_id.get(v["id"]), timecodes_by_id.get(v["id"]))
+        saved_tokens += compacts_by_id[v["id"]][2]['saved_tokens']
+    print(f"🗜️ Transcript compaction saved ~{saved_tokens} tokens across {len(videos)} videos")
+    return compacts_by_id
+
+
+def _summary_inputs(video_id, transcripts_by_id, timecodes_by_id, compacts_by_id):
+    # Text and caption segments the summarizer sees, per USE_COMPACT_TRANSCRIPT
+    text, segments, _ = compacts_by_id.get(video_id, ("", None, None))
+    if settings.USE_COMPACT_TRANSCRIPT and text:
+        return text, segments
+    return transcripts_by_id.get(video_id) or "", timecodes_by_id.get(video_id)
+
+
+def _summarize_videos(job, videos, transcripts_by_id, timecodes_by_id, compacts_by_id, job_videos_by_id):
+    """
+    Summarize every video that has a transcript on the shared summary pool.
+
+    Returns:
+        dict: Summary text by video ID ("" for videos without a transcript)
+    """
+    summaries_by_id = {v["id"]: "" for v in videos}
+    inputs_by_id = {
+        v["id"]: _summary_inputs(v["id"], transcripts_by_id, timecodes_by_id, compacts_by_id)
+        for v in videos
+    }
+    pending = []
+    for v in videos:
+        transcript = inputs_by_id[v["id"]][0]
+        if not transcript.strip():
+            continue
+        cached_summary = get_cached_summary(transcript, SUMMARY_MODEL)
+        if cached_summary:
+            print(f"🗄️ Reusing cached summary for video {v['id']}")
+            summaries_by_id[v["id"]] = cached_summary
+            _set_video_stage(job_videos_by_id[v["id"]], IngestJobVideo.STAGE_SUMMARIZED)
+        else:
+            pending.append(v)
+
+    for v in pending:
+        _set_video_stage(job_videos_by_id[v["id"]], IngestJobVideo.STAGE_SUMMARIZING)
+
+    # Videos without a transcript or with a cached summary have nothing left to do before saving
+    job.processed_videos = len(videos) - len(pending)
+    job.save(update_fields=['processed_videos', 'updated_at'])
+
+    transcripts = [inputs_by_id[v["id"]][0] for v in pending]
+    timecodes = [inputs_by_id[v["id"]][1] for v in pending]
+    for index, summary in summarize_transcripts_concurrently(transcripts, timecodes):
+        v = pending[index]
+        if isinstance(summary, str) and summary:
+            print(f"✅ Generated summary for video {v['id']}")
+            summaries_by_id[v["id"]] = summary
+            store_summary(inputs_by_id[v["id"]][0], SUMMARY_MODEL, summary)
+            _set_video_stage(job_videos_by_id[v["id"]], IngestJobVideo.STAGE_SUMMARIZED)
+        else:
+            error = summary.get('error', 'empty summary') if isinstance(summary, dict) else 'empty summary'
+            print(f"❌ Error generating summary for video {v['id']}: {error}")
+            summaries_by_id[v["id"]] = "Summary generation failed"
+            _set_video_stage(job_videos_by_id[v["id"]], IngestJobVideo.STAGE_SUMMARIZED, error)
+
+        job.processed_videos += 1
+        job.save(update_fields=['processed_videos', 'updated_at'])
+
+    return summaries_by_id
+
+
+def _build_videos(user, playlist, videos, transcripts_by_id, compacts_by_id, summaries_by_id, timecodes_by_id, durations_by_id):
+    return [
+        Video(
+            video_id=v["id"],
+            title=v["title"],
+            url=v["url"],
+            thumbnail=v["thumbnail"],
+            full_transcript=transcripts_by_id.get(v["id"], ""),
+            compact_transcript=compacts_by_id[v["id"]][0],
+            transcript_tokens=compacts_by_id[v["id"]][2]['original_tokens'],
+            compact_transcript_tokens=compacts_by_id[v["id"]][2]['compact_tokens'],
+            summary=summaries_by_id.get(v["id"], ""),
+            playlist=playlist,
+            timecode_transcript=timecodes_by_id.get(v["id"], None),
+            duration_sec=durations_by_id.get(v["id"], 0),
+            user=user
+        )
+        for v in videos
+    ]
+
+
+def _index_transcripts(videos):
+    # Chatbot retrieval indexes; needs the primary keys bulk_create sets on Postgres
+    indexed = 0
+    passages = 0
+    for video in videos:
+        if not video.pk:
+            continue
+        if save_transcript_index(video):
+            indexed += 1
+        # Only this video's passages change: the rest of the playlist index stays as it is
+        passages += index_video(video)
+    print(f"🔎 Built transcript indexes for {indexed} videos ({passages} playlist passages)")
+
+
+def _save_playlist(user, playlist_info, videos, transcripts_by_id, compacts_by_id, summaries_by_id, timecodes_by_id, durations_by_id):
+    """
+    Write the playlist and all of its videos in a single transaction.
+
+    Videos are inserted with ``bulk_create`` in batches of
+    ``INGEST_BULK_BATCH_SIZE``, so a failure part-way leaves no
+    half-populated playlist behind.
+    """
+    with transaction.atomic():
+        playlist = Playlist.objects.create(
+            playlist_id=playlist_info["id"],
+            title=playlist_info["title"],
+            playlist_url=playlist_info["url"],
+            playlist_thumbnail=playlist_info["playlist_thumbnail"],
+            user=user  # Привязываем к текущему пользователю
+        )
+        saved_videos = Video.objects.bulk_create(
+            _build_videos(user, playlist, videos, transcripts_by_id, compacts_by_id, summaries_by_id, timecodes_by_id, durations_by_id),
+            batch_size=settings.INGEST_BULK_BATCH_SIZE
+        )
+        _index_transcripts(saved_videos)
+    print(f"💾 Saved {len(videos)} videos for playlist {playlist.title}")
+    return playlist
+
+
+def _filter_new_videos(user, videos_info):
+    """
+    Playlists may list the same video twice, but Video is unique per user,
+    so also drop videos the user already has in any course.
+    """
+    seen_ids = set(
+        Video.objects.filter(user=user, video_id__in=[v["id"] for v in videos_info])
+        .values_list('video_id', flat=True)
+    )
+    unique_videos = []
+    for v in videos_info:
+        if v["id"] not in seen_ids:
+            seen_ids.add(v["id"])
+            unique_videos.append(v)
+    return unique_videos
+
+
+def _create_job_videos(job, videos_info):
+    # A requeued job starts its per-video progress from scratch
+    job.videos.all().delete()
+    job_videos = IngestJobVideo.objects.bulk_create([
+        IngestJobVideo(
+            job=job, position=index, video_id=v["id"], title=v["title"][:255],
+            stage_timings={IngestJobVideo.STAGE_PENDING: _elapsed(job)}
+        )
+        for index, v in enumerate(videos_info)
+    ])
+    return {jv.video_id: jv for jv in job_videos}
+
+
+def _fetch_transcripts(job, videos_info, job_videos_by_id):
+    """
+    Load transcripts from the shared cache and fetch the rest from the API.
+
+    Returns:
+        tuple[dict, dict, dict]: Transcripts, timecodes and durations by video ID
+    """
+    video_ids = [v["id"] for v in videos_info]
+    cached_payloads = get_cached_transcripts(video_ids)
+    missing_ids = [video_id for video_id in video_ids if video_id not in cached_payloads]
+    print(f"🗄️ Transcript cache: {len(cached_payloads)} hits, {len(missing_ids)} misses")
+
+    fetched_by_id, fetch_errors = get_transcript_client().fetch(missing_ids)
+    fetched_data = list(fetched_by_id.values())
+    transcript_data = list(cached_payloads.values()) + fetched_data
+    transcripts_by_id, timecodes_by_id, durations_by_id = _parse_transcript_data(transcript_data)
+    store_transcripts(fetched_data, transcripts_by_id, timecodes_by_id, durations_by_id)
+
+    for video_id, error in fetch_errors.items():
+        job_video = job_videos_by_id[video_id]
+        job_video.error = f"Transcript fetch failed: {error}"
+        job_video.stage_timings['transcript_failed'] = _elapsed(job)
+        job_video.save(update_fields=['error', 'stage_timings', 'updated_at'])
+
+    for video_id in transcripts_by_id:
+        if video_id in job_videos_by_id:
+            _set_video_stage(job_videos_by_id[video_id], IngestJobVideo.STAGE_TRANSCRIPT)
+
+    return transcripts_by_id, timecodes_by_id, durations_by_id
+
+
+def _apply_duration_budget(videos_info, durations_by_id, job_videos_by_id, budget):
+    """
+    Keep videos in playlist order until their cumulative duration would
+    exceed ``budget`` seconds; the rest are marked as skipped.
+    """
+    processed_videos = []
+    cumulative_duration = 0
+
+    for v in videos_info:
+        video_duration = durations_by_id.get(v["id"], 0)
+        if cumulative_duration + video_duration <= budget:
+            processed_videos.append(v)
+            cumulative_duration += video_duration
+            print(f"✅ Added video {v['id']} - Running total: {cumulative_duration/3600:.2f} hours")
+        else:
+            print(f"⏱️ Skipping video {v['id']} - would exceed time limit")
+            break
+
+    processed_ids = {v["id"] for v in processed_videos}
+    for v in videos_info:
+        if v["id"] not in processed_ids:
+            _set_video_stage(job_videos_by_id[v["id"]], IngestJobVideo.STAGE_SKIPPED, "Exceeds playlist duration limit")
+
+    print(f"📈 Processing {len(processed_videos)} out of {len(videos_info)} videos")
+    print(f"🕐 Final duration: {cumulative_duration/3600:.2f} hours")
+    return processed_videos
+
+
+def _prefilter_by_duration(videos_info, job_videos_by_id, budget):
+    """
+    Apply the duration budget using the lengths from the yt_dlp enumeration,
+    so videos that cannot fit never reach the transcript API. Videos with an
+    unknown length are kept and re-checked once their transcript arrives.
+    """
+    flat_durations = {v["id"]: v.get("duration") or 0 for v in videos_info}
+    candidates = _apply_duration_budget(videos_info, flat_durations, job_videos_by_id, budget)
+    print(f"🔎 Duration pre-filter kept {len(candidates)} of {len(videos_info)} videos")
+    return candidates
+
+
+def _fill_missing_durations(videos, durations_by_id):
+    # Videos without a transcript payload still have their yt_dlp length
+    for v in videos:
+        if not durations_by_id.get(v["id"]) and v.get("duration"):
+            durations_by_id[v["id"]] = v["duration"]
+
+
+def _mark_saved(job_videos_by_id, videos):
+    for v in videos:
+        job_video = job_videos_by_id[v["id"]]
+        _set_video_stage(job_video, IngestJobVideo.STAGE_SAVED, job_video.error)
+
+
+def run_playlist_ingest(job):
+    """
+    Ingest the playlist referenced by ``job`` and attach the resulting
+    ``Playlist`` to it.
+
+    Args:
+        job (IngestJob): A job already claimed by a worker
+
+    Returns:
+        Playlist: The created (or already existing) playlist
+
+    Raises:
+        IngestError: If not even the first video fits the allowed duration
+    """
+    if job.kind == IngestJob.KIND_RESYNC:
+        return resync_playlist(job)
+
+    user = job.user
+    url = job.playlist_url
+
+    _set_job_stage(job, 'enumerating')
+    enumeration = fetch_playlist(url)
+    playlist_info = enumeration["info"]
+
+    # Проверяем, есть ли уже такой плейлист у пользователя
+    existing_playlist = Playlist.objects.filter(
+        playlist_id=playlist_info["id"],
+        user=user
+    ).first()
+
+    if existing_playlist:
+        print(f"📋 Playlist already exists for user: {existing_playlist.title}")
+        _set_job_stage(job, 'exists', playlist=existing_playlist)
+        return existing_playlist
+
+    videos_info = _filter_new_videos(user, enumeration["videos"])
+
+    # Reject before any transcript is fetched when not even the first video fits
+    first_duration = (videos_info[0].get("duration") or 0) if videos_info else 0
+    if first_duration > MAX_PLAYLIST_DURATION:
+        hours = first_duration / 3600
+        max_hours = MAX_PLAYLIST_DURATION / 3600
+        raise IngestError(
+            f"The first video ({hours:.1f} hours) exceeds the maximum allowed duration of {max_hours} hours. "
+            "Please use a shorter playlist to reduce server load."
+        )
+
+    job_videos_by_id = _create_job_videos(job, videos_info)
+    candidate_videos = _prefilter_by_duration(videos_info, job_videos_by_id, MAX_PLAYLIST_DURATION)
+    _set_job_stage(job, 'transcripts', total_videos=len(candidate_videos))
+
+    transcripts_by_id, timecodes_by_id, durations_by_id = _fetch_transcripts(job, candidate_videos, job_videos_by_id)
+    _fill_missing_durations(candidate_videos, durations_by_id)
+
+    total_duration = sum(durations_by_id.values())
+    print(f"📊 Total playlist duration: {total_duration} seconds ({total_duration/3600:.2f} hours)")
+
+    # Re-check with the exact lengths, which matters for videos yt_dlp had no length for
+    processed_videos = _apply_duration_budget(candidate_videos, durations_by_id, job_videos_by_id, MAX_PLAYLIST_DURATION)
+    if candidate_videos and not processed_videos:
+        max_hours = MAX_PLAYLIST_DURATION / 3600
+        raise IngestError(
+            f"The first video exceeds the maximum allowed duration of {max_hours} hours. "
+            "Please use a shorter playlist to reduce server load."
+        )
+
+    compacts_by_id = _compact_transcripts(processed_videos, transcripts_by_id, timecodes_by_id)
+    _set_job_stage(job, 'summarizing', total_videos=len(processed_videos))
+
+    summaries_by_id = _summarize_videos(
+        job, processed_videos, transcripts_by_id, timecodes_by_id, compacts_by_id, job_videos_by_id
+    )
+
+    _set_job_stage(job, 'saving')
+    try:
+        playlist = _save_playlist(
+            user, playlist_info, processed_videos,
+            transcripts_by_id, compacts_by_id, summaries_by_id, timecodes_by_id, durations_by_id
+        )
+    except IntegrityError:
+        # Another job imported the same playlist while this one was running
+        playlist = Playlist.objects.filter(playlist_id=playlist_info["id"], user=user).first()
+        if playlist is None:
+            raise
+        print(f"📋 Playlist was imported concurrently: {playlist.title}")
+        _set_job_stage(job, 'exists', playlist=playlist)
+        return playlist
+
+    _mark_saved(job_videos_by_id, processed_videos)
+    _set_job_stage(job, 'saved', playlist=playlist)
+
+    print(f"✅ Successfully ingested playlist: {playlist.title}")
+    return playlist
+
+
+def resync_playlist(job):
+    """
+    Bring an existing playlist up to date with YouTube.
+
+    Only videos that are new to the playlist get transcripts and summaries.
+    Videos that disappeared from YouTube are flagged with ``is_removed``
+    (or deleted when ``job.remove_missing`` is set); existing videos and
+    their flashcards, quizzes and mindmaps are left untouched.
+
+    Args:
+        job (IngestJob): A claimed resync job with ``playlist`` set
+
+    Returns:
+        Playlist: The resynced playlist
+    """
+    user = job.user
+    playlist = job.playlist
+
+    _set_job_stage(job, 'enumerating')
+    # Bypass the enumeration cache: the point of a resync is to see new uploads
+    enumeration = fetch_playlist(playlist.playlist_url, use_cache=False)
+    current_ids = {v["id"] for v in enumeration["videos"]}
+
+    stored_videos = list(playlist.videos.all())
+    stored_ids = {video.video_id for video in stored_videos}
+    dropped_ids = [video.video_id for video in stored_videos if video.video_id not in current_ids and not video.is_removed]
+    restored_ids = [video.video_id for video in stored_videos if video.video_id in current_ids and video.is_removed]
+
+    new_videos = _filter_new_videos(user, [v for v in enumeration["videos"] if v["id"] not in stored_ids])
+    print(f"🔄 Resync {playlist.title}: {len(new_videos)} new, {len(dropped_ids)} dropped, {len(restored_ids)} restored")
+
+    # New videos share the duration limit with the videos already in the course
+    existing_duration = sum(video.duration_sec or 0 for video in stored_videos if video.video_id in current_ids)
+    budget = max(0, MAX_PLAYLIST_DURATION - existing_duration)
+
+    job_videos_by_id = _create_job_videos(job, new_videos)
+    candidate_videos = _prefilter_by_duration(new_videos, job_videos_by_id, budget)
+    _set_job_stage(job, 'transcripts', total_videos=len(candidate_videos))
+
+    transcripts_by_id, timecodes_by_id, durations_by_id = _fetch_transcripts(job, candidate_videos, job_videos_by_id)
+    _fill_missing_durations(candidate_videos, durations_by_id)
+    processed_videos = _apply_duration_budget(candidate_videos, durations_by_id, job_videos_by_id, budget)
+
+    compacts_by_id = _compact_transcripts(processed_videos, transcripts_by_id, timecodes_by_id)
+    _set_job_stage(job, 'summarizing', total_videos=len(processed_videos))
+    summaries_by_id = _summarize_videos(
+        job, processed_videos, transcripts_by_id, timecodes_by_id, compacts_by_id, job_videos_by_id
+    )
+
+    _set_job_stage(job, 'saving')
+    with transaction.atomic():
+        saved_videos = Video.objects.bulk_create(
+            _build_videos(
+                user, playlist, processed_videos,
+                transcripts_by_id, compacts_by_id, summaries_by_id, timecodes_by_id, durations_by_id
+            ),
+            batch_size=settings.INGEST_BULK_BATCH_SIZE
+        )
+        _index_transcripts(saved_videos)
+        if restored_ids:
+            playlist.videos.filter(video_id__in=restored_ids).update(is_removed=False)
+        if dropped_ids:
+            dropped = playlist.videos.filter(video_id__in=dropped_ids)
+            if job.remove_missing:
+                dropped.delete()
+            else:
+                dropped.update(is_removed=True)
+
+    _mark_saved(job_videos_by_id, processed_videos)
+    _set_job_stage(job, 'saved')
+
+    print(f"✅ Resynced playlist: {playlist.title}")
+    return playlist
+
+
+def mark_job_finished(job, status, error=''):
+    job.status = status
+    job.error = error
+    job.stage = 'done' if status == IngestJob.STATUS_SUCCEEDED else 'failed'
+    job.stage_timings[job.stage] = _elapsed(job)
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'error', 'stage', 'stage_timings', 'finished_at', 'updated_at'])
@@ -0,0 +1,246 @@
+"""
+Background pre-generation of study materials after ingest.
+
+With ``PREFETCH_ENABLED``, a finished ingest queues one ``PrefetchTask`` per
+artifact (flashcards, mindmap, quiz) for the first ``PREFETCH_VIDEOS``
+videos of the playlist, so the first click on those videos finds the rows
+already filled.
+
+Prefetch never competes with users:
+
+* tasks are claimed lowest ``priority`` first, and opening a video moves its
+  queued tasks to the front;
+* when a user asks for an artifact themselves, its queued task is skipped
+  and the request generates it directly; a task already running is waited
+  for (up to ``PREFETCH_TAKEOVER_WAIT_SECONDS``) and its result reused, and
+  whichever result is saved first is kept (``main/utils/artifact_store.py``);
+* LLM calls use ``PRIORITY_PREFETCH``, which leaves half of each rate bucket
+  to interactive calls, and the worker pauses while any provider's budget
+  is below ``PREFETCH_MIN_BUDGET``.
+
+Tasks left ``running`` by a worker that died are requeued after
+``PREFETCH_STALE_MINUTES``: by ``run_prefetch_worker`` at start, and with
+``PREFETCH_RUN_IN_PROCESS`` by ``recover_stale_tasks`` whenever tasks are
+queued or taken over.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from main.models import PrefetchTask, Video
+from main.utils.prompts.study_pack_prompt import STUDY_PACK_ARTIFACTS
+from main.utils.rate_limit import PRIORITY_PREFETCH, get_rate_limiter
+from main.utils.study_pack import generate_artifact, has_artifact
+
+# Queue priorities (lower runs first)
+PRIORITY_BACKGROUND = 100
+PRIORITY_OPENED = 10  # The user has opened the video
+
+TAKEOVER_POLL_SECONDS = 0.5
+
+# In-process recovery runs at most this often per process
+RECOVERY_INTERVAL_SECONDS = 60
+
+_executor = None
+_executor_lock = threading.Lock()
+_last_recovery = None
+_recovery_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="prefetch")
+    return _executor
+
+
+def enqueue_prefetch(playlist, user):
+    """
+    Queue pre-generation for the first ``PREFETCH_VIDEOS`` videos of a playlist.
+
+    Videos that already have a task for an artifact are left alone.
+
+    Returns:
+        int: Number of videos considered
+    """
+    videos = list(
+        Video.objects.filter(playlist=playlist, user=user, is_removed=False)
+        .exclude(full_transcript__isnull=True).exclude(full_transcript='')
+        .order_by('id')[:settings.PREFETCH_VIDEOS]
+    )
+    if not videos:
+        return 0
+
+    PrefetchTask.objects.bulk_create(
+        [
+            PrefetchTask(video=video, user=user, artifact=artifact, priority=PRIORITY_BACKGROUND)
+            for video in videos
+            for artifact in STUDY_PACK_ARTIFACTS
+            # Quizzes are sized by video length
+            if artifact != 'quiz' or video.duration_sec
+        ],
+        ignore_conflicts=True
+    )
+    print(f"📥 Queued study material prefetch for {len(videos)} videos of {playlist.title}")
+
+    if settings.PREFETCH_RUN_IN_PROCESS:
+        transaction.on_commit(lambda: _get_executor().submit(drain_prefetch_queue))
+        recover_stale_tasks()
+    return len(videos)
+
+
+def promote_prefetch(video, user):
+    """Move the video's queued tasks ahead of other prefetch work."""
+    return PrefetchTask.objects.filter(
+        video=video, user=user, status=PrefetchTask.STATUS_QUEUED, priority__gt=PRIORITY_OPENED
+    ).update(priority=PRIORITY_OPENED)
+
+
+def take_over_prefetch(video, user, artifacts):
+    """
+    A user request is generating ``artifacts`` for the video right now: skip
+    their queued tasks and promote the video's remaining ones. Tasks already
+    running are waited for, so the caller finds their result instead of
+    paying for a second generation.
+    """
+    # A task left running by a dead worker would be waited for in vain
+    recover_stale_tasks()
+    PrefetchTask.objects.filter(
+        video=video, user=user, artifact__in=artifacts, status=PrefetchTask.STATUS_QUEUED
+    ).update(status=PrefetchTask.STATUS_SKIPPED, error='taken over by a user request')
+    promote_prefetch(video, user)
+
+    running = PrefetchTask.objects.filter(
+        video=video, user=user, artifact__in=artifacts, status=PrefetchTask.STATUS_RUNNING
+    )
+    deadline = time.monotonic() + settings.PREFETCH_TAKEOVER_WAIT_SECONDS
+    while running.exists():
+        if time.monotonic() >= deadline:
+            print(f"⚠️ Prefetch for video {video.title} still running, generating without it")
+            return
+        time.sleep(TAKEOVER_POLL_SECONDS)
+
+
+def budget_available():
+    """Whether every provider has at least ``PREFETCH_MIN_BUDGET`` of its rate budget left."""
+    return all(
+        get_rate_limiter(provider).available() >= settings.PREFETCH_MIN_BUDGET
+        for provider in settings.LLM_RATE_LIMITS
+    )
+
+
+def claim_task():
+    """
+    Atomically move the most urgent queued task to ``running``.
+
+    Returns:
+        PrefetchTask | None: The claimed task, or None if the queue is empty
+    """
+    with transaction.atomic():
+        task = (
+            PrefetchTask.objects.select_for_update(skip_locked=True)
+            .filter(status=PrefetchTask.STATUS_QUEUED)
+            .order_by('priority', 'created_at')
+            .first()
+        )
+        if task is None:
+            return None
+        task.status = PrefetchTask.STATUS_RUNNING
+        task.save(update_fields=['status', 'updated_at'])
+    return task
+
+
+def _finish(task, status, error=''):
+    task.status = status
+    task.error = error
+    task.save(update_fields=['status', 'error', 'updated_at'])
+
+
+def run_task(task):
+    """Generate a claimed task's artifact unless the user already has it."""
+    video = task.video
+    if has_artifact(task.artifact, video, task.user):
+        _finish(task, PrefetchTask.STATUS_SKIPPED, 'already generated')
+        return
+
+    print(f"🔮 Prefetching {task.artifact} for video: {video.title}")
+    try:
+        generate_artifact(task.artifact, video, task.user, priority=PRIORITY_PREFETCH)
+        _finish(task, PrefetchTask.STATUS_DONE)
+        print(f"✅ Prefetched {task.artifact} for video: {video.title}")
+    except Exception as e:
+        print(f"❌ Prefetch of {task.artifact} failed for video {video.title}: {str(e)}")
+        _finish(task, PrefetchTask.STATUS_FAILED, str(e))
+
+
+def drain_prefetch_queue(stop_when_empty=True):
+    """
+    Run queued tasks one at a time, pausing while the rate budget is low.
+
+    Args:
+        stop_when_empty (bool): Return once the queue is empty instead of polling
+    """
+    close_old_connections()
+    try:
+        while True:
+            if not budget_available():
+                print("⏸️ Prefetch paused: LLM rate budget is low")
+                time.sleep(settings.PREFETCH_PAUSE_SECONDS)
+                continue
+
+            task = claim_task()
+            if task is None:
+                if stop_when_empty:
+                    return
+                time.sleep(settings.PREFETCH_PAUSE_SECONDS)
+                continue
+            run_task(task)
+    finally:
+        close_old_connections()
+
+
+def requeue_stale_tasks(older_than):
+    """
+    Return tasks stuck in ``running`` (e.g. after a worker restart) to the queue.
+
+    Returns:
+        int: Number of requeued tasks
+    """
+    return PrefetchTask.objects.filter(
+        status=PrefetchTask.STATUS_RUNNING,
+        updated_at__lt=timezone.now() - older_than
+    ).update(status=PrefetchTask.STATUS_QUEUED)
+
+
+def recover_stale_tasks():
+    """
+    In-process mode: requeue tasks left ``running`` by a process that is gone
+    and drain the queue on this process. Cheap to call often; it only
+    queries every RECOVERY_INTERVAL_SECONDS.
+
+    Returns:
+        int: Number of requeued tasks
+    """
+    global _last_recovery
+    if not (settings.PREFETCH_ENABLED and settings.PREFETCH_RUN_IN_PROCESS):
+        return 0
+    with _recovery_lock:
+        now = time.monotonic()
+        if _last_recovery is not None and now - _last_recovery < RECOVERY_INTERVAL_SECONDS:
+            return 0
+        _last_recovery = now
+
+    requeued = requeue_stale_tasks(timedelta(minutes=settings.PREFETCH_STALE_MINUTES))
+    if requeued:
+        print(f"🔁 Requeued {requeued} stale prefetch tasks")
+    # Also picks up queued tasks whose process died before draining them
+    if PrefetchTask.objects.filter(status=PrefetchTask.STATUS_QUEUED).exists():
+        _get_executor().submit(drain_prefetch_queue)
+    return requeued
@@ -32,6 +32,77 @@ INSTRUCTIONS:
 ANSWER:
 """
 
+def get_rag_chatbot_prompt(summary: str, excerpts: str, user_message: str) -> str:
+    """
+    Generate a chatbot prompt with the transcript excerpts relevant to the question.
+
+    Args:
+        summary (str): The video summary content (may be empty)
+        excerpts (str): Retrieved transcript windows, each starting with its ``[mm:ss]`` timestamp
+        user_message (str): User's question about the video
+
+    Returns:
+        str: Formatted prompt for the AI model
+    """
+    return f"""
+You are an expert assistant helping users understand video content. You have access to a video summary and to the transcript excerpts most relevant to the user's question, and need to answer based ONLY on that content.
+
+VIDEO SUMMARY:
+{summary or "(no summary available)"}
+
+TRANSCRIPT EXCERPTS:
+{excerpts}
+
+USER'S QUESTION:
+{user_message}
+
+INSTRUCTIONS:
+- Answer simply and briefly in 3-5 sentences
+- Base your answer ONLY on the video content provided above
+- Prefer the transcript excerpts for details, the summary for the big picture
+- Cite the timestamp of every excerpt you use in square brackets, exactly as written, e.g. [12:34]
+- If the question cannot be answered from the video content, politely explain that the information is not available in this video
+- Be helpful and precise
+- Use a conversational but professional tone
+
+ANSWER:
+"""
+
+def get_playlist_chatbot_prompt(playlist_title: str, excerpts: str, user_message: str) -> str:
+    """
+    Generate a chatbot prompt for a question about a whole course (playlist).
+
+    Args:
+        playlist_title (str): Title of the playlist
+        excerpts (str): Retrieved passages, each starting with its source, e.g. ``[Lecture 3 @ 12:34]``
+        user_message (str): User's question about the course
+
+    Returns:
+        str: Formatted prompt for the AI model
+    """
+    return f"""
+You are an expert assistant helping users find their way around a video course. You have access to the excerpts of the course videos most relevant to the user's question, and need to answer based ONLY on that content.
+
+COURSE:
+{playlist_title}
+
+EXCERPTS (each starts with its video title, and its timestamp if it has one):
+{excerpts}
+
+USER'S QUESTION:
+{user_message}
+
+INSTRUCTIONS:
+- Answer simply and briefly in 3-5 sentences
+- Base your answer ONLY on the excerpts provided above
+- Name the video every fact comes from, with the timestamp in square brackets exactly as written, e.g. "Lecture 3 - Gradients" [12:34]
+- If several videos cover the topic, say which one covers it best
+- If the question cannot be answered from the excerpts, politely explain that the information is not available in this course
+- Use a conversational but professional tone
+
+ANSWER:
+"""
+
 def get_no_summary_prompt() -> str:
     """
     Get prompt when no summary is available.
@@ -48,4 +119,51 @@ def get_empty_question_prompt() -> str:
     Returns:
         str: Help message prompt
     """
-    return "Please ask me a specific question about the video content, and I'll do my best to answer based on the video summary." 
\ No newline at end of file
+    return "Please ask me a specific question about the video content, and I'll do my best to answer based on the video summary." 
+
+
+def get_conversation_context_prompt(running_summary: str) -> str:
+    """
+    System message carrying the summary of earlier turns of the conversation.
+
+    Args:
+        running_summary (str): Compressed summary of older turns
+
+    Returns:
+        str: System message content
+    """
+    return (
+        "Summary of the earlier conversation with this user about the video "
+        "(use it to resolve follow-up questions):\n"
+        f"{running_summary}"
+    )
+
+
+def get_conversation_summary_prompt(running_summary: str, turns: str, max_words: int) -> str:
+    """
+    Prompt that folds older chat turns into the running conversation summary.
+
+    Args:
+        running_summary (str): Current summary (may be empty)
+        turns (str): Older turns as "User: ..." / "Assistant: ..." lines
+        max_words (int): Length limit of the new summary
+
+    Returns:
+        str: Formatted prompt for the AI model
+    """
+    return f"""
+Update the summary of a conversation between a student and an assistant about a video.
+
+CURRENT SUMMARY:
+{running_summary or "(empty)"}
+
+NEW TURNS TO ADD:
+{turns}
+
+INSTRUCTIONS:
+- Keep the questions asked, the facts and timestamps given in answers, and any open follow-ups
+- Drop greetings and repetition
+- Write at most {max_words} words of plain text, no preamble
+
+UPDATED SUMMARY:
+"""
@@ -72,6 +72,54 @@ INSTRUCTIONS:
 EXPLANATION:
 """
 
+def get_batch_quiz_explanation_prompt(items: list, video_summary: str) -> str:
+    """
+    Generate one prompt that explains several wrong answers at once.
+    
+    Args:
+        items (list[dict]): ``question_index``, ``answer_index`` and ``question_data`` per wrong answer
+        video_summary (str): Video summary for context
+        
+    Returns:
+        str: Prompt asking for a JSON object with one explanation per item
+    """
+    blocks = []
+    for item in items:
+        question_data = item['question_data']
+        answers = question_data.get('answers', [])
+        correct_index = question_data.get('correct_index', 0)
+        correct_answer = answers[correct_index] if correct_index < len(answers) else "Unknown"
+        blocks.append(f"""ITEM question_index={item['question_index']} answer_index={item['answer_index']}
+QUIZ QUESTION: {question_data.get('question', '')}
+ANSWER OPTIONS:
+{chr(10).join([f"{i+1}. {answer}" for i, answer in enumerate(answers)])}
+YOUR SELECTED ANSWER: {answers[item['answer_index']]}
+CORRECT ANSWER: {correct_answer}""")
+
+    return f"""
+You are an expert tutor helping students understand quiz questions based on video content. 
+
+VIDEO SUMMARY:
+{video_summary}
+
+A student answered the following questions incorrectly:
+
+{(chr(10) * 2).join(blocks)}
+
+For EACH item, write an explanation for the student that covers:
+1. Why the correct answer is right
+2. Why the selected answer is incorrect or less accurate
+3. What key information from the video supports the correct answer
+
+INSTRUCTIONS:
+- Base your explanations ONLY on the video content provided
+- Be educational and encouraging
+- Use clear, simple language
+- Keep each explanation concise but thorough (3-5 sentences), in Markdown
+- Return ONLY one valid JSON object, no text before or after it:
+{{"explanations": [{{"question_index": 0, "answer_index": 2, "explanation": "..."}}]}}
+"""
+
 def get_no_video_context_prompt() -> str:
     """
     Get prompt when no video context is available.
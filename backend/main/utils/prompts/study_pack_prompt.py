@@ -0,0 +1,46 @@
+STUDY_PACK_ARTIFACTS = ("flashcards", "mindmap", "quiz")
+
+
+def _artifact_instructions(num_questions: int):
+    return {
+        "flashcards": (
+            '"flashcards": a JSON array of exactly 10 objects with "question" and "answer" fields. '
+            "Questions test understanding of the key concepts (definitions, processes, applications, "
+            "comparisons); answers are 1-3 clear sentences."
+        ),
+        "mindmap": (
+            '"mindmap": a JSON object {"title": "Video Topic", "root": {"message": "Main Subject", '
+            '"children": [{"message": "Category", "children": [{"message": "Sub-topic", '
+            '"description": "1-2 sentence explanation"}]}]}} with 4-5 categories of 2-3 sub-topics each.'
+        ),
+        "quiz": (
+            f'"quiz": a JSON array of exactly {num_questions} multiple-choice questions, each '
+            '{"question": "...", "answers": ["...", "...", "...", "..."], "correct_index": 0}. '
+            "Exactly four answers, one correct; correct_index is the 0-based index of the correct answer. "
+            "Questions must be specific to the transcript, wrong answers plausible."
+        ),
+    }
+
+
+def get_system_prompt(artifacts, num_questions: int) -> str:
+    instructions = _artifact_instructions(num_questions)
+    fields = "\n".join(f"- {instructions[name]}" for name in artifacts)
+    return (
+        "You are an expert educational content creator. From one video transcript you build "
+        "study materials that help students learn and remember the key concepts.\n\n"
+        "Return ONLY one valid JSON object with these fields:\n"
+        f"{fields}\n\n"
+        "Important Rules:\n"
+        "- Output ONLY the JSON object, no other text\n"
+        "- Every field must follow its structure exactly\n"
+        "- Use clear, student-friendly language and content specific to the transcript"
+    )
+
+
+def get_user_prompt(transcript: str, artifacts) -> str:
+    return (
+        f"Transcript:\n"
+        f'"""{transcript}"""\n\n'
+        f"Create the study materials ({', '.join(artifacts)}) for this transcript. "
+        f"Return ONLY the JSON object as specified in the system prompt."
+    )
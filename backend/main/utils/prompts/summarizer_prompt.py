@@ -1,3 +1,10 @@
+# Bump whenever summarizer_prompt() changes so cached summaries are regenerated
+SUMMARY_PROMPT_VERSION = "2"
+
+# Bump whenever chunk_summarizer_prompt() changes so cached chunk notes are regenerated
+CHUNK_PROMPT_VERSION = "1"
+
+
 def summarizer_prompt():
     return """
 You are an expert assistant for summarizing educational YouTube video transcripts. Your task is to generate a **clear, structured, and well-formatted summary in Markdown**.
@@ -68,4 +75,13 @@ Always specify the programming language after the opening triple backticks.
 ---
 
 **Remember: Use proper Markdown formatting throughout - no plain text responses!**
-"""
\ No newline at end of file
+"""
+
+def chunk_summarizer_prompt():
+    return """
+You are summarizing one part of a longer educational YouTube video transcript. Your notes will later be merged with the notes for the other parts into a single summary.
+
+- Capture every main topic, key point, definition and example in this part, in the order they appear.
+- Keep any **code snippets** and **formulas** verbatim.
+- Use concise Markdown bullet points. Do not add an introduction or conclusion, and do not refer to "this part" or "the transcript".
+"""
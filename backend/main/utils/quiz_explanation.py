@@ -2,18 +2,25 @@
 Quiz explanation utility for generating AI explanations of quiz answers.
 """
 
-from openai import OpenAI
-import os
+from asgiref.sync import sync_to_async
 from django.shortcuts import get_object_or_404
+from main.llm import (
+    OPENAI_ONLY,
+    OPENAI_THEN_GROQ,
+    StreamCanceller,
+    ahedged_stream_chat_completion,
+    chat_completion,
+    hedged_stream_chat_completion
+)
 from main.models import Video, Quiz
+from .quiz_explanation_cache import get_cached_explanation, quiz_content_hash, store_explanation
+from .sse import DONE, asse_stream, astatic_stream, error_frame, sse_stream, static_stream
 from .prompts.quiz_explanation_prompt import (
     get_quiz_explanation_prompt, 
     get_no_video_context_prompt, 
     get_invalid_question_prompt
 )
 
-client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
-
 def process_quiz_explanation_request(user, video_uuid: str, question_index: int, user_answer_index: int):
     """
     Process quiz explanation request and return appropriate response generator.
@@ -32,6 +39,39 @@ def process_quiz_explanation_request(user, video_uuid: str, question_index: int,
         Video.DoesNotExist: If video not found
         Quiz.DoesNotExist: If quiz not found
     """
+    prompt, cache_key, cached = _prepare_quiz_explanation(user, video_uuid, question_index, user_answer_index)
+    if prompt is None:
+        return _generate_static_response(get_no_video_context_prompt())
+    if cached is not None:
+        return _replay_explanation(cached)
+    
+    # Return streaming response
+    return quiz_explanation_stream(prompt, cache_key)
+
+async def aprocess_quiz_explanation_request(user, video_uuid: str, question_index: int, user_answer_index: int):
+    """
+    Async version of ``process_quiz_explanation_request`` for ASGI views.
+    
+    Returns:
+        async generator: Streaming response generator
+    """
+    prompt, cache_key, cached = await sync_to_async(_prepare_quiz_explanation)(
+        user, video_uuid, question_index, user_answer_index
+    )
+    if prompt is None:
+        return _agenerate_static_response(get_no_video_context_prompt())
+    if cached is not None:
+        return _areplay_explanation(cached)
+    return aquiz_explanation_stream(prompt, cache_key)
+
+def _prepare_quiz_explanation(user, video_uuid, question_index, user_answer_index):
+    """
+    Validate the request, build the explanation prompt and look it up in the cache.
+    
+    Returns:
+        tuple: ``(prompt, cache_key, cached_explanation)``; ``prompt`` is None
+        if the video has no summary for context, ``cached_explanation`` is None on a miss
+    """
     # Validation
     if not video_uuid:
         raise ValueError("video_uuid is required")
@@ -60,7 +100,10 @@ def process_quiz_explanation_request(user, video_uuid: str, question_index: int,
     
     # Check if video has summary for context
     if not video.summary:
-        return _generate_static_response(get_no_video_context_prompt())
+        return None, None, None
+    
+    # Users who got the same quiz share explanations
+    cache_key = (quiz_content_hash(quiz.quiz_json, video.summary), question_index, user_answer_index)
     
     # Generate explanation prompt
     prompt = get_quiz_explanation_prompt(
@@ -68,9 +111,7 @@ def process_quiz_explanation_request(user, video_uuid: str, question_index: int,
         user_answer_index=user_answer_index,
         video_summary=video.summary
     )
-    
-    # Return streaming response
-    return quiz_explanation_stream(prompt)
+    return prompt, cache_key, get_cached_explanation(*cache_key)
 
 def _generate_static_response(message: str):
     """
@@ -79,35 +120,90 @@ def _generate_static_response(message: str):
     Args:
         message (str): Static message to send
         
-    Yields:
-        str: Formatted SSE data
+    Returns:
+        generator: Formatted SSE data
     """
-    yield f"data: {message}\n\n"
-    yield f"data: [DONE]\n\n"
+    return static_stream(message, DONE)
+
+def _agenerate_static_response(message: str):
+    return astatic_stream(message, DONE)
 
-def quiz_explanation_stream(prompt: str):
+def _replay_explanation(explanation: str):
     """
-    Stream quiz explanation response using OpenAI API.
+    Replay a cached explanation in streaming format, all at once.
+    
+    Args:
+        explanation (str): Stored explanation
+        
+    Returns:
+        generator: Formatted SSE data; the explanation is a single event
+    """
+    return static_stream(explanation, DONE)
+
+def _areplay_explanation(explanation: str):
+    return astatic_stream(explanation, DONE)
+
+def quiz_explanation_stream(prompt: str, cache_key=None):
+    """
+    Stream quiz explanation response using OpenAI API, hedged with Groq when
+    OpenAI is slow to start.
     
     Args:
         prompt (str): Formatted prompt for the AI model
+        cache_key (tuple, optional): ``(content_hash, question_index, answer_index)``
+            the complete explanation is stored under
         
-    Yields:
-        str: Formatted SSE data chunks
+    Returns:
+        generator: Formatted SSE data, deltas coalesced (see main/utils/sse.py)
+    """
+    canceller = StreamCanceller()
+    return sse_stream(_explanation_pieces(prompt, cache_key, canceller), canceller)
+
+def aquiz_explanation_stream(prompt: str, cache_key=None):
     """
+    Async version of ``quiz_explanation_stream``: the stream is a coroutine
+    on the event loop, not a worker thread.
+    
+    Args:
+        prompt (str): Formatted prompt for the AI model
+        cache_key (tuple, optional): Key the complete explanation is stored under
+        
+    Returns:
+        async generator: Formatted SSE data
+    """
+    return asse_stream(_aexplanation_pieces(prompt, cache_key))
+
+def _explanation_pieces(prompt, cache_key, canceller=None):
+    explanation = []
+    try:
+        for text_piece in hedged_stream_chat_completion(
+            [{"role": "user", "content": prompt}], route=OPENAI_THEN_GROQ, endpoint="quiz_explanation",
+            canceller=canceller
+        ):
+            explanation.append(text_piece)
+            yield text_piece
+        if canceller is not None and canceller.cancelled:
+            # The client left: a cut-off explanation is not stored
+            return
+        if cache_key:
+            store_explanation(*cache_key, "".join(explanation))
+        yield DONE
+    except Exception as e:
+        yield error_frame(e)
+
+async def _aexplanation_pieces(prompt, cache_key):
+    explanation = []
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}],
-            stream=True
-        )
-        for chunk in response:
-            if chunk.choices[0].delta.content:
-                text_piece = chunk.choices[0].delta.content
-                yield f"data: {text_piece}\n\n"
-        yield f"data: [DONE]\n\n"
+        async for text_piece in ahedged_stream_chat_completion(
+            [{"role": "user", "content": prompt}], route=OPENAI_THEN_GROQ, endpoint="quiz_explanation"
+        ):
+            explanation.append(text_piece)
+            yield text_piece
+        if cache_key:
+            await sync_to_async(store_explanation)(*cache_key, "".join(explanation))
+        yield DONE
     except Exception as e:
-        yield f"data: [Error: {str(e)}]\n\n"
+        yield error_frame(e)
 
 def quiz_explanation_sync(prompt: str):
     """
@@ -120,13 +216,9 @@ def quiz_explanation_sync(prompt: str):
         dict: Response with success status and content
     """
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}],
-            stream=False
-        )
+        result = chat_completion([{"role": "user", "content": prompt}], route=OPENAI_ONLY)
         return {
-            "explanation": response.choices[0].message.content,
+            "explanation": result.content,
             "success": True
         }
     except Exception as e:
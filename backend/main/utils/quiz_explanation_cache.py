@@ -0,0 +1,210 @@
+"""
+Cache of quiz answer explanations.
+
+A quiz has a finite set of explanations — one per ``(question_index,
+answer_index)`` — and every user who picks the same wrong answer used to
+trigger an identical generation. Explanations are stored per ``(content
+hash, question_index, answer_index)``, where the hash covers the questions,
+answers and the video summary the prompt is built from, so users who got the
+same quiz (quizzes themselves come from the LLM response cache) share them.
+A hit is sent as a single SSE event instead of being generated again.
+
+With ``QUIZ_EXPLANATION_PREGENERATE``, submitting a quiz explains all of the
+user's wrong answers in the background with a single LLM call, so the
+"explain" clicks that usually follow are already cached.
+"""
+
+import hashlib
+import json
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from main.llm import OPENAI_THEN_GROQ, LLMError, chat_completion
+from main.models import Quiz, QuizExplanation
+from main.utils.prompts.quiz_explanation_prompt import get_batch_quiz_explanation_prompt
+from main.utils.rate_limit import PRIORITY_QUIZ
+
+# Output tokens allowed per explanation in a batch
+BATCH_TOKENS_PER_EXPLANATION = 250
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="quiz-explanations")
+    return _executor
+
+
+def _cutoff():
+    return timezone.now() - timedelta(days=settings.LLM_CACHE_TTL_DAYS)
+
+
+def quiz_content_hash(quiz_json, video_summary):
+    """Hash of everything an explanation prompt of this quiz is built from."""
+    content = json.dumps([quiz_json, video_summary or ''], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def get_cached_explanation(content_hash, question_index, answer_index):
+    """
+    Returns:
+        str | None: The stored explanation, or None on a miss (or with the cache disabled)
+    """
+    if not settings.QUIZ_EXPLANATION_CACHE_ENABLED:
+        return None
+
+    entries = QuizExplanation.objects.filter(
+        content_hash=content_hash,
+        question_index=question_index,
+        answer_index=answer_index,
+        last_used_at__gte=_cutoff()
+    )
+    if not entries.update(hit_count=F('hit_count') + 1, last_used_at=timezone.now()):
+        return None
+    return entries.values_list('explanation', flat=True).first()
+
+
+def store_explanation(content_hash, question_index, answer_index, explanation, source=None):
+    if not settings.QUIZ_EXPLANATION_CACHE_ENABLED or not explanation.strip():
+        return
+    try:
+        QuizExplanation.objects.update_or_create(
+            content_hash=content_hash,
+            question_index=question_index,
+            answer_index=answer_index,
+            defaults={
+                'explanation': explanation,
+                'source': source or QuizExplanation.SOURCE_STREAM,
+                'last_used_at': timezone.now(),
+            }
+        )
+    except IntegrityError:
+        # Stored concurrently by another request or the batch
+        pass
+
+
+def _wrong_answers(quiz):
+    """``(question_index, answer_index, question_data)`` of the submitted answers that were wrong."""
+    wrong = []
+    for answer in quiz.user_answers or []:
+        question_index = answer.get('question_index')
+        answer_index = answer.get('selected_answer')
+        if answer.get('is_correct') or not isinstance(answer_index, int) or not isinstance(question_index, int):
+            continue
+        if not 0 <= question_index < len(quiz.quiz_json):
+            continue
+        question_data = quiz.quiz_json[question_index]
+        if 0 <= answer_index < len(question_data.get('answers', [])):
+            wrong.append((question_index, answer_index, question_data))
+    return wrong
+
+
+def _batch_parser(expected):
+    def parse(content):
+        match = re.search(r'\{.*\}', content, re.DOTALL)
+        data = json.loads(match.group(0) if match else content)
+        explanations = {}
+        for item in data.get('explanations', []) if isinstance(data, dict) else []:
+            try:
+                key = (int(item['question_index']), int(item['answer_index']))
+            except (KeyError, TypeError, ValueError):
+                continue
+            text = item.get('explanation')
+            if key in expected and isinstance(text, str) and text.strip():
+                explanations[key] = text.strip()
+        if not explanations:
+            raise ValueError("Batch contained no usable explanation")
+        return explanations
+    return parse
+
+
+def pregenerate_explanations(quiz):
+    """
+    Explain every wrong answer of a submitted quiz that is not cached yet,
+    with one LLM call.
+
+    Args:
+        quiz: Quiz with ``user_answers`` recorded by a submission
+
+    Returns:
+        int: Number of explanations stored
+    """
+    summary = quiz.quiz_video.summary
+    if not summary:
+        return 0
+
+    content_hash = quiz_content_hash(quiz.quiz_json, summary)
+    cached = set(
+        QuizExplanation.objects.filter(content_hash=content_hash, last_used_at__gte=_cutoff())
+        .values_list('question_index', 'answer_index')
+    )
+    items = [
+        {'question_index': question_index, 'answer_index': answer_index, 'question_data': question_data}
+        for question_index, answer_index, question_data in _wrong_answers(quiz)
+        if (question_index, answer_index) not in cached
+    ]
+    if not items:
+        return 0
+
+    expected = {(item['question_index'], item['answer_index']) for item in items}
+    try:
+        result = chat_completion(
+            [{"role": "user", "content": get_batch_quiz_explanation_prompt(items, summary)}],
+            route=OPENAI_THEN_GROQ,
+            max_tokens=BATCH_TOKENS_PER_EXPLANATION * len(items) + 100,
+            parse=_batch_parser(expected),
+            cache=False,
+            priority=PRIORITY_QUIZ
+        )
+    except LLMError as e:
+        print(f"⚠️ Could not pre-generate quiz explanations: {str(e)}")
+        return 0
+
+    for (question_index, answer_index), explanation in result.parsed.items():
+        store_explanation(content_hash, question_index, answer_index, explanation, QuizExplanation.SOURCE_BATCH)
+    print(f"💡 Pre-generated {len(result.parsed)}/{len(items)} quiz explanations for {quiz.quiz_video.title}")
+    return len(result.parsed)
+
+
+def _pregenerate_in_background(quiz_id):
+    close_old_connections()
+    try:
+        quiz = Quiz.objects.select_related('quiz_video').filter(id=quiz_id).first()
+        if quiz:
+            pregenerate_explanations(quiz)
+    except Exception as e:
+        print(f"❌ Quiz explanation batch failed: {str(e)}")
+    finally:
+        close_old_connections()
+
+
+def schedule_pregeneration(quiz):
+    """Queue ``pregenerate_explanations`` for a submitted quiz if QUIZ_EXPLANATION_PREGENERATE is on."""
+    if not (settings.QUIZ_EXPLANATION_PREGENERATE and settings.QUIZ_EXPLANATION_CACHE_ENABLED):
+        return
+    transaction.on_commit(lambda: _get_executor().submit(_pregenerate_in_background, quiz.id))
+
+
+def prune_quiz_explanations(clear=False):
+    """
+    Delete explanations unused for LLM_CACHE_TTL_DAYS (every one with ``clear``).
+
+    Returns:
+        int: Number of deleted explanations
+    """
+    entries = QuizExplanation.objects.all()
+    if not clear:
+        entries = entries.filter(last_used_at__lt=_cutoff())
+    deleted, _ = entries.delete()
+    return deleted
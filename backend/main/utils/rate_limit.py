@@ -0,0 +1,326 @@
+"""
+Request and token rate limiting for LLM providers, shared across workers.
+
+Each provider has a token bucket for requests per minute and one for
+tokens per minute (``LLM_RATE_LIMITS`` / ``LLM_TOKEN_LIMITS``). Bucket state
+lives in Postgres (``RateLimitBucket``, row locked with ``SELECT ... FOR
+UPDATE``) or in a file guarded by ``flock``, so every gunicorn worker and
+ingest worker draws from the same budget. ``LLM_RATE_LIMIT_BACKEND`` picks
+``database``, ``file`` or ``memory`` (single process only).
+
+Callers that would overdraw a bucket wait for it to refill instead of
+getting a 429. Priorities keep part of each bucket free for more
+interactive work: a summary only proceeds while 30% of the budget would be
+left over, so a chat message is never stuck behind an ingest.
+
+Async callers (``aacquire``, ``aadjust``, ``adrain``) wait on the event loop.
+The memory backend is updated inline; the database and file backends block
+on a lock, so their updates run on a dedicated pool of
+``LLM_ASYNC_BOOKKEEPING_THREADS`` threads (``run_blocking``). Concurrent
+async streams are then limited by coroutines, not by a thread pool.
+"""
+
+import asyncio
+import functools
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+
+PRIORITY_CHAT = 'chat'
+PRIORITY_QUIZ = 'quiz'
+PRIORITY_FLASHCARDS = 'flashcards'
+PRIORITY_MINDMAP = 'mindmap'
+PRIORITY_SUMMARY = 'summary'
+PRIORITY_PREFETCH = 'prefetch'
+
+# priority: (share of each bucket kept free for higher priorities, longest wait in seconds)
+PRIORITIES = {
+    PRIORITY_CHAT: (0.0, 10),
+    PRIORITY_QUIZ: (0.1, 30),
+    PRIORITY_FLASHCARDS: (0.15, 30),
+    PRIORITY_MINDMAP: (0.15, 30),
+    PRIORITY_SUMMARY: (0.3, 300),
+    PRIORITY_PREFETCH: (0.5, 60),
+}
+
+# Waiting callers re-check the shared bucket at least this often
+POLL_SECONDS = 1.0
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a call would have to wait longer than its priority allows."""
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.LLM_ASYNC_BOOKKEEPING_THREADS,
+                thread_name_prefix="llm-bookkeeping"
+            )
+    return _executor
+
+
+def _in_worker(fn, *args, **kwargs):
+    try:
+        return fn(*args, **kwargs)
+    except DatabaseError:
+        # Pool threads keep their connection between calls; drop one that broke
+        connection.close()
+        raise
+
+
+async def run_blocking(fn, *args, **kwargs):
+    """
+    Run blocking LLM bookkeeping (rate limit store, stats rows) for an async caller.
+
+    Uses the dedicated bookkeeping pool instead of the default executor shared
+    with ``sync_to_async``; each of its threads keeps one DB connection.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), functools.partial(_in_worker, fn, *args, **kwargs))
+
+
+def _refill(bucket, now, limits):
+    requests_per_minute, tokens_per_minute = limits
+    elapsed = max(0.0, now - bucket['refilled_at'])
+    bucket['requests'] = min(requests_per_minute, bucket['requests'] + elapsed * requests_per_minute / 60.0)
+    bucket['tokens'] = min(tokens_per_minute, bucket['tokens'] + elapsed * tokens_per_minute / 60.0)
+    bucket['refilled_at'] = now
+
+
+def _take(bucket, now, limits, tokens, reserve):
+    """
+    Take one request and ``tokens`` tokens if the buckets allow it.
+
+    Returns:
+        float: 0 when taken, otherwise seconds until enough budget refills
+    """
+    _refill(bucket, now, limits)
+    requests_per_minute, tokens_per_minute = limits
+
+    # A call larger than the bucket runs once the bucket is full
+    tokens = min(tokens, tokens_per_minute * (1 - reserve))
+    need_requests = min(requests_per_minute, 1 + requests_per_minute * reserve)
+    need_tokens = min(tokens_per_minute, tokens + tokens_per_minute * reserve)
+
+    if bucket['requests'] >= need_requests and bucket['tokens'] >= need_tokens:
+        bucket['requests'] -= 1
+        bucket['tokens'] -= tokens
+        return 0.0
+
+    wait_requests = max(0.0, need_requests - bucket['requests']) * 60.0 / requests_per_minute
+    wait_tokens = max(0.0, need_tokens - bucket['tokens']) * 60.0 / tokens_per_minute
+    return max(wait_requests, wait_tokens, 0.01)
+
+
+def _full_bucket(limits, now):
+    return {'requests': float(limits[0]), 'tokens': float(limits[1]), 'refilled_at': now}
+
+
+class MemoryBackend:
+    # Updates only hold an in-process lock for a moment: safe on the event loop
+    blocking = False
+
+    def __init__(self):
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def update(self, provider, limits, fn):
+        with self.lock:
+            now = time.time()
+            bucket = self.buckets.setdefault(provider, _full_bucket(limits, now))
+            return fn(bucket, now)
+
+
+class FileBackend:
+    blocking = True
+
+    def __init__(self, path):
+        self.path = path
+
+    def update(self, provider, limits, fn):
+        import fcntl  # POSIX only
+
+        with open(self.path, 'a+') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            f.seek(0)
+            raw = f.read()
+            state = json.loads(raw) if raw.strip() else {}
+            now = time.time()
+            bucket = state.setdefault(provider, _full_bucket(limits, now))
+            result = fn(bucket, now)
+            f.seek(0)
+            f.truncate()
+            json.dump(state, f)
+            f.flush()
+        return result
+
+
+class DatabaseBackend:
+    blocking = True
+
+    def update(self, provider, limits, fn):
+        from main.models import RateLimitBucket  # Import here to avoid circular imports
+
+        with transaction.atomic():
+            row = RateLimitBucket.objects.select_for_update().filter(provider=provider).first()
+            if row is None:
+                now = time.time()
+                RateLimitBucket.objects.get_or_create(
+                    provider=provider,
+                    defaults={'requests': limits[0], 'tokens': limits[1], 'refilled_at': now}
+                )
+                row = RateLimitBucket.objects.select_for_update().get(provider=provider)
+
+            bucket = {'requests': row.requests, 'tokens': row.tokens, 'refilled_at': row.refilled_at}
+            result = fn(bucket, time.time())
+            row.requests = bucket['requests']
+            row.tokens = bucket['tokens']
+            row.refilled_at = bucket['refilled_at']
+            row.save(update_fields=['requests', 'tokens', 'refilled_at'])
+        return result
+
+
+class RateLimiter:
+    """Request and token budget of one provider."""
+
+    def __init__(self, provider: str, backend):
+        self.provider = provider
+        self.backend = backend
+
+    @property
+    def limits(self):
+        return settings.LLM_RATE_LIMITS[self.provider], settings.LLM_TOKEN_LIMITS[self.provider]
+
+    def acquire(self, tokens=0, priority=PRIORITY_CHAT):
+        """
+        Block until the provider can take one more call of ``tokens`` tokens.
+
+        Args:
+            tokens (int): Estimated input + output tokens of the call
+            priority (str): One of ``PRIORITIES``
+
+        Raises:
+            RateLimitExceeded: If the wait would exceed the priority's limit
+        """
+        reserve, max_wait = PRIORITIES.get(priority, PRIORITIES[PRIORITY_CHAT])
+        limits = self.limits
+        deadline = time.monotonic() + max_wait
+        while True:
+            wait = self.backend.update(
+                self.provider, limits,
+                lambda bucket, now: _take(bucket, now, limits, tokens, reserve)
+            )
+            if self._check_wait(wait, deadline, priority):
+                return
+            time.sleep(min(wait, POLL_SECONDS))
+
+    async def aacquire(self, tokens=0, priority=PRIORITY_CHAT):
+        """Async version of ``acquire``: waits for the budget on the event loop."""
+        reserve, max_wait = PRIORITIES.get(priority, PRIORITIES[PRIORITY_CHAT])
+        limits = self.limits
+        deadline = time.monotonic() + max_wait
+        while True:
+            wait = await self._aupdate(limits, lambda bucket, now: _take(bucket, now, limits, tokens, reserve))
+            if self._check_wait(wait, deadline, priority):
+                return
+            await asyncio.sleep(min(wait, POLL_SECONDS))
+
+    def _check_wait(self, wait, deadline, priority):
+        """True once the call was taken; raises if the budget would refill too late."""
+        if wait <= 0:
+            return True
+        if time.monotonic() + wait > deadline:
+            raise RateLimitExceeded(
+                f"{self.provider} rate budget needs {wait:.1f}s to refill for a {priority} call"
+            )
+        return False
+
+    async def _aupdate(self, limits, fn):
+        if self.backend.blocking:
+            return await run_blocking(self.backend.update, self.provider, limits, fn)
+        return self.backend.update(self.provider, limits, fn)
+
+    def _adjust_fn(self, limits, tokens_delta):
+        def apply(bucket, now):
+            _refill(bucket, now, limits)
+            bucket['tokens'] = max(-limits[1], min(limits[1], bucket['tokens'] - tokens_delta))
+        return apply
+
+    def adjust(self, tokens_delta):
+        """Charge (positive) or refund (negative) tokens once a call's real usage is known."""
+        limits = self.limits
+        self.backend.update(self.provider, limits, self._adjust_fn(limits, tokens_delta))
+
+    async def aadjust(self, tokens_delta):
+        limits = self.limits
+        await self._aupdate(limits, self._adjust_fn(limits, tokens_delta))
+
+    @staticmethod
+    def _drain(bucket, now):
+        bucket.update(requests=0.0, tokens=0.0, refilled_at=now)
+
+    def drain(self):
+        """Empty the buckets after the provider answered 429 anyway."""
+        self.backend.update(self.provider, self.limits, self._drain)
+
+    async def adrain(self):
+        await self._aupdate(self.limits, self._drain)
+
+    def available(self):
+        """
+        Returns:
+            float: Smaller of the request and token budget fractions left (0..1)
+        """
+        limits = self.limits
+
+        def read(bucket, now):
+            _refill(bucket, now, limits)
+            return min(bucket['requests'] / limits[0], bucket['tokens'] / limits[1])
+
+        return max(0.0, self.backend.update(self.provider, limits, read))
+
+
+_backend = None
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def _get_backend():
+    global _backend
+    if _backend is None:
+        name = settings.LLM_RATE_LIMIT_BACKEND
+        if name == 'database':
+            _backend = DatabaseBackend()
+        elif name == 'file':
+            _backend = FileBackend(settings.LLM_RATE_LIMIT_FILE)
+        else:
+            _backend = MemoryBackend()
+    return _backend
+
+
+def get_rate_limiter(provider: str):
+    """
+    Return the limiter for a provider, configured by ``LLM_RATE_LIMITS`` and
+    ``LLM_TOKEN_LIMITS``.
+
+    Args:
+        provider (str): Provider name, e.g. "groq" or "openai"
+
+    Returns:
+        RateLimiter: Limiter backed by the configured shared store
+    """
+    with _limiters_lock:
+        if provider not in _limiters:
+            _limiters[provider] = RateLimiter(provider, _get_backend())
+        return _limiters[provider]
@@ -0,0 +1,255 @@
+"""
+Server-sent event framing shared by the streaming endpoints.
+
+LLM providers send one delta per token, so framing every delta as an event
+meant thousands of tiny writes per answer. ``sse_stream`` (and
+``asse_stream`` for async views) turns a stream of text deltas into events:
+
+- deltas are coalesced into one event per ``SSE_COALESCE_SECONDS`` or
+  ``SSE_COALESCE_MAX_CHARS``, whichever comes first; the first delta is sent
+  at once, so time to first token does not change
+- a ``: keepalive`` comment goes out after ``SSE_HEARTBEAT_SECONDS`` without
+  an event, e.g. during a long wait for the first token, so proxies and load
+  balancers keep the connection open
+- a payload spanning several lines is sent as one ``data:`` line per line,
+  which clients join back with ``\\n``, so newlines in answers survive
+- when the client goes away, the LLM call is cancelled at once, even while
+  it is still waiting for its first token (pass the call's
+  ``StreamCanceller`` to ``sse_stream``; async streams are cancelled directly)
+
+A ``Frame`` (``DONE``, ``error_frame(...)``, JSON progress events) is sent as
+an event of its own, right after the text buffered before it.
+"""
+
+import asyncio
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections
+from django.http import StreamingHttpResponse
+
+KEEPALIVE = ": keepalive\n\n"
+
+_END = object()
+
+
+class Frame:
+    """A payload sent as an event of its own, never merged with the text around it."""
+
+    __slots__ = ('data',)
+
+    def __init__(self, data):
+        self.data = data
+
+
+DONE = Frame("[DONE]")
+
+
+def error_frame(error):
+    return Frame(f"[Error: {str(error)}]")
+
+
+def format_event(data):
+    """
+    Frame one payload as an SSE event.
+
+    Args:
+        data (str): Payload; may contain line breaks
+
+    Returns:
+        str: ``data:`` lines followed by a blank line
+    """
+    lines = str(data).replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    return "".join(f"data: {line}\n" for line in lines) + "\n"
+
+
+class _Coalescer:
+    """Buffers text deltas and decides when to write them, or a heartbeat."""
+
+    def __init__(self):
+        self.interval = settings.SSE_COALESCE_SECONDS
+        self.max_chars = settings.SSE_COALESCE_MAX_CHARS
+        self.heartbeat = settings.SSE_HEARTBEAT_SECONDS
+        self.buffer = []
+        self.size = 0
+        # The first delta is written at once
+        self.last_flush = float('-inf')
+        self.last_write = time.monotonic()
+
+    def add(self, item):
+        """Returns what to write for an item of the stream ('' for nothing yet)."""
+        if isinstance(item, Frame):
+            return self.flush() + self._write(item.data)
+        if not item:
+            return ""
+        self.buffer.append(item)
+        self.size += len(item)
+        if self.size >= self.max_chars or time.monotonic() - self.last_flush >= self.interval:
+            return self.flush()
+        return ""
+
+    def flush(self):
+        if not self.buffer:
+            return ""
+        text = "".join(self.buffer)
+        self.buffer = []
+        self.size = 0
+        self.last_flush = time.monotonic()
+        return self._write(text)
+
+    def _write(self, data):
+        self.last_write = time.monotonic()
+        return format_event(data)
+
+    def timeout(self):
+        """Seconds until buffered text is due, or a heartbeat if nothing is buffered."""
+        now = time.monotonic()
+        if self.buffer:
+            return max(0.0, self.last_flush + self.interval - now)
+        return max(0.0, self.last_write + self.heartbeat - now)
+
+    def tick(self):
+        """Returns what to write when nothing arrived within ``timeout()``."""
+        if self.buffer:
+            return self.flush()
+        if time.monotonic() - self.last_write >= self.heartbeat:
+            self.last_write = time.monotonic()
+            return KEEPALIVE
+        return ""
+
+
+def sse_stream(items, canceller=None):
+    """
+    Frame a stream of text deltas and ``Frame`` objects as SSE, for sync views.
+
+    The stream is consumed on a helper thread, so heartbeats and coalesced
+    text go out while it is blocked (e.g. waiting for the first token). If
+    the client disconnects, ``canceller`` is cancelled, which ends the
+    upstream LLM call wherever it is blocked and releases its connection,
+    rate budget and circuit breaker trial; the stream itself is closed
+    before its next item.
+
+    Args:
+        items (iterable): Text deltas and ``Frame`` objects
+        canceller (StreamCanceller, optional): Canceller of the LLM call behind ``items``
+
+    Yields:
+        str: SSE events and keepalive comments
+    """
+    coalescer = _Coalescer()
+    pending = queue.Queue()
+    stop = threading.Event()
+    finished = False
+
+    def produce():
+        try:
+            for item in items:
+                if stop.is_set():
+                    break
+                pending.put(item)
+        except Exception as e:
+            pending.put(error_frame(e))
+        finally:
+            close = getattr(items, 'close', None)
+            if close:
+                close()
+            pending.put(_END)
+            # The stream may have used the ORM on this thread
+            connections.close_all()
+
+    threading.Thread(target=produce, name="sse-stream", daemon=True).start()
+    try:
+        while True:
+            try:
+                item = pending.get(timeout=coalescer.timeout())
+            except queue.Empty:
+                chunk = coalescer.tick()
+            else:
+                if item is _END:
+                    finished = True
+                    chunk = coalescer.flush()
+                    if chunk:
+                        yield chunk
+                    return
+                chunk = coalescer.add(item)
+            if chunk:
+                yield chunk
+    finally:
+        # Client gone or stream finished: let the producer close the upstream
+        stop.set()
+        if not finished and canceller is not None:
+            # The producer may be blocked inside the LLM call, far from its next item
+            canceller.cancel()
+
+
+async def asse_stream(items):
+    """
+    Async version of ``sse_stream`` for ASGI views.
+
+    When the client disconnects, Django cancels the response; the pending
+    read of ``items`` is cancelled with it, which cancels the LLM call.
+
+    Args:
+        items (async iterable): Text deltas and ``Frame`` objects
+
+    Yields:
+        str: SSE events and keepalive comments
+    """
+    coalescer = _Coalescer()
+    iterator = items.__aiter__()
+    next_item = None
+    try:
+        while True:
+            if next_item is None:
+                next_item = asyncio.ensure_future(iterator.__anext__())
+            done, _ = await asyncio.wait({next_item}, timeout=coalescer.timeout())
+            if not done:
+                chunk = coalescer.tick()
+            else:
+                task, next_item = next_item, None
+                try:
+                    item = task.result()
+                except StopAsyncIteration:
+                    chunk = coalescer.flush()
+                    if chunk:
+                        yield chunk
+                    return
+                except Exception as e:
+                    item = error_frame(e)
+                chunk = coalescer.add(item)
+            if chunk:
+                yield chunk
+    finally:
+        if next_item is not None:
+            next_item.cancel()
+            try:
+                await next_item
+            except (asyncio.CancelledError, Exception):
+                pass
+        aclose = getattr(iterator, 'aclose', None)
+        if aclose:
+            await aclose()
+
+
+def static_stream(*payloads):
+    """Events of a response known up front, e.g. a static answer followed by ``DONE``."""
+    for payload in payloads:
+        yield format_event(payload.data if isinstance(payload, Frame) else payload)
+
+
+async def astatic_stream(*payloads):
+    for payload in payloads:
+        yield format_event(payload.data if isinstance(payload, Frame) else payload)
+
+
+def event_stream_response(events):
+    """
+    Streaming response for SSE, with the headers that stop proxies (nginx)
+    from buffering it.
+    """
+    response = StreamingHttpResponse(events, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
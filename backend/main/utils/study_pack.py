@@ -0,0 +1,252 @@
+"""
+Study pack generation: flashcards, mindmap and quiz from one LLM call.
+
+The transcript is sent once with a combined structured prompt. Any artifact
+that comes back missing or malformed is regenerated with its own generator,
+so one bad field does not waste the other two.
+"""
+
+import json
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connection
+
+from main.llm import LLMError, chat_completion
+from main.utils.artifact_store import save_if_empty
+from main.utils.generate_flashcards import generate_flashcards_from_transcript, validate_flashcards
+from main.utils.generate_mindmap import generate_mindmap_from_video, validate_mindmap_structure
+from main.utils.generate_quiz import generate_quiz_from_transcript, quiz_question_count, validate_quiz_data
+from main.utils.prompts.study_pack_prompt import STUDY_PACK_ARTIFACTS, get_system_prompt, get_user_prompt
+from main.utils.rate_limit import PRIORITY_QUIZ
+from main.utils.transcript_compact import prompt_transcript
+
+# One response carries all three artifacts
+STUDY_PACK_MAX_TOKENS = {"groq": 8000, "openai": 12000}
+
+
+def _validate_mindmap(mindmap_data):
+    if not validate_mindmap_structure(mindmap_data):
+        raise ValueError("Mindmap does not follow the expected structure")
+    return mindmap_data
+
+
+VALIDATORS = {
+    "flashcards": validate_flashcards,
+    "mindmap": _validate_mindmap,
+    "quiz": validate_quiz_data,
+}
+
+
+def _existing_artifacts(video, user):
+    from main.models import Flashcard, MindMap, Quiz  # Import here to avoid circular imports
+
+    return {
+        "flashcards": Flashcard.objects.filter(flashcard_video=video, user=user).first(),
+        "mindmap": MindMap.objects.filter(mindmap_video=video, user=user).first(),
+        "quiz": Quiz.objects.filter(quiz_video=video, user=user).first(),
+    }
+
+
+def _artifact_data(name, obj):
+    if obj is None:
+        return None
+    return {
+        "flashcards": lambda: obj.flashcards_json,
+        "mindmap": lambda: obj.mindmap_json,
+        "quiz": lambda: obj.quiz_json,
+    }[name]()
+
+
+def _artifact_uuid(name, obj):
+    return {
+        "flashcards": lambda: obj.uuid_flashcard,
+        "mindmap": lambda: obj.uuid_mindmap,
+        "quiz": lambda: obj.uuid_quiz,
+    }[name]()
+
+
+def _save_artifact(name, video, user, data):
+    """Save a generated artifact unless the user already has one (e.g. from a prefetch that finished first)."""
+    from main.models import Flashcard, MindMap, Quiz  # Import here to avoid circular imports
+
+    if name == "flashcards":
+        obj, _ = save_if_empty(Flashcard, {'flashcard_video': video, 'user': user}, 'flashcards_json', data)
+        return obj
+
+    if name == "mindmap":
+        obj, _ = save_if_empty(MindMap, {'mindmap_video': video, 'user': user}, 'mindmap_json', data)
+        return obj
+
+    obj, _ = save_if_empty(
+        Quiz, {'quiz_video': video, 'user': user}, 'quiz_json', data,
+        questions_count=len(data), quiz_duration_seconds=video.duration_sec
+    )
+    return obj
+
+
+def _combined_parser(artifacts):
+    def parse(content):
+        # Models sometimes wrap the object in ```json fences or add a sentence around it
+        match = re.search(r'\{.*\}', content, re.DOTALL)
+        pack = json.loads(match.group(0) if match else content)
+        if not isinstance(pack, dict):
+            raise ValueError("Study pack must be a JSON object")
+
+        valid = {}
+        for name in artifacts:
+            try:
+                valid[name] = VALIDATORS[name](pack.get(name))
+            except (ValueError, TypeError) as e:
+                print(f"⚠️ Study pack {name} is invalid, it will be generated separately: {e}")
+        if not valid:
+            raise ValueError("Study pack contained no valid artifact")
+        return valid
+    return parse
+
+
+def has_artifact(name, video, user):
+    """Whether the user already has non-empty ``name`` (flashcards, mindmap or quiz) for the video."""
+    return bool(_artifact_data(name, _existing_artifacts(video, user)[name]))
+
+
+def generate_artifact(name, video, user, priority=None):
+    """
+    Generate and save one artifact with its own generator.
+
+    Args:
+        name (str): One of ``STUDY_PACK_ARTIFACTS``
+        video: Video with a transcript
+        user: Django user object
+        priority (str, optional): Rate limit priority; each generator's own by default
+    """
+    options = {"priority": priority} if priority else {}
+    if name == "flashcards":
+        generate_flashcards_from_transcript(video, user, **options)
+    elif name == "mindmap":
+        generate_mindmap_from_video(video, user, **options)
+    else:
+        quiz_data = generate_quiz_from_transcript(prompt_transcript(video), video.duration_sec, **options)
+        _save_artifact(name, video, user, quiz_data)
+
+
+def _generate_separately(name, video, user):
+    """
+    Fall back to the single-artifact generator; it persists its own result.
+
+    Returns:
+        float: Seconds spent
+    """
+    started = time.perf_counter()
+    try:
+        generate_artifact(name, video, user)
+        return time.perf_counter() - started
+    finally:
+        # Runs on a pool thread with its own DB connection
+        connection.close()
+
+
+def generate_study_pack(video, user):
+    """
+    Generate whichever of flashcards, mindmap and quiz the user does not have yet.
+
+    Args:
+        video: Video with a transcript
+        user: Django user object
+
+    Returns:
+        dict: ``artifacts`` by name, each with ``status`` (existing/generated/failed),
+        ``source`` (existing/combined/separate), ``seconds``, ``uuid``, ``data`` and
+        ``error``; plus ``combined_seconds`` and ``total_seconds``
+
+    Raises:
+        ValueError: If the video has no transcript
+    """
+    transcript = prompt_transcript(video)
+    if not transcript.strip():
+        raise ValueError("No transcript available for this video")
+
+    started = time.perf_counter()
+    existing = _existing_artifacts(video, user)
+    report = {}
+    missing = []
+    for name in STUDY_PACK_ARTIFACTS:
+        data = _artifact_data(name, existing[name])
+        if data:
+            report[name] = {"status": "existing", "source": "existing", "seconds": 0.0}
+        else:
+            missing.append(name)
+
+    # Quizzes are sized by video length
+    if "quiz" in missing and not video.duration_sec:
+        missing.remove("quiz")
+        report["quiz"] = {"status": "failed", "source": "combined", "seconds": 0.0,
+                          "error": "Invalid video duration"}
+
+    combined_seconds = None
+    pending = list(missing)
+    if missing:
+        print(f"🚀 Generating study pack ({', '.join(missing)}) for video: {video.title}")
+        call_started = time.perf_counter()
+        try:
+            result = chat_completion(
+                [
+                    {"role": "system", "content": get_system_prompt(missing, quiz_question_count(video.duration_sec))},
+                    {"role": "user", "content": get_user_prompt(transcript, missing)},
+                ],
+                temperature=0.7,
+                max_tokens=STUDY_PACK_MAX_TOKENS,
+                parse=_combined_parser(missing),
+                priority=PRIORITY_QUIZ,
+            )
+            generated = result.parsed
+            print(f"✅ Study pack generated with {result.provider}: {', '.join(generated)}")
+        except LLMError as e:
+            print(f"❌ Combined study pack generation failed: {str(e)}")
+            generated = {}
+        combined_seconds = round(time.perf_counter() - call_started, 3)
+
+        for name, data in generated.items():
+            save_started = time.perf_counter()
+            _save_artifact(name, video, user, data)
+            report[name] = {
+                "status": "generated",
+                "source": "combined",
+                "seconds": round(combined_seconds + time.perf_counter() - save_started, 3),
+            }
+            pending.remove(name)
+
+    if pending:
+        print(f"🔄 Generating separately: {', '.join(pending)}")
+        fallback_started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(pending), thread_name_prefix="study-pack") as executor:
+            futures = {name: executor.submit(_generate_separately, name, video, user) for name in pending}
+        for name, future in futures.items():
+            error = future.exception()
+            seconds = time.perf_counter() - fallback_started if error else future.result()
+            report[name] = {
+                "status": "failed" if error else "generated",
+                "source": "separate",
+                "seconds": round((combined_seconds or 0) + seconds, 3),
+            }
+            if error:
+                print(f"❌ Study pack {name} failed: {error}")
+                report[name]["error"] = str(error)
+
+    current = _existing_artifacts(video, user)
+    artifacts = {}
+    for name in STUDY_PACK_ARTIFACTS:
+        obj = current[name]
+        artifacts[name] = {
+            "error": "",
+            **report[name],
+            "data": _artifact_data(name, obj),
+            "uuid": _artifact_uuid(name, obj) if obj else None,
+        }
+
+    return {
+        "artifacts": artifacts,
+        "combined_seconds": combined_seconds,
+        "total_seconds": round(time.perf_counter() - started, 3),
+    }
@@ -1,19 +1,191 @@
-from groq import Groq
-import os
-from dotenv import load_dotenv
+import re
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-from main.utils.prompts.summarizer_prompt import summarizer_prompt
+from django.conf import settings
+from django.db import connection
 
-load_dotenv()
+from main.llm import GROQ_MODEL, GROQ_ONLY, chat_completion
+from main.utils.rate_limit import PRIORITY_SUMMARY
+from main.utils.prompts.summarizer_prompt import CHUNK_PROMPT_VERSION, summarizer_prompt, chunk_summarizer_prompt
 
-# Initialize Groq client
-client = Groq(api_key=os.getenv('GROQ_API_KEY'))
+SUMMARY_MODEL = GROQ_MODEL
 
 
 prompt = summarizer_prompt()
+chunk_prompt = chunk_summarizer_prompt()
 
-def summarize_transcript(transcript_text, max_words=1200, prompt=prompt):
+# Chunk summaries live in the same cache as full summaries under their own model key,
+# which carries the chunk prompt version so changing that prompt regenerates them
+CHUNK_CACHE_MODEL = f"{SUMMARY_MODEL}:chunk-v{CHUNK_PROMPT_VERSION}"
+
+# A failed chunk is retried once, then left out of the notes
+CHUNK_ATTEMPTS = 2
+# Reduce levels before the notes are cut to fit the final prompt
+MAX_REDUCE_LEVELS = 3
+
+
+def estimate_tokens(text):
+    # ~4 characters per token is close enough for budgeting English transcripts
+    return len(text or "") // 4
+
+
+def chunk_transcript(transcript_text, timecodes=None, max_tokens=None):
+    """
+    Split a transcript into pieces of at most ``max_tokens`` (estimated).
+
+    Chunks break on caption segment boundaries when ``timecodes`` are given,
+    otherwise on sentence boundaries, so no chunk starts mid-sentence.
+
+    Args:
+        transcript_text (str): Full transcript text
+        timecodes (list[dict], optional): Caption segments with a ``text`` key
+        max_tokens (int, optional): Budget per chunk, defaults to SUMMARY_CHUNK_TOKENS
+
+    Returns:
+        list[str]: Transcript chunks in order
+    """
+    max_tokens = max_tokens or settings.SUMMARY_CHUNK_TOKENS
+
+    if timecodes:
+        pieces = [segment.get('text', '').strip() for segment in timecodes if isinstance(segment, dict)]
+    else:
+        pieces = re.split(r'(?<=[.!?])\s+', transcript_text)
+
+    chunks = []
+    current = []
+    current_tokens = 0
+    for piece in pieces:
+        if not piece:
+            continue
+        piece_tokens = estimate_tokens(piece) + 1
+
+        # A single oversized piece (e.g. captions without punctuation) is split on words
+        if piece_tokens > max_tokens:
+            words = piece.split()
+            step = max(1, max_tokens * 4 // 6)
+            sub_pieces = [' '.join(words[i:i + step]) for i in range(0, len(words), step)]
+        else:
+            sub_pieces = [piece]
+
+        for sub_piece in sub_pieces:
+            sub_tokens = estimate_tokens(sub_piece) + 1
+            if current and current_tokens + sub_tokens > max_tokens:
+                chunks.append(' '.join(current))
+                current = []
+                current_tokens = 0
+            current.append(sub_piece)
+            current_tokens += sub_tokens
+
+    if current:
+        chunks.append(' '.join(current))
+    return chunks
+
+
+def _complete(system_prompt, user_prompt, max_tokens):
+    # Groq only: cached summaries are keyed by SUMMARY_MODEL. Summaries have
+    # their own cache (content_cache.py), so the LLM response cache is skipped
+    result = chat_completion(
+        [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ],
+        route=GROQ_ONLY,
+        max_tokens=max_tokens,
+        temperature=0.3,
+        cache=False,
+        priority=PRIORITY_SUMMARY
+    )
+    return result.content
+
+
+def _summarize_chunk(chunk):
+    return _complete(
+        chunk_prompt,
+        f"Write detailed notes for this part of the transcript:\n\n{chunk}",
+        settings.SUMMARY_CHUNK_OUTPUT_TOKENS
+    )
+
+
+def _summarize_chunk_in_worker(chunk):
+    try:
+        for attempt in range(1, CHUNK_ATTEMPTS + 1):
+            try:
+                return _summarize_chunk(chunk)
+            except Exception as e:
+                print(f"⚠️ Chunk summary failed (attempt {attempt}/{CHUNK_ATTEMPTS}): {str(e)}")
+        return None
+    finally:
+        # Chunk threads open their own DB connection for the rate limiter
+        connection.close()
+
+
+def _summarize_chunks(chunks):
+    """
+    Summarize chunks concurrently, reusing cached chunk summaries so a re-run
+    only pays for chunks whose text changed. Chunks that still fail after
+    CHUNK_ATTEMPTS come back as ``None`` and are not cached.
+    """
+    from main.utils.content_cache import get_cached_summary, store_summary  # Import here to avoid circular imports
+
+    results = [get_cached_summary(chunk, CHUNK_CACHE_MODEL) for chunk in chunks]
+    missing = [index for index, result in enumerate(results) if not result]
+    print(f"🧩 Summarizing {len(missing)} of {len(chunks)} chunks ({len(chunks) - len(missing)} cached)")
+
+    if missing:
+        with ThreadPoolExecutor(max_workers=settings.SUMMARY_CHUNK_CONCURRENCY, thread_name_prefix="summarize-chunk") as executor:
+            for index, chunk_summary in zip(missing, executor.map(_summarize_chunk_in_worker, [chunks[i] for i in missing])):
+                results[index] = chunk_summary
+                if chunk_summary:
+                    store_summary(chunks[index], CHUNK_CACHE_MODEL, chunk_summary)
+
+    return results
+
+
+def _join_notes(notes):
+    """
+    Join chunk summaries into numbered parts, skipping chunks that failed.
+
+    Raises:
+        RuntimeError: If every chunk failed
+    """
+    notes = [note for note in notes if note]
+    if not notes:
+        raise RuntimeError("Every chunk summary failed")
+    return "\n\n".join(f"### Part {index + 1}\n{note}" for index, note in enumerate(notes))
+
+
+def _map_reduce_summary(transcript_text, timecodes, max_words, prompt):
+    chunks = chunk_transcript(transcript_text, timecodes)
+    combined = _join_notes(_summarize_chunks(chunks))
+
+    # Very long videos may need more than one reduce level to fit the final prompt
+    for level in range(MAX_REDUCE_LEVELS):
+        if estimate_tokens(combined) <= settings.SUMMARY_CHUNK_TOKENS:
+            break
+        reduced = _join_notes(_summarize_chunks(chunk_transcript(combined)))
+        if len(reduced) >= len(combined):
+            print(f"⚠️ Reduce level {level + 1} did not shrink the notes, stopping")
+            break
+        combined = reduced
+
+    if estimate_tokens(combined) > settings.SUMMARY_CHUNK_TOKENS:
+        print(f"⚠️ Notes still exceed {settings.SUMMARY_CHUNK_TOKENS} tokens, cutting them to fit")
+        combined = combined[:settings.SUMMARY_CHUNK_TOKENS * 4]
+
+    return _complete(
+        prompt,
+        f"The following notes cover consecutive parts of one video transcript. "
+        f"Combine them into a single summary of at least {max_words} words, focusing on main topics only:\n\n{combined}",
+        max(settings.SUMMARY_MAX_OUTPUT_TOKENS, max_words * 2)
+    )
+
+
+def summarize_transcript(transcript_text, max_words=1200, prompt=prompt, timecodes=None):
+    """
+    Summarize a transcript. Transcripts longer than SUMMARY_CHUNK_TOKENS are
+    split into chunks, summarized concurrently and reduced into one summary.
+    """
     if not transcript_text:
         return {
             'success': False,
@@ -23,18 +195,14 @@ def summarize_transcript(transcript_text, max_words=1200, prompt=prompt):
     try:
         start_time = time.time()
 
-        
-        completion = client.chat.completions.create(
-            model="llama-3.1-8b-instant",  
-            messages=[
-                {"role": "system", "content": prompt},
-                {"role": "user", "content": f"Summarize this transcript in at least {max_words} words, focusing on main topics only:\n\n{transcript_text}"}
-            ],
-            max_tokens=min(1000, max_words * 2), 
-            temperature=0.3
-        )
-        
-        summary = completion.choices[0].message.content
+        if estimate_tokens(transcript_text) <= settings.SUMMARY_CHUNK_TOKENS:
+            summary = _complete(
+                prompt,
+                f"Summarize this transcript in at least {max_words} words, focusing on main topics only:\n\n{transcript_text}",
+                max(settings.SUMMARY_MAX_OUTPUT_TOKENS, max_words * 2)
+            )
+        else:
+            summary = _map_reduce_summary(transcript_text, timecodes, max_words, prompt)
         
         processing_time = time.time() - start_time
         word_count = len(summary.split())
@@ -51,4 +219,38 @@ def summarize_transcript(transcript_text, max_words=1200, prompt=prompt):
             'summary': ''
         }
 
-        
\ No newline at end of file
+
+def _summarize_in_worker(transcript, timecodes):
+    try:
+        return summarize_transcript(transcript, timecodes=timecodes)
+    finally:
+        # Pool threads open their own DB connection for the chunk cache
+        connection.close()
+
+
+def summarize_transcripts_concurrently(transcripts, timecodes_list=None, max_workers=None):
+    """
+    Summarize several transcripts on a bounded thread pool.
+
+    Args:
+        transcripts (list[str]): Transcripts in playlist order
+        timecodes_list (list, optional): Caption segments for each transcript, used for chunking
+        max_workers (int, optional): Concurrency limit, defaults to SUMMARY_CONCURRENCY
+
+    Yields:
+        tuple[int, str | dict]: ``(index, summary)`` pairs as each summary finishes;
+        ``index`` refers to ``transcripts`` so callers can keep playlist order
+    """
+    max_workers = max_workers or settings.SUMMARY_CONCURRENCY
+    timecodes_list = timecodes_list or [None] * len(transcripts)
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="summarize") as executor:
+        futures = {
+            executor.submit(_summarize_in_worker, transcript, timecodes): index
+            for index, (transcript, timecodes) in enumerate(zip(transcripts, timecodes_list))
+        }
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                yield index, future.result()
+            except Exception as e:
+                yield index, {'success': False, 'error': str(e), 'summary': ''}
@@ -1,12 +1,98 @@
-from openai import OpenAI
-import os
+import re
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.shortcuts import get_object_or_404
+from main.llm import (
+    OPENAI_ONLY,
+    OPENAI_THEN_GROQ,
+    StreamCanceller,
+    ahedged_stream_chat_completion,
+    chat_completion,
+    hedged_stream_chat_completion
+)
 from main.models import Video
-from .prompts.chatbot_prompt import get_chatbot_prompt, get_no_summary_prompt, get_empty_question_prompt
+from .chat_memory import add_turn, get_or_create_session, history_messages, schedule_compression
+from .prompts.chatbot_prompt import (
+    get_chatbot_prompt,
+    get_rag_chatbot_prompt,
+    get_no_summary_prompt,
+    get_empty_question_prompt
+)
+from .sse import DONE, asse_stream, astatic_stream, error_frame, sse_stream, static_stream
+from .summarizer import estimate_tokens
+from .transcript_index import format_timestamp, retrieve_windows
+
+# [12:34] or [1:02:03]
+TIMESTAMP_RE = re.compile(r'\[(?:\d+:)?\d{1,2}:\d{2}\]')
+
+
+def _bounded_summary(summary: str) -> str:
+    # Long summaries are cut so the prompt size does not grow with the video
+    limit = settings.RAG_SUMMARY_MAX_TOKENS * 4
+    if estimate_tokens(summary) <= settings.RAG_SUMMARY_MAX_TOKENS:
+        return summary
+    return summary[:limit].rsplit(' ', 1)[0] + " ..."
+
+
+def _format_excerpts(windows) -> str:
+    return "\n\n".join(f"[{format_timestamp(window['start'])}] {window['text']}" for window in windows)
+
+
+def _sources_trailer(answer, sources):
+    # The model cited nothing: point at the excerpts it was given
+    if sources and not TIMESTAMP_RE.search("".join(answer)):
+        return f" (Sources: {', '.join(f'[{source}]' for source in sources)})"
+    return None
+
+
+def process_chatbot_request(user, video_uuid: str, user_message: str, session_uuid: str = None):
+    """
+    Build the streamed answer to a chatbot question.
+
+    Args:
+        user: Django user object
+        video_uuid (str): Video the question is about
+        user_message (str): The question
+        session_uuid (str, optional): Conversation to continue; a new one is started without it
+
+    Returns:
+        tuple[generator, ChatSession | None]: SSE chunks of the answer, and the session it
+        belongs to; None when the video has nothing to answer from and no session was given
+    """
+    session, prompt, sources, history = _prepare_chatbot_request(user, video_uuid, user_message, session_uuid)
+    if prompt is None:
+        # Return generator for no summary case
+        return _generate_static_response(get_no_summary_prompt()), session
+
+    # Return streaming response
+    return summary_chatbot_stream(prompt, sources, history, session, user_message.strip()), session
+
+
+async def aprocess_chatbot_request(user, video_uuid: str, user_message: str, session_uuid: str = None):
+    """
+    Async version of ``process_chatbot_request`` for ASGI views.
+
+    Returns:
+        tuple[async generator, ChatSession | None]: SSE chunks of the answer, and the session it belongs to
+    """
+    session, prompt, sources, history = await sync_to_async(_prepare_chatbot_request)(
+        user, video_uuid, user_message, session_uuid
+    )
+    if prompt is None:
+        return _agenerate_static_response(get_no_summary_prompt()), session
+    return asummary_chatbot_stream(prompt, sources, history, session, user_message.strip()), session
 
-client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
 
-def process_chatbot_request(user, video_uuid: str, user_message: str):
+def _prepare_chatbot_request(user, video_uuid, user_message, session_uuid):
+    """
+    Validate a question and build its prompt.
+
+    Returns:
+        tuple: ``(session, prompt, sources, history)``; ``prompt`` is None if
+        the video has neither a summary nor a transcript to answer from, and
+        then ``session`` is None too unless ``session_uuid`` was given
+    """
     # Validation
     if not video_uuid:
         raise ValueError("video_uuid is required")
@@ -16,35 +102,96 @@ def process_chatbot_request(user, video_uuid: str, user_message: str):
 
     # Get video and summary
     video = get_object_or_404(Video, uuid_video=video_uuid, user=user)
+    # A given session is checked up front; a new one is only started for a streamed answer
+    session = get_or_create_session(user, video, session_uuid) if session_uuid else None
+
+    # Only the transcript windows relevant to the question go into the prompt
+    windows = retrieve_windows(video, user_message)
     
-    if not video.summary:
-        # Return generator for no summary case
-        return _generate_static_response(get_no_summary_prompt())
-    
-    # Generate chatbot prompt
-    prompt = get_chatbot_prompt(video.summary, user_message.strip())
-    
-    # Return streaming response
-    return summary_chatbot_stream(prompt)
+    if not video.summary and not windows:
+        return session, None, None, None
+
+    if session is None:
+        session = get_or_create_session(user, video)
+
+    sources = None
+    if windows:
+        prompt = get_rag_chatbot_prompt(_bounded_summary(video.summary), _format_excerpts(windows), user_message.strip())
+        sources = [format_timestamp(window['start']) for window in windows]
+    else:
+        # Generate chatbot prompt
+        prompt = get_chatbot_prompt(_bounded_summary(video.summary), user_message.strip())
+
+    # Earlier turns go in front of the prompt; the question is stored with its answer
+    history = history_messages(session)
+    return session, prompt, sources, history
 
 def _generate_static_response(message: str):
-    yield f"data: {message}\n\n"
-    yield f"data: [DONE]\n\n"
+    return static_stream(message, DONE)
+
+def _agenerate_static_response(message: str):
+    return astatic_stream(message, DONE)
+
+def summary_chatbot_stream(prompt: str, sources=None, history=None, session=None, question=None):
+    canceller = StreamCanceller()
+    return sse_stream(_answer_pieces(prompt, sources, history, session, question, canceller), canceller)
 
-def summary_chatbot_stream(prompt: str):
+def asummary_chatbot_stream(prompt: str, sources=None, history=None, session=None, question=None):
+    return asse_stream(_aanswer_pieces(prompt, sources, history, session, question))
+
+def _answer_pieces(prompt, sources, history, session, question, canceller=None):
+    answer = []
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}],
-            stream=True
-        )
-        for chunk in response:
-            if chunk.choices[0].delta.content:
-                text_piece = chunk.choices[0].delta.content
-                yield f"data: {text_piece}\n\n"
-        yield f"data: [DONE]\n\n"
+        # Groq is started too if OpenAI is slow to answer; the first to stream wins
+        for text_piece in hedged_stream_chat_completion(
+            [*(history or []), {"role": "user", "content": prompt}],
+            route=OPENAI_THEN_GROQ,
+            endpoint="summary_chatbot",
+            canceller=canceller
+        ):
+            answer.append(text_piece)
+            yield text_piece
+        if canceller is not None and canceller.cancelled:
+            # The client left: a cut-off answer is not stored
+            return
+        trailer = _sources_trailer(answer, sources)
+        if trailer:
+            answer.append(trailer)
+            yield trailer
+        if session is not None:
+            add_turn(session, question, "".join(answer))
+        yield DONE
     except Exception as e:
-        yield f"data: [Error: {str(e)}]\n\n"
+        yield error_frame(e)
+        return
+
+    if session is not None:
+        # Old turns are folded by a small LLM call; it must not hold up this stream
+        schedule_compression(session)
+
+async def _aanswer_pieces(prompt, sources, history, session, question):
+    answer = []
+    try:
+        async for text_piece in ahedged_stream_chat_completion(
+            [*(history or []), {"role": "user", "content": prompt}],
+            route=OPENAI_THEN_GROQ,
+            endpoint="summary_chatbot"
+        ):
+            answer.append(text_piece)
+            yield text_piece
+        trailer = _sources_trailer(answer, sources)
+        if trailer:
+            answer.append(trailer)
+            yield trailer
+        if session is not None:
+            await sync_to_async(add_turn)(session, question, "".join(answer))
+        yield DONE
+    except Exception as e:
+        yield error_frame(e)
+        return
+
+    if session is not None:
+        schedule_compression(session)
 
 # Legacy function for backward compatibility
 def summary_chatbot(prompt: str):
@@ -52,13 +199,9 @@ def summary_chatbot(prompt: str):
 
 def summary_chatbot_sync(prompt: str):
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}],
-            stream=False
-        )
+        result = chat_completion([{"role": "user", "content": prompt}], route=OPENAI_ONLY)
         return {
-            "response": response.choices[0].message.content,
+            "response": result.content,
             "success": True
         }
     except Exception as e:
@@ -0,0 +1,136 @@
+"""
+Deterministic transcript compaction.
+
+Auto-generated YouTube captions repeat the tail of the previous caption
+window at the start of the next one, contain non-speech markers such as
+``[Music]`` and are full of filler words. Every prompt built from a
+transcript pays for that noise, so ingest stores a compacted copy next to
+the raw ``full_transcript``.
+"""
+
+import re
+
+from django.conf import settings
+
+from main.utils.summarizer import estimate_tokens
+
+# [Music], [Applause], [__], (laughter), ♪ ... ♪
+NON_SPEECH_RE = re.compile(
+    r'\[[^\]]*\]'
+    r'|\((?:[^)]*\b(?:music|applause|laughter|laughs|inaudible|silence|noise|cheering)\b[^)]*)\)'
+    r'|[♪♫]+',
+    re.IGNORECASE
+)
+FILLER_RE = re.compile(r'\b(?:u+m+|u+h+|uhm|erm|er|a+h+|hm+|mm+)\b[,.]?', re.IGNORECASE)
+WHITESPACE_RE = re.compile(r'\s+')
+
+# How many trailing words of the output are compared with the start of the next caption
+OVERLAP_WINDOW = 30
+
+
+def _normalize_word(word):
+    return re.sub(r'[^\w]', '', word.lower())
+
+
+def clean_caption_text(text):
+    """Drop non-speech markers and filler words, collapse whitespace."""
+    text = NON_SPEECH_RE.sub(' ', text or '')
+    text = FILLER_RE.sub(' ', text)
+    return WHITESPACE_RE.sub(' ', text).strip()
+
+
+def _overlap(tail_words, words):
+    """Length of the longest suffix of ``tail_words`` that is a prefix of ``words``."""
+    for size in range(min(len(tail_words), len(words)), 0, -1):
+        if tail_words[-size:] == words[:size]:
+            return size
+    return 0
+
+
+def compact_segments(segments):
+    """
+    Compact caption segments, keeping their timing fields.
+
+    Rolling captions repeat words already emitted by the previous window; the
+    repeated prefix is removed when it is at least two words long or covers
+    the whole segment, so a single naturally repeated word survives.
+
+    Args:
+        segments (list[dict]): Caption segments with a ``text`` key
+
+    Returns:
+        list[dict]: Copies of the non-empty segments with compacted ``text``
+    """
+    compacted = []
+    tail = []
+    for segment in segments or []:
+        if not isinstance(segment, dict):
+            continue
+        words = clean_caption_text(segment.get('text', '')).split()
+        if not words:
+            continue
+
+        normalized = [_normalize_word(word) for word in words]
+        size = _overlap(tail, normalized)
+        if size >= 2 or size == len(words):
+            words = words[size:]
+            normalized = normalized[size:]
+        if not words:
+            continue
+
+        compacted.append({**segment, 'text': ' '.join(words)})
+        tail = (tail + normalized)[-OVERLAP_WINDOW:]
+    return compacted
+
+
+def _dedupe_sentences(text):
+    sentences = re.split(r'(?<=[.!?])\s+', text)
+    kept = []
+    for sentence in sentences:
+        if kept and sentence.lower() == kept[-1].lower():
+            continue
+        kept.append(sentence)
+    return ' '.join(kept)
+
+
+def compact_transcript(transcript, segments=None):
+    """
+    Build the compacted transcript and its token savings.
+
+    Args:
+        transcript (str): Raw transcript text
+        segments (list[dict], optional): Caption segments; enables rolling-window dedupe
+
+    Returns:
+        tuple[str, list[dict] | None, dict]: Compacted text, compacted segments
+        (None without ``segments``) and stats with ``original_tokens``,
+        ``compact_tokens`` and ``saved_tokens``
+    """
+    transcript = transcript or ''
+    if segments:
+        compacted_segments = compact_segments(segments)
+        text = ' '.join(segment['text'] for segment in compacted_segments)
+    else:
+        compacted_segments = None
+        text = _dedupe_sentences(clean_caption_text(transcript))
+
+    original_tokens = estimate_tokens(transcript)
+    compact_tokens = estimate_tokens(text)
+    stats = {
+        'original_tokens': original_tokens,
+        'compact_tokens': compact_tokens,
+        'saved_tokens': max(0, original_tokens - compact_tokens),
+    }
+    return text, compacted_segments, stats
+
+
+def prompt_transcript(video):
+    """
+    Transcript text generators should put in prompts for a video.
+
+    Returns the compacted transcript when ``USE_COMPACT_TRANSCRIPT`` is on and
+    one was stored at ingest, otherwise the raw ``full_transcript``.
+    """
+    if settings.USE_COMPACT_TRANSCRIPT and video.compact_transcript:
+        return video.compact_transcript
+    return video.full_transcript or ''
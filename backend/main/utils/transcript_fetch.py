@@ -1,28 +1,142 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
 import os 
 from dotenv import load_dotenv
 load_dotenv()
 
 YOUTUBE_TRANSCRIPT_API = os.getenv('YOUTUBE_TRANSCRIPT_API')
+YOUTUBE_TRANSCRIPT_API_URL = os.getenv('YOUTUBE_TRANSCRIPT_API_URL', "https://www.youtube-transcript.io/api/transcripts")
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class TranscriptClient:
+    """
+    Client for the youtube-transcript.io batch endpoint.
+
+    Video IDs are split into provider-sized batches that run concurrently over
+    one pooled ``requests.Session``. Batches that hit 429/5xx or a network
+    error are retried with exponential backoff and jitter; a batch that keeps
+    failing only loses its own videos.
+    """
+
+    def __init__(self, api_key=None, url=None, batch_size=None, max_workers=None,
+                 max_retries=None, backoff=None, timeout=None):
+        self.api_key = api_key or YOUTUBE_TRANSCRIPT_API
+        self.url = url or YOUTUBE_TRANSCRIPT_API_URL
+        self.batch_size = batch_size or settings.TRANSCRIPT_BATCH_SIZE
+        self.max_workers = max_workers or settings.TRANSCRIPT_CONCURRENCY
+        self.max_retries = max_retries if max_retries is not None else settings.TRANSCRIPT_MAX_RETRIES
+        self.backoff = backoff if backoff is not None else settings.TRANSCRIPT_BACKOFF_SECONDS
+        self.timeout = timeout or settings.TRANSCRIPT_TIMEOUT_SECONDS
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "Authorization": f"Basic {self.api_key}",
+            "Content-Type": "application/json"
+        })
+
+    def _retry_delay(self, attempt, response=None):
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            # A huge Retry-After must not park a batch (and its ingest job) for hours
+            return min(float(retry_after), self.backoff * (2 ** self.max_retries))
+        # Full jitter keeps concurrent batches from retrying in lockstep
+        return random.uniform(0, self.backoff * (2 ** attempt))
+
+    def _fetch_batch(self, video_ids):
+        """
+        Returns:
+            tuple[list, str | None]: Payloads and the error that ended the batch, if any
+        """
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            response = None
+            try:
+                response = self.session.post(self.url, json={"ids": video_ids}, timeout=self.timeout)
+                if response.status_code == 200:
+                    return response.json(), None
+                last_error = f"HTTP {response.status_code}: {response.text[:200]}"
+                if response.status_code not in RETRYABLE_STATUS_CODES:
+                    break
+            except ValueError as e:
+                # Also requests' JSONDecodeError, which is a RequestException too
+                last_error = f"Invalid JSON response: {e}"
+                break
+            except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError) as e:
+                last_error = str(e)
+            except requests.RequestException as e:
+                # Anything else (too many redirects, an undecodable body...) would fail again;
+                # only this batch's videos are lost
+                last_error = str(e)
+                break
+
+            if attempt < self.max_retries:
+                delay = self._retry_delay(attempt, response)
+                print(f"🔁 Transcript batch failed ({last_error}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+        print("❌ Ошибка:", last_error)
+        return [], last_error
+
+    def fetch(self, video_ids):
+        """
+        Fetch transcripts for any number of videos.
+
+        Args:
+            video_ids (list[str]): YouTube video IDs
+
+        Returns:
+            tuple[dict, dict]: Payloads by video ID, and error messages by video ID
+            for every video that could not be fetched
+        """
+        batches = [video_ids[i:i + self.batch_size] for i in range(0, len(video_ids), self.batch_size)]
+        payloads = {}
+        errors = {}
+        if not batches:
+            return payloads, errors
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(batches)), thread_name_prefix="transcripts") as executor:
+            for batch, (batch_payloads, batch_error) in zip(batches, executor.map(self._fetch_batch, batches)):
+                for payload in batch_payloads or []:
+                    if isinstance(payload, dict) and payload.get('id'):
+                        payloads[payload['id']] = payload
+                for video_id in batch:
+                    if video_id not in payloads:
+                        errors[video_id] = batch_error or "No transcript returned"
+
+        print(f"📥 Fetched {len(payloads)} transcripts, {len(errors)} failed")
+        return payloads, errors
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_transcript_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = TranscriptClient()
+    return _client
+
 
 def fetch_youtube_data(video_ids: list):
-    url = "https://www.youtube-transcript.io/api/transcripts"
-    headers = {
-        "Authorization": f"Basic {YOUTUBE_TRANSCRIPT_API}",
-        "Content-Type": "application/json"
-    }
-
-    payload = {
-        "ids": video_ids
-    }
-
-    response = requests.post(url, headers=headers, json=payload)
-
-    if response.status_code == 200:
-        return response.json()
-    else:
-        print("❌ Ошибка:", response.status_code, response.text)
-        return None
+    """
+    Fetch transcripts for the given videos, returning the payloads that
+    succeeded (in request order). Failed videos are simply missing.
+    """
+    payloads, _ = get_transcript_client().fetch(video_ids)
+    return [payloads[video_id] for video_id in video_ids if video_id in payloads]
     
 
 def extract_full_transcript(transcript_data):
@@ -0,0 +1,220 @@
+"""
+BM25 retrieval over timecoded transcript windows.
+
+At ingest the caption segments of a video are compacted and grouped into
+overlapping windows of about ``RAG_WINDOW_TOKENS`` tokens, each keeping its
+start and end time. The windows and a term -> postings map are stored in
+``TranscriptIndex``, so answering a question only scores the postings of
+the question's terms and never re-reads the whole transcript.
+"""
+
+import math
+import re
+from collections import Counter
+
+from django.conf import settings
+
+from main.utils.summarizer import estimate_tokens
+from main.utils.transcript_compact import compact_segments
+
+INDEX_VERSION = 1
+
+# BM25 parameters
+K1 = 1.5
+B = 0.75
+
+TOKEN_RE = re.compile(r"[\w']+")
+STOPWORDS = frozenset("""
+a an and are as at be but by can did do does for from had has have how i if in into is it its
+just me my no not of on or our so than that the their them then there these they this to up
+us was we were what when where which who why will with would you your about video
+""".split())
+
+
+def tokenize(text):
+    """Lower-case word tokens without stopwords or single letters."""
+    return [
+        token for token in TOKEN_RE.findall((text or '').lower())
+        if len(token) > 1 and token not in STOPWORDS
+    ]
+
+
+def _seconds(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def format_timestamp(seconds):
+    """``83.2`` -> ``"01:23"``, ``3725`` -> ``"1:02:05"``."""
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes:02d}:{seconds:02d}"
+
+
+def build_windows(segments, window_tokens=None):
+    """
+    Group caption segments into windows that overlap by half a window.
+
+    Args:
+        segments (list[dict]): Caption segments with ``text``, ``start`` and ``dur``
+        window_tokens (int, optional): Target window size; defaults to RAG_WINDOW_TOKENS
+
+    Returns:
+        list[dict]: Windows with ``start``, ``end`` (seconds) and ``text``
+    """
+    window_tokens = window_tokens or settings.RAG_WINDOW_TOKENS
+    segments = compact_segments(segments)
+    sizes = [estimate_tokens(segment['text']) + 1 for segment in segments]
+    windows = []
+    i = 0
+    while i < len(segments):
+        j = i
+        tokens = 0
+        while j < len(segments) and (j == i or tokens < window_tokens):
+            tokens += sizes[j]
+            j += 1
+
+        last = segments[j - 1]
+        windows.append({
+            'start': _seconds(segments[i].get('start')),
+            'end': _seconds(last.get('start')) + _seconds(last.get('dur', last.get('duration'))),
+            'text': ' '.join(segment['text'] for segment in segments[i:j]),
+        })
+        if j >= len(segments):
+            break
+
+        # The next window starts about half-way through this one
+        next_start = i
+        covered = 0
+        while next_start < j - 1 and covered < tokens // 2:
+            covered += sizes[next_start]
+            next_start += 1
+        i = max(next_start, i + 1)
+    return windows
+
+
+def build_index(segments):
+    """
+    Build the stored index for a video's caption segments.
+
+    Returns:
+        dict | None: ``windows``, ``lengths``, ``avg_length`` and ``postings``
+        (term -> ``[[window, term_frequency], ...]``), or None without segments
+    """
+    windows = build_windows(segments or [])
+    if not windows:
+        return None
+
+    postings = {}
+    lengths = []
+    for position, window in enumerate(windows):
+        counts = Counter(tokenize(window['text']))
+        lengths.append(sum(counts.values()))
+        for term, frequency in counts.items():
+            postings.setdefault(term, []).append([position, frequency])
+
+    return {
+        'version': INDEX_VERSION,
+        'windows': windows,
+        'lengths': lengths,
+        'avg_length': (sum(lengths) / len(lengths)) or 1.0,
+        'postings': postings,
+    }
+
+
+def search(index, query, top_k=None):
+    """
+    Rank the windows of an index against a question with BM25.
+
+    Args:
+        index (dict): Output of ``build_index``
+        query (str): User question
+        top_k (int, optional): Number of windows; defaults to RAG_TOP_K
+
+    Returns:
+        list[dict]: Up to ``top_k`` windows with a ``score``, in transcript order
+    """
+    top_k = top_k or settings.RAG_TOP_K
+    windows = index['windows']
+    lengths = index['lengths']
+    avg_length = index['avg_length']
+    count = len(windows)
+
+    scores = Counter()
+    for term in set(tokenize(query)):
+        postings = index['postings'].get(term)
+        if not postings:
+            continue
+        idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+        for position, frequency in postings:
+            norm = K1 * (1 - B + B * lengths[position] / avg_length)
+            scores[position] += idf * frequency * (K1 + 1) / (frequency + norm)
+
+    best = sorted(position for position, _ in scores.most_common(top_k))
+    return [{**windows[position], 'score': round(scores[position], 3)} for position in best]
+
+
+def save_transcript_index(video):
+    """
+    (Re)build and store the index of one video.
+
+    Returns:
+        TranscriptIndex | None: The stored index, or None if the video has no timecodes
+    """
+    from main.models import TranscriptIndex  # Import here to avoid circular imports
+
+    index = build_index(video.timecode_transcript)
+    if index is None:
+        TranscriptIndex.objects.filter(video=video).delete()
+        return None
+
+    transcript_index, _ = TranscriptIndex.objects.update_or_create(
+        video=video,
+        defaults={'index': index, 'window_count': len(index['windows'])}
+    )
+    return transcript_index
+
+
+def get_transcript_index(video):
+    """
+    Return the stored index of a video, building it on first use for videos
+    ingested before indexes existed.
+
+    Returns:
+        dict | None: Index data, or None if the video has no timecodes
+    """
+    from main.models import TranscriptIndex  # Import here to avoid circular imports
+
+    stored = TranscriptIndex.objects.filter(video=video).first()
+    if stored is None or stored.index.get('version') != INDEX_VERSION:
+        stored = save_transcript_index(video)
+    return stored.index if stored else None
+
+
+def retrieve_windows(video, question):
+    """
+    Windows of the video most relevant to ``question``, capped at
+    ``RAG_MAX_CONTEXT_TOKENS`` in total.
+
+    Returns:
+        list[dict]: Windows with ``start``, ``end``, ``text`` and ``score``
+    """
+    index = get_transcript_index(video)
+    if not index:
+        return []
+
+    selected = []
+    budget = settings.RAG_MAX_CONTEXT_TOKENS
+    by_score = sorted(search(index, question), key=lambda window: -window['score'])
+    for window in by_score:
+        tokens = estimate_tokens(window['text'])
+        if tokens > budget:
+            continue
+        selected.append(window)
+        budget -= tokens
+    return sorted(selected, key=lambda window: window['start'])
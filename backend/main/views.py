@@ -6,7 +6,7 @@ from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from users.authentication import ClerkJWTAuthentication
 from django.shortcuts import get_object_or_404
-from django.http import Http404, StreamingHttpResponse, JsonResponse
+from django.http import Http404, JsonResponse
 from django.utils import timezone
 from django.contrib.auth import get_user_model
 import json
@@ -21,23 +21,31 @@ from django.conf import settings
 User = get_user_model()
 
 from main.utils.summary_chatbot import process_chatbot_request
+from main.utils.playlist_chatbot import process_playlist_chatbot_request
 from main.utils.quiz_explanation import process_quiz_explanation_request
 
-from .models import Playlist, Video, Flashcard, MindMap, Quiz
+from .models import ChatSession, Playlist, Video, Flashcard, MindMap, Quiz, IngestJob
 from .serializers import (
     PlaylistSerializer,
     VideoSerializer,
     PlaylistWithVideosSerializer,
     PlaylistWithVideoListSerializer,
-    QuizSerializer
+    QuizSerializer,
+    IngestJobSerializer,
+    ChatSessionSerializer
 )
-from main.utils.extractor_ids import fetch_playlist_info, fetch_playlist_videos
-from main.utils.transcript_fetch import fetch_youtube_data, extract_full_transcript
-from main.utils.summarizer import summarize_transcript
+from main.utils.ingest_jobs import create_ingest_job, recover_stale_jobs
+from main.utils.ingest_events import ingest_job_event_stream
+from main.utils.sse import event_stream_response
 
 from main.utils.generate_flashcards import generate_flashcards_from_transcript
 from main.utils.generate_mindmap import generate_mindmap_from_transcript, generate_mindmap_from_video
 from main.utils.generate_quiz import generate_quiz_from_transcript
+from main.utils.artifact_store import save_if_empty
+from main.utils.prefetch import promote_prefetch, take_over_prefetch
+from main.utils.quiz_explanation_cache import schedule_pregeneration
+from main.utils.study_pack import generate_study_pack
+from main.utils.transcript_compact import prompt_transcript
 
 
 class PlaylistAPIView(APIView):
@@ -65,132 +73,81 @@ class PlaylistAPIView(APIView):
         print(f"🔍 Processing URL: {url}")
         
         try:
-            playlist_info = fetch_playlist_info(url)
-            videos_info = fetch_playlist_videos(url)
-
-            # Проверяем, есть ли уже такой плейлист у пользователя
-            existing_playlist = Playlist.objects.filter(
-                playlist_id=playlist_info["id"],
-                user=request.user
-            ).first()
-            
-            if existing_playlist:
-                print(f"📋 Playlist already exists for user: {existing_playlist.title}")
-                serializer = PlaylistSerializer(existing_playlist)
-                return Response(serializer.data, status=status.HTTP_200_OK)
-
-            playlist = Playlist.objects.create(
-                playlist_id=playlist_info["id"],
-                title=playlist_info["title"],
-                playlist_url=playlist_info["url"],
-                playlist_thumbnail=playlist_info["playlist_thumbnail"],
-                user=request.user  # Привязываем к текущему пользователю
-            )
+            # Skip the job entirely when we already know the playlist
+            if playlist_id:
+                existing_playlist = Playlist.objects.filter(
+                    playlist_id=playlist_id,
+                    user=request.user
+                ).first()
+                if existing_playlist:
+                    print(f"📋 Playlist already exists for user: {existing_playlist.title}")
+                    serializer = PlaylistSerializer(existing_playlist)
+                    return Response(serializer.data, status=status.HTTP_200_OK)
+
+            job = create_ingest_job(request.user, url)
+            print(f"📥 Queued ingest job {job.uuid_job}")
+            serializer = IngestJobSerializer(job)
+            return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+        except Exception as e:
+            print(f"❌ Error processing playlist: {str(e)}")
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-            video_ids = [v["id"] for v in videos_info]
-            
-            transcript_data = fetch_youtube_data(video_ids)
-            
-
-            # Extract both full transcripts and timecode transcripts by video ID
-            transcripts_by_id = {}
-            timecodes_by_id = {}
-            durations_by_id = {}
-            
-            if transcript_data:
-                for video_transcript in transcript_data:
-                    video_id = video_transcript.get('id')
-                    if video_id:
-                        # Extract full transcript (plain text)
-                        single_video_transcript = extract_full_transcript([video_transcript])
-                        transcripts_by_id[video_id] = single_video_transcript
-                        
-                        # Extract timecode transcript (JSON with timestamps)
-                        try:
-                            if 'tracks' in video_transcript and len(video_transcript['tracks']) > 0:
-                                timecode_transcript = video_transcript['tracks'][0]['transcript']
-                                timecodes_by_id[video_id] = timecode_transcript
-                            else:
-                                timecodes_by_id[video_id] = None
-                        except (KeyError, IndexError) as e:
-                            print(f"❌ Error extracting timecode for video {video_id}: {str(e)}")
-                            timecodes_by_id[video_id] = None
-                        
-                        # Extract duration in seconds
-                        try:
-                            duration_seconds = int(video_transcript['microformat']['playerMicroformatRenderer']['lengthSeconds'])
-                            durations_by_id[video_id] = duration_seconds
-                            print(f"📏 Video {video_id} duration: {duration_seconds} seconds")
-                        except (KeyError, ValueError, TypeError) as e:
-                            print(f"❌ Error extracting duration for video {video_id}: {str(e)}")
-                            durations_by_id[video_id] = 0
-
-            # Check total duration limit (30 hours = 108,000 seconds)
-            MAX_PLAYLIST_DURATION = 30 * 60 * 60  # 30 hours in seconds
-            total_duration = sum(durations_by_id.values())
-            
-            print(f"📊 Total playlist duration: {total_duration} seconds ({total_duration/3600:.2f} hours)")
-            
-            if total_duration > MAX_PLAYLIST_DURATION:
-                # Delete the created playlist since we can't process it
-                playlist.delete()
-                hours = total_duration / 3600
-                max_hours = MAX_PLAYLIST_DURATION / 3600
-                error_message = f"Playlist duration ({hours:.1f} hours) exceeds the maximum allowed duration of {max_hours} hours. Please use a shorter playlist to reduce server load."
-                print(f"❌ {error_message}")
-                return Response({"error": error_message}, status=status.HTTP_400_BAD_REQUEST)
-
-            # Filter videos by cumulative duration to ensure we don't exceed the limit
-            processed_videos = []
-            cumulative_duration = 0
-            
-            for v in videos_info:
-                video_duration = durations_by_id.get(v["id"], 0)
-                if cumulative_duration + video_duration <= MAX_PLAYLIST_DURATION:
-                    processed_videos.append(v)
-                    cumulative_duration += video_duration
-                    print(f"✅ Added video {v['id']} - Running total: {cumulative_duration/3600:.2f} hours")
-                else:
-                    print(f"⏱️ Skipping video {v['id']} - would exceed time limit")
-                    break
 
-            print(f"📈 Processing {len(processed_videos)} out of {len(videos_info)} videos")
-            print(f"🕐 Final duration: {cumulative_duration/3600:.2f} hours")
+class PlaylistResyncAPIView(APIView):
+    authentication_classes = [ClerkJWTAuthentication]
+    permission_classes = [IsAuthenticated]
 
-            for v in processed_videos:
-                transcript = transcripts_by_id.get(v["id"], "")
-                timecode = timecodes_by_id.get(v["id"], None)
-                duration_sec = durations_by_id.get(v["id"], 0)
-                summary = ""
-                
-                if transcript and transcript.strip():
-                    try:
-                        summary = summarize_transcript(transcript)
-                        print(f"✅ Generated summary for video {v['id']}")
-                    except Exception as e:
-                        print(f"❌ Error generating summary for video {v['id']}: {str(e)}")
-                        summary = "Summary generation failed"
-                
-                Video.objects.create(
-                    video_id=v["id"],
-                    title=v["title"],
-                    url=v["url"],
-                    thumbnail=v["thumbnail"],
-                    full_transcript=transcript,
-                    summary=summary,
-                    playlist=playlist,
-                    timecode_transcript=timecode,
-                    duration_sec=duration_sec,
-                    user=request.user
-                )
-            serializer = PlaylistSerializer(playlist)
-            print("✅ Successfully created playlist:", serializer.data)
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
+    def post(self, request, playlist_uuid):
+        """Queue a resync that only processes videos added to or removed from the YouTube playlist"""
+        playlist = get_object_or_404(Playlist, uuid_playlist=playlist_uuid, user=request.user)
+
+        active_job = IngestJob.objects.filter(
+            playlist=playlist,
+            kind=IngestJob.KIND_RESYNC,
+            status__in=[IngestJob.STATUS_QUEUED, IngestJob.STATUS_RUNNING]
+        ).first()
+        if active_job:
+            print(f"🔄 Resync already in progress for playlist: {playlist.title}")
+            return Response(IngestJobSerializer(active_job).data, status=status.HTTP_202_ACCEPTED)
+
+        try:
+            job = create_ingest_job(
+                request.user,
+                playlist.playlist_url,
+                kind=IngestJob.KIND_RESYNC,
+                playlist=playlist,
+                remove_missing=bool(request.data.get("remove_missing", False))
+            )
+            print(f"📥 Queued resync job {job.uuid_job} for playlist: {playlist.title}")
+            return Response(IngestJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
         except Exception as e:
-            print(f"❌ Error processing playlist: {str(e)}")
+            print(f"❌ Error queueing resync: {str(e)}")
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+class IngestJobDetailAPIView(APIView):
+    authentication_classes = [ClerkJWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, job_uuid):
+        """Report overall and per-video progress of a playlist ingest job"""
+        # The poller keeps asking about a job whose worker may be gone
+        recover_stale_jobs()
+        job = get_object_or_404(IngestJob, uuid_job=job_uuid, user=request.user)
+        serializer = IngestJobSerializer(job)
+        return Response(serializer.data)
+
+
+class IngestJobEventsAPIView(APIView):
+    authentication_classes = [ClerkJWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, job_uuid):
+        """Stream per-video ingest progress as server-sent events"""
+        job = get_object_or_404(IngestJob, uuid_job=job_uuid, user=request.user)
+        return event_stream_response(ingest_job_event_stream(job.id))
+
+
 class PlaylistDetailAPIView(APIView):
     authentication_classes = [ClerkJWTAuthentication]
     permission_classes = [IsAuthenticated]
@@ -217,6 +174,8 @@ class VideoDetailAPIView(APIView):
     
     def get(self, request, video_uuid):
         video = get_object_or_404(Video, uuid_video=video_uuid, user=request.user)
+        # Study materials of the video the user is looking at are prefetched first
+        promote_prefetch(video, request.user)
         serializer = VideoSerializer(video)
         return Response(serializer.data)
 
@@ -253,25 +212,65 @@ class SummaryChatbotAPIView(APIView):
     
     def post(self, request):
         try:
-            response_generator = process_chatbot_request(
+            response_generator, session = process_chatbot_request(
                 user=request.user,
                 video_uuid=request.data.get("video_uuid"),
-                user_message=request.data.get("user_message")
-            )
-            return StreamingHttpResponse(
-                response_generator, 
-                content_type='text/event-stream'
+                user_message=request.data.get("user_message"),
+                session_uuid=request.data.get("session_uuid")
             )
+            response = event_stream_response(response_generator)
+            # The client sends it back as session_uuid to continue the conversation
+            if session is not None:
+                response['X-Chat-Session'] = str(session.uuid_session)
+            return response
             
         except ValueError as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
-        except Video.DoesNotExist:
-            return Response({"error": "Video not found"}, status=status.HTTP_404_NOT_FOUND)
+        except Http404:
+            return Response({"error": "Video or chat session not found"}, status=status.HTTP_404_NOT_FOUND)
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
 
+class PlaylistChatbotAPIView(APIView):
+    authentication_classes = [ClerkJWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        """Answer a question about a whole course from passages of all of its videos"""
+        try:
+            response_generator = process_playlist_chatbot_request(
+                user=request.user,
+                playlist_uuid=request.data.get("playlist_uuid"),
+                user_message=request.data.get("user_message")
+            )
+            return event_stream_response(response_generator)
+
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Http404:
+            return Response({"error": "Playlist not found"}, status=status.HTTP_404_NOT_FOUND)
+        except Exception as e:
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+
+class ChatSessionDetailAPIView(APIView):
+    authentication_classes = [ClerkJWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, session_uuid):
+        """Return the messages of a chatbot conversation so the client can resume it"""
+        session = get_object_or_404(ChatSession, uuid_session=session_uuid, user=request.user)
+        serializer = ChatSessionSerializer(session)
+        return Response(serializer.data)
+
+    def delete(self, request, session_uuid):
+        session = get_object_or_404(ChatSession, uuid_session=session_uuid, user=request.user)
+        session.delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
 class GenerateFlashCardsView(APIView):
     authentication_classes = [ClerkJWTAuthentication]
     permission_classes = [IsAuthenticated]
@@ -300,6 +299,7 @@ class GenerateFlashCardsView(APIView):
                 print("✅ Duplicate flashcards cleaned up")
 
             # Теперь безопасно используем get_or_create
+            take_over_prefetch(video, request.user, ["flashcards"])
             flashcards_data, created = generate_flashcards_from_transcript(video, request.user)
             
             if created:
@@ -407,6 +407,7 @@ class GenerateMindMapView(APIView):
             print(f"📄 Transcript length: {len(video.full_transcript)} characters")
             
             # Use generate_mindmap_from_video which handles get_or_create safely
+            take_over_prefetch(video, request.user, ["mindmap"])
             mindmap_data, created = generate_mindmap_from_video(video, request.user)
             
             if created:
@@ -484,18 +485,24 @@ class GenerateQuizView(APIView):
                 
                 # Generate new quiz if it's newly created or empty
                 if created or not quiz.quiz_json or len(quiz.quiz_json) == 0:
+                    # A running prefetch may fill the quiz while we wait for it
+                    take_over_prefetch(video, request.user, ["quiz"])
+                    quiz.refresh_from_db()
+
+                if not quiz.quiz_json:
                     print("🎯 Generating new quiz...")
                     
                     # Generate quiz using AI
                     quiz_questions = generate_quiz_from_transcript(
-                        transcript=video.full_transcript,
+                        transcript=prompt_transcript(video),
                         duration_seconds=video.duration_sec
                     )
                     
-                    # Save generated questions
-                    quiz.quiz_json = quiz_questions
-                    quiz.questions_count = len(quiz_questions)
-                    quiz.save()
+                    # Save generated questions, unless a prefetch saved its quiz first
+                    quiz, _ = save_if_empty(
+                        Quiz, {'quiz_video': video, 'user': request.user}, 'quiz_json', quiz_questions,
+                        questions_count=len(quiz_questions)
+                    )
                     
                 
                 # Serialize quiz data
@@ -567,6 +574,47 @@ class GenerateQuizView(APIView):
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+class StudyPackView(APIView):
+    authentication_classes = [ClerkJWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        """Generate flashcards, mindmap and quiz for a video from one transcript submission"""
+        print("🚀 Received POST request to /api/study-pack/")
+        video_uuid = request.data.get("video_uuid")
+
+        if not video_uuid:
+            return Response({"error": "video_uuid is required"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            video = get_object_or_404(Video, uuid_video=video_uuid, user=request.user)
+            print(f"🎥 Found video: {video.title}")
+
+            take_over_prefetch(video, request.user, ["flashcards", "mindmap", "quiz"])
+            pack = generate_study_pack(video, request.user)
+            artifacts = pack["artifacts"]
+            if all(artifact["status"] == "failed" for artifact in artifacts.values()):
+                return Response({"error": "Study pack generation failed", **pack},
+                                status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+            created = any(artifact["status"] == "generated" for artifact in artifacts.values())
+            return Response({
+                "message": "Study pack generated successfully" if created else "Study pack already exists",
+                "video_title": video.title,
+                "created": created,
+                **pack
+            }, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
+        except Http404:
+            return Response({"error": "Video not found"}, status=status.HTTP_404_NOT_FOUND)
+        except ValueError as e:
+            print(f"❌ Study pack generation failed: {e}")
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            print(f"❌ Unexpected error: {str(e)}")
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
 class SubmitQuizResultsView(APIView):
     authentication_classes = [ClerkJWTAuthentication]
     permission_classes = [IsAuthenticated]
@@ -625,6 +673,8 @@ class SubmitQuizResultsView(APIView):
             quiz.correct_answers_count = correct_answers
             quiz.user_answers = processed_answers
             quiz.save()
+            # Explanations of the wrong answers are likely to be asked for next
+            schedule_pregeneration(quiz)
             
             print(f"✅ Quiz results saved: {correct_answers}/{total_questions} ({score_percentage:.1f}%)")
             
@@ -667,10 +717,7 @@ class QuizExplanationAPIView(APIView):
             )
             
             # Return streaming response
-            return StreamingHttpResponse(
-                response_generator, 
-                content_type='text/event-stream'
-            )
+            return event_stream_response(response_generator)
             
         except ValueError as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
@@ -12,6 +12,27 @@ const HomePage = () => {
   const [loading, setLoading] = useState(false);
   const [message, setMessage] = useState('');
 
+  // Poll the ingest job until the backend finishes processing the playlist
+  const waitForIngestJob = async (jobUuid) => {
+    while (true) {
+      await new Promise((resolve) => setTimeout(resolve, 2000));
+      const response = await apiCall(API_ENDPOINTS.ingestJob(jobUuid), {}, getToken);
+      if (!response.ok) {
+        throw new Error('Не удалось получить статус импорта');
+      }
+      const job = await response.json();
+      if (job.status === 'succeeded') {
+        return job;
+      }
+      if (job.status === 'failed') {
+        throw new Error(job.error || 'Не удалось создать курс');
+      }
+      if (job.total_videos > 0) {
+        setMessage(`🔄 Обработано видео: ${job.processed_videos}/${job.total_videos}`);
+      }
+    }
+  };
+
   const handleSubmit = async (e) => {
     e.preventDefault();
     if (!playlistUrl.trim()) return;
@@ -26,6 +47,10 @@ const HomePage = () => {
       }, getToken);
 
       if (response.ok) {
+        if (response.status === 202) {
+          const job = await response.json();
+          await waitForIngestJob(job.uuid_job);
+        }
         setMessage('Курс создан успешно!');
         setPlaylistUrl('');
         
@@ -39,7 +64,7 @@ const HomePage = () => {
       }
     } catch (error) {
       console.error('Ошибка создания курса:', error);
-      setMessage('❌ Ошибка создания курса');
+      setMessage(`❌ Ошибка: ${error.message || 'Ошибка создания курса'}`);
     } finally {
       setLoading(false);
     }
@@ -6,8 +6,13 @@ import { Prism as SyntaxHighlighter } from 'react-syntax-highlighter';
 import { tomorrow } from 'react-syntax-highlighter/dist/esm/styles/prism';
 import { useAuth } from '@clerk/clerk-react';
 import { apiCall } from '../../utils/auth';
+import { API_ENDPOINTS } from '../../config/clerkApi';
+import { readEvents } from '../../utils/sse';
 import './ChatTab.css';
 
+// The server keeps the conversation; we only remember which session belongs to which video
+const chatSessionKey = (videoUuid) => `chat-session-${videoUuid}`;
+
 const ChatTab = ({ video, presetMessage }) => {
   const { getToken } = useAuth();
   // Chat state
@@ -81,62 +86,51 @@ const ChatTab = ({ video, presetMessage }) => {
     setChatMessages(prev => [...prev, botMessage]);
 
     try {
-      const response = await apiCall('/summary-chatbot/', {
+      const response = await apiCall(API_ENDPOINTS.SUMMARY_CHATBOT, {
         method: 'POST',
         body: JSON.stringify({
           video_uuid: video.uuid_video,
-          user_message: userMessage
+          user_message: userMessage,
+          session_uuid: localStorage.getItem(chatSessionKey(video.uuid_video)) || undefined
         })
       }, getToken);
 
+      if (response.status === 404) {
+        // The session is gone (e.g. deleted): the next message starts a new one
+        localStorage.removeItem(chatSessionKey(video.uuid_video));
+      }
       if (!response.ok) {
         throw new Error(`HTTP error! status: ${response.status}`);
       }
 
-      const reader = response.body.getReader();
-      const decoder = new TextDecoder();
+      const sessionUuid = response.headers.get('x-chat-session');
+      if (sessionUuid) {
+        localStorage.setItem(chatSessionKey(video.uuid_video), sessionUuid);
+      }
 
-      while (true) {
-        const { done, value } = await reader.read();
-        
-        if (done) {
-          setChatLoading(false);
-          break;
-        }
+      const appendToBotMessage = (text) => {
+        setChatMessages(prev => 
+          prev.map(msg => 
+            msg.id === botMessageId 
+              ? { ...msg, content: msg.content + text }
+              : msg
+          )
+        );
+      };
 
-        const chunk = decoder.decode(value, { stream: true });
-        const lines = chunk.split('\n');
-        
-        for (const line of lines) {
-          if (line.startsWith('data: ')) {
-            const data = line.slice(6); // Remove 'data: ' prefix
-            if (data.trim() === '[DONE]') {
-              setChatLoading(false);
-              break;
-            } else if (data.trim() && !data.startsWith('[Error:')) {
-              // Update the bot message content by appending new text
-              setChatMessages(prev => 
-                prev.map(msg => 
-                  msg.id === botMessageId 
-                    ? { ...msg, content: msg.content + data }
-                    : msg
-                )
-              );
-            } else if (data.startsWith('[Error:')) {
-              // Handle error messages
-              setChatMessages(prev => 
-                prev.map(msg => 
-                  msg.id === botMessageId 
-                    ? { ...msg, content: msg.content + data }
-                    : msg
-                )
-              );
-              setChatLoading(false);
-              break;
-            }
-          }
+      for await (const data of readEvents(response)) {
+        if (data.trim() === '[DONE]') {
+          break;
+        } else if (data.startsWith('[Error:')) {
+          // Handle error messages
+          appendToBotMessage(data);
+          break;
+        } else {
+          // Update the bot message content by appending new text
+          appendToBotMessage(data);
         }
       }
+      setChatLoading(false);
 
     } catch (error) {
       console.error('Error with streaming chat:', error);
@@ -171,6 +165,40 @@ const ChatTab = ({ video, presetMessage }) => {
     setChatLoading(false);
   }, [video?.uuid_video, presetMessage]);
 
+  // Resume the stored conversation of this video
+  useEffect(() => {
+    const sessionUuid = video?.uuid_video && localStorage.getItem(chatSessionKey(video.uuid_video));
+    if (!sessionUuid || presetMessage) return;
+
+    let cancelled = false;
+    const loadSession = async () => {
+      try {
+        const response = await apiCall(API_ENDPOINTS.CHAT_SESSION(sessionUuid), {}, getToken);
+        if (response.status === 404) {
+          localStorage.removeItem(chatSessionKey(video.uuid_video));
+          return;
+        }
+        if (!response.ok || cancelled) return;
+
+        const session = await response.json();
+        if (cancelled) return;
+        setChatMessages(session.messages.map((message, index) => ({
+          id: `${sessionUuid}-${index}`,
+          type: message.role === 'user' ? 'user' : 'bot',
+          content: message.content,
+          timestamp: new Date(message.created_at)
+        })));
+      } catch (error) {
+        console.error('Error loading chat session:', error);
+      }
+    };
+    loadSession();
+
+    return () => {
+      cancelled = true;
+    };
+  }, [video?.uuid_video, presetMessage, getToken]);
+
   return (
     <div className="chat-container">
       {!video?.summary ? (
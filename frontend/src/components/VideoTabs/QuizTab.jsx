@@ -1,6 +1,7 @@
 import React, { useState, useEffect, useCallback } from 'react';
 import { useAuth } from '@clerk/clerk-react';
 import { apiCall } from '../../utils/auth';
+import { readEvents } from '../../utils/sse';
 import { API_ENDPOINTS } from '../../config/clerkApi';
 import './QuizTab.css';
 
@@ -35,32 +36,19 @@ const QuizTab = ({ video, onSwitchToChat }) => {
         throw new Error(`HTTP error! status: ${response.status}`);
       }
 
-      const reader = response.body.getReader();
-      const decoder = new TextDecoder();
       let explanation = '';
 
-      while (true) {
-        const { value, done } = await reader.read();
-        if (done) break;
-
-        const chunk = decoder.decode(value);
-        const lines = chunk.split('\n');
-
-        for (const line of lines) {
-          if (line.startsWith('data: ')) {
-            const data = line.slice(6);
-            if (data === '[DONE]') {
-              // Switch to chat tab with explanation
-              if (onSwitchToChat) {
-                onSwitchToChat(explanation);
-              }
-              return;
-            } else if (data.startsWith('[Error:')) {
-              throw new Error(data);
-            } else {
-              explanation += data;
-            }
+      for await (const data of readEvents(response)) {
+        if (data === '[DONE]') {
+          // Switch to chat tab with explanation
+          if (onSwitchToChat) {
+            onSwitchToChat(explanation);
           }
+          return;
+        } else if (data.startsWith('[Error:')) {
+          throw new Error(data);
+        } else {
+          explanation += data;
         }
       }
 
@@ -52,6 +52,7 @@ export const API_ENDPOINTS = {
   MY_COURSES: `my-courses/`,
   DELETE_COURSE: (playlistId) => `my-courses/${playlistId}/delete/`,
   SUMMARY_CHATBOT: `summary-chatbot/`,
+  CHAT_SESSION: (sessionUuid) => `summary-chatbot/sessions/${sessionUuid}/`,
   FLASHCARDS: `flashcards/`,
   MINDMAP: `mindmap/`,
   QUIZ: `quiz/`,
@@ -61,6 +62,7 @@ export const API_ENDPOINTS = {
   // Helper functions
   getPlaylist: (playlistUuid) => `playlists/${playlistUuid}/`,
   getPlaylistVideosList: (playlistUuid) => `playlists/${playlistUuid}/videos/`,
+  ingestJob: (jobUuid) => `ingest-jobs/${jobUuid}/`,
   video: (videoUuid) => `videos/${videoUuid}/`,
 };
 
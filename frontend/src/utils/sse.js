@@ -0,0 +1,33 @@
+// Read the server-sent events of a fetch() response.
+// An event may span several `data:` lines (answers with line breaks) and
+// several network chunks; `: keepalive` comments are skipped.
+// Leaving the loop early closes the connection, which stops the server's LLM call.
+export async function* readEvents(response) {
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+
+  try {
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+
+      buffer += decoder.decode(value, { stream: true });
+      let boundary;
+      while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+        const rawEvent = buffer.slice(0, boundary);
+        buffer = buffer.slice(boundary + 2);
+
+        const dataLines = rawEvent
+          .split('\n')
+          .filter(line => line.startsWith('data:'))
+          .map(line => line.slice(line.startsWith('data: ') ? 6 : 5));
+        if (dataLines.length) {
+          yield dataLines.join('\n');
+        }
+      }
+    }
+  } finally {
+    reader.cancel().catch(() => {});
+  }
+}